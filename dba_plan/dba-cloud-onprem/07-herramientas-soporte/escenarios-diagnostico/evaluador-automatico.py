@@ -6,14 +6,91 @@ Programa DBA Cloud OnPrem Junior
 
 import json
 import time
+import queue
 import datetime
 import subprocess
+import socket
+import threading
+import http.client
 import os
 import sys
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 import yaml
 
+class UnixSocketConnection(http.client.HTTPConnection):
+    """HTTPConnection sobre un socket Unix (API del daemon de Docker)"""
+    
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+    
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+class ContainerStateProvider:
+    """Snapshot de los contenedores en ejecución, indexado por nombre y reutilizado durante `ttl` segundos.
+    
+    Se obtiene con un solo `docker ps` o, si hay `socket_path`, con GET /containers/json al
+    socket del daemon (en pruebas puede ser un servidor local que lo imite). Las verificaciones
+    concurrentes esperan al mismo snapshot en lugar de lanzar cada una su propio proceso.
+    """
+    
+    def __init__(self, ttl: float = 10.0, socket_path: Optional[str] = None, timeout: float = 30.0,
+                 cwd: Optional[Path] = None):
+        self.ttl = ttl
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.cwd = cwd
+        self.lock = threading.Lock()
+        self.containers: Optional[Dict[str, str]] = None
+        self.taken_at = 0.0
+        self.snapshots = 0
+    
+    def snapshot(self) -> Dict[str, str]:
+        """Estado de cada contenedor por nombre ({'nombre': 'Up 5 minutes', ...})"""
+        with self.lock:
+            if self.containers is None or time.monotonic() - self.taken_at >= self.ttl:
+                self.containers = self._read_socket() if self.socket_path else self._read_cli()
+                self.taken_at = time.monotonic()
+                self.snapshots += 1
+            return self.containers
+    
+    def is_up(self, container_name: str) -> bool:
+        """Como `docker ps --filter name=...`: basta con que un nombre contenga `container_name`"""
+        return any(container_name in name and status.startswith('Up')
+                   for name, status in self.snapshot().items())
+    
+    def _read_cli(self) -> Dict[str, str]:
+        result = subprocess.run(
+            ['docker', 'ps', '--format', '{{json .}}'],
+            capture_output=True, text=True, cwd=self.cwd, timeout=self.timeout, check=True
+        )
+        containers = {}
+        for line in result.stdout.splitlines():
+            if line.strip():
+                container = json.loads(line)
+                for name in container.get('Names', '').split(','):
+                    containers[name] = container.get('Status', '')
+        return containers
+    
+    def _read_socket(self) -> Dict[str, str]:
+        connection = UnixSocketConnection(self.socket_path, self.timeout)
+        try:
+            connection.request('GET', '/containers/json')
+            response = connection.getresponse()
+            if response.status != 200:
+                raise RuntimeError(f"Docker API respondió {response.status}")
+            containers = {}
+            for container in json.loads(response.read()):
+                for name in container.get('Names', []):
+                    containers[name.lstrip('/')] = container.get('Status', '')
+            return containers
+        finally:
+            connection.close()
+
 class ScenarioEvaluator:
     def __init__(self, scenario_path: str):
         self.scenario_path = Path(scenario_path)
@@ -28,6 +105,19 @@ class ScenarioEvaluator:
         # Cargar configuración del escenario
         self.config = self._load_scenario_config()
         
+        # Verificaciones automatizadas en paralelo, con límite de tiempo por verificación
+        self.check_concurrency = int(os.getenv('EVAL_CHECK_CONCURRENCY', self.config.get('check_concurrency', 8)))
+        self.check_timeout = float(os.getenv('EVAL_CHECK_TIMEOUT', self.config.get('check_timeout_seconds', 30)))
+        self.check_results = []
+        
+        # Un snapshot de contenedores compartido por todas las verificaciones docker_container_status
+        self.containers = ContainerStateProvider(
+            ttl=float(os.getenv('EVAL_CONTAINER_CACHE_TTL', self.config.get('container_cache_ttl_seconds', 10))),
+            socket_path=os.getenv('EVAL_DOCKER_SOCKET') or self.config.get('docker_socket'),
+            timeout=self.check_timeout,
+            cwd=self.scenario_path
+        )
+        
     def _load_scenario_config(self) -> Dict[str, Any]:
         """Carga la configuración del escenario"""
         config_file = self.scenario_path / "evaluacion-config.yml"
@@ -137,38 +227,32 @@ class ScenarioEvaluator:
     
     def check_quick_fix(self) -> int:
         """Evalúa la implementación del quick fix"""
-        points = 0
         max_points = self.config['criteria']['quick_fix_implementation']
         
         # Ejecutar verificaciones automatizadas
-        for check in self.config.get('quick_fix_checks', []):
-            if self._run_automated_check(check):
-                points += check.get('points', 5)
-        
-        points = min(points, max_points)
+        results = self._run_checks(self.config.get('quick_fix_checks', []), 'quick_fix')
+        points = min(sum(result['points'] for result in results), max_points)
         
         self._log_event("quick_fix_evaluated", {
             "points_awarded": points,
-            "max_points": max_points
+            "max_points": max_points,
+            "checks": results
         })
         
         return points
     
     def check_definitive_solution(self) -> int:
         """Evalúa la solución definitiva"""
-        points = 0
         max_points = self.config['criteria']['definitive_solution']
         
         # Ejecutar verificaciones automatizadas
-        for check in self.config.get('definitive_solution_checks', []):
-            if self._run_automated_check(check):
-                points += check.get('points', 5)
-        
-        points = min(points, max_points)
+        results = self._run_checks(self.config.get('definitive_solution_checks', []), 'definitive_solution')
+        points = min(sum(result['points'] for result in results), max_points)
         
         self._log_event("definitive_solution_evaluated", {
             "points_awarded": points,
-            "max_points": max_points
+            "max_points": max_points,
+            "checks": results
         })
         
         return points
@@ -233,6 +317,68 @@ class ScenarioEvaluator:
         
         return points
     
+    def _run_checks(self, checks: List[Dict[str, Any]], phase: str) -> List[Dict[str, Any]]:
+        """Ejecuta verificaciones independientes en paralelo; una que excede el límite cuenta como fallida"""
+        if not checks:
+            return []
+        
+        started: Dict[int, float] = {}
+        results: Dict[int, Dict[str, Any]] = {}
+        finished: queue.Queue = queue.Queue()
+        backlog = list(enumerate(checks))
+        limit = max(1, self.check_concurrency)
+        
+        def timed_check(index: int, check: Dict[str, Any]):
+            try:
+                status = 'passed' if self._run_automated_check(check) else 'failed'
+            except Exception as e:
+                status = f'error: {e}'
+            finished.put((index, {'status': status, 'duration_ms': round((time.monotonic() - started[index]) * 1000, 1)}))
+        
+        while len(results) < len(checks):
+            # Una verificación vencida deja de ocupar su lugar: su thread es daemon y no bloquea la salida
+            running = [index for index in started if index not in results]
+            while backlog and len(running) < limit:
+                index, check = backlog.pop(0)
+                started[index] = time.monotonic()
+                threading.Thread(target=timed_check, args=(index, check), name=f"check-{phase}-{index}",
+                                 daemon=True).start()
+                running.append(index)
+            
+            # Esperar hasta que termine alguna o venza el plazo de la más antigua en curso
+            timeout = min(started[index] for index in running) + self.check_timeout - time.monotonic()
+            try:
+                index, result = finished.get(timeout=max(0.0, timeout))
+                results.setdefault(index, result)  # Un resultado que llega tras el plazo se descarta
+            except queue.Empty:
+                pass
+            now = time.monotonic()
+            for index in running:
+                if index not in results and now - started[index] >= self.check_timeout:
+                    results[index] = {'status': 'timeout', 'duration_ms': round((now - started[index]) * 1000, 1)}
+        
+        report = []
+        for index, check in enumerate(checks):
+            result = results[index]
+            passed = result['status'] == 'passed'
+            report.append({
+                "phase": phase,
+                "type": check.get('type'),
+                "target": self._check_target(check),
+                "status": result['status'],
+                "points": check.get('points', 5) if passed else 0,
+                "duration_ms": result['duration_ms']
+            })
+        self.check_results.extend(report)
+        return report
+    
+    def _check_target(self, check: Dict[str, Any]) -> Optional[str]:
+        """Nombre legible de lo que verifica un check"""
+        for field in ('name', 'container_name', 'file_path', 'log_file', 'metric', 'query'):
+            if check.get(field):
+                return str(check[field])
+        return None
+    
     def _run_automated_check(self, check: Dict[str, Any]) -> bool:
         """Ejecuta una verificación automatizada"""
         check_type = check.get('type')
@@ -253,11 +399,7 @@ class ScenarioEvaluator:
     def _check_container_status(self, container_name: str) -> bool:
         """Verifica el estado de un contenedor"""
         try:
-            result = subprocess.run(
-                ['docker', 'ps', '--filter', f'name={container_name}', '--format', '{{.Status}}'],
-                capture_output=True, text=True, cwd=self.scenario_path
-            )
-            return 'Up' in result.stdout
+            return self.containers.is_up(container_name)
         except:
             return False
     
@@ -338,6 +480,13 @@ class ScenarioEvaluator:
                 "hints_used": self.hints_used,
                 "hint_penalty": self.hints_used * self.config['hint_penalty']
             },
+            "automated_checks": {
+                "total": len(self.check_results),
+                "passed": sum(1 for result in self.check_results if result['status'] == 'passed'),
+                "check_time_ms": round(sum(result['duration_ms'] for result in self.check_results), 1),
+                "container_snapshots": self.containers.snapshots,
+                "checks": self.check_results
+            },
             "evaluation_log": self.evaluation_log,
             "generated_at": datetime.datetime.now().isoformat()
         }
@@ -113,6 +113,22 @@ try {
     print("⚠️ aggregated_metrics ya sharded o error: " + e);
 }
 
+// 5.4. Alternativas para comparar con METRICS_INGEST_MODE=timeseries (METRICS_KEY_LAYOUTS)
+print("5.4. Configurando alternativas de aggregated_metrics...");
+try {
+    db.runCommand({
+        shardCollection: "sensornet_db.aggregated_metrics_hashed",
+        key: { timestamp: "hashed" }  // Reparte inserts, pero los rangos de tiempo consultan todos los shards
+    });
+    db.runCommand({
+        shardCollection: "sensornet_db.aggregated_metrics_bucketed",
+        key: { bucket: 1, timestamp: 1 }  // Prefijo de bucket: N puntos de inserción en lugar de uno
+    });
+    print("✅ aggregated_metrics_hashed y aggregated_metrics_bucketed sharded");
+} catch (e) {
+    print("⚠️ Alternativas de aggregated_metrics ya sharded o error: " + e);
+}
+
 // 6. CONFIGURACIÓN PROBLEMÁTICA: Chunk size muy grande
 print("6. Configurando chunk size problemático...");
 try {
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+NumPy Batch Generation of Sensor Readings for the Sharding Imbalance Simulator
+Draws a whole batch column by column with NumPy and shares raw_data payloads between documents
+"""
+
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+try:
+    import numpy as np
+except ImportError:  # Only needed for GENERATION_MODE=numpy
+    np = None
+
+SIZE_CLASSES = ('small', 'medium', 'large', 'xlarge')
+
+
+class PayloadPool:
+    """raw_data strings cut from one preallocated buffer, one shared string per length.
+
+    After warm-up a camera reading reuses an existing string instead of
+    allocating 'x' * n; the pool holds at most one string per length up to
+    `max_length` (about 12 MB for the 1000-5000 byte range).
+    """
+
+    def __init__(self, max_length: int = 5000, fill: str = 'x'):
+        self.buffer = fill * max_length
+        self.payloads: Dict[int, str] = {}
+
+    def get(self, length: int) -> str:
+        payload = self.payloads.get(length)
+        if payload is None:
+            payload = self.payloads[length] = self.buffer[:length]
+        return payload
+
+
+class NumpyBatchGenerator:
+    """Builds `batch_size` readings with a SensorReadingGenerator's distributions in a few NumPy calls.
+
+    Sensor ids, device types and locations come from the generator's
+    precomputed samplers (their cumulative weights, searched with
+    np.searchsorted); the sensor_data fields of each size class are drawn
+    as one array per field, and vibration axes as a single (n, 3, 100)
+    array. The NumPy generator is seeded from the operation's RNG, so a
+    seeded run and its trace replay produce the same batch; the values
+    differ from the per-document path's.
+    """
+
+    def __init__(self, documents: Any):
+        if np is None:
+            raise RuntimeError("GENERATION_MODE=numpy needs numpy installed")
+        self.device_types = documents.device_type_sampler.keys
+        self.device_type_cum = np.array(documents.device_type_sampler.cum_weights)
+        self.locations = documents.location_sampler.keys
+        self.location_cum = np.array(documents.location_sampler.cum_weights)
+        self.regions = [documents.locations[location]['region'] for location in self.locations]
+        segments = documents.sensor_sampler.segments
+        self.segment_first = np.array([first for first, _ in segments])
+        self.segment_size = np.array([size for _, size in segments])
+        self.segment_cum = np.array(documents.sensor_sampler.segment_sampler.cum_weights)
+        self.size_class = np.array([SIZE_CLASSES.index(documents.device_types[name]['data_size'])
+                                    for name in self.device_types])
+        self.payloads = PayloadPool()
+
+    @staticmethod
+    def categorical(gen: Any, cum_weights: Any, n: int) -> Any:
+        return np.searchsorted(cum_weights, gen.random(n) * cum_weights[-1], side='right')
+
+    def generate(self, rng: Any, batch_size: int) -> List[Dict[str, Any]]:
+        gen = np.random.default_rng(rng.getrandbits(64))
+        segment = self.categorical(gen, self.segment_cum, batch_size)
+        sensor_ids = (self.segment_first[segment]
+                      + (gen.random(batch_size) * self.segment_size[segment]).astype(np.int64)).tolist()
+        types = self.categorical(gen, self.device_type_cum, batch_size)
+        locations = self.categorical(gen, self.location_cum, batch_size).tolist()
+        battery = gen.integers(10, 101, batch_size).tolist()
+        signal = gen.integers(-100, -29, batch_size).tolist()
+        firmware = gen.integers((1, 0, 0), (6, 10, 10), (batch_size, 3)).tolist()
+
+        device_types = [self.device_types[index] for index in types.tolist()]
+        sensor_data: List[Any] = [None] * batch_size
+        size_class = self.size_class[types]
+        for code, build in enumerate((self.small, self.medium, self.large, self.xlarge)):
+            indexes = np.flatnonzero(size_class == code).tolist()
+            if indexes:
+                names = [device_types[index] for index in indexes]
+                for index, data in zip(indexes, build(gen, names)):
+                    sensor_data[index] = data
+
+        now = datetime.utcnow()
+        batch = []
+        for index, location in enumerate(locations):
+            major, minor, patch = firmware[index]
+            batch.append({
+                'sensor_id': sensor_ids[index],
+                'device_type': device_types[index],
+                'location': self.locations[location],
+                'region': self.regions[location],
+                'timestamp': now,
+                'sensor_data': sensor_data[index],
+                'metadata': {
+                    'battery_level': battery[index],
+                    'signal_strength': signal[index],
+                    'firmware_version': f"v{major}.{minor}.{patch}"
+                }
+            })
+        return batch
+
+    def small(self, gen: Any, names: List[str]) -> List[Dict[str, Any]]:
+        values = np.round(gen.uniform(0, 100, len(names)), 2).tolist()
+        return [{'value': value, 'unit': 'celsius' if name == 'temperature' else 'percent'}
+                for value, name in zip(values, names)]
+
+    def medium(self, gen: Any, names: List[str]) -> List[Dict[str, Any]]:
+        n = len(names)
+        values = np.round(gen.uniform(900, 1100, n), 2).tolist()
+        offsets = gen.uniform(-0.5, 0.5, n).tolist()
+        scales = gen.uniform(0.98, 1.02, n).tolist()
+        return [{'value': value, 'unit': 'hPa', 'calibration': {'offset': offset, 'scale': scale}}
+                for value, offset, scale in zip(values, offsets, scales)]
+
+    def large(self, gen: Any, names: List[str]) -> List[Dict[str, Any]]:
+        n = len(names)
+        axes = gen.uniform(-10, 10, (n, 3, 100)).tolist()
+        frequencies = gen.integers(1000, 5001, n).tolist()
+        amplitudes = gen.uniform(0.1, 2.0, n).tolist()
+        return [{'x_axis': x, 'y_axis': y, 'z_axis': z, 'frequency': frequency, 'amplitude': amplitude}
+                for (x, y, z), frequency, amplitude in zip(axes, frequencies, amplitudes)]
+
+    def xlarge(self, gen: Any, names: List[str]) -> List[Dict[str, Any]]:
+        n = len(names)
+        size_bytes = gen.integers(500000, 2000001, n).tolist()
+        objects = gen.integers(0, 11, n).tolist()
+        score_counts = gen.integers(1, 6, n)
+        scores = gen.uniform(0.5, 1.0, int(score_counts.sum())).tolist()
+        score_ends = np.cumsum(score_counts).tolist()
+        processing = gen.integers(100, 1001, n).tolist()
+        lengths = gen.integers(1000, 5001, n).tolist()
+        documents = []
+        start = 0
+        for index in range(n):
+            end = score_ends[index]
+            documents.append({
+                'image_metadata': {'resolution': '1920x1080', 'format': 'jpeg', 'size_bytes': size_bytes[index]},
+                'analysis': {
+                    'objects_detected': objects[index],
+                    'confidence_scores': scores[start:end],
+                    'processing_time_ms': processing[index]
+                },
+                'raw_data': self.payloads.get(lengths[index])
+            })
+            start = end
+        return documents
+
+
+def benchmark(generators: Dict[str, Callable[[Any, int], List[Dict[str, Any]]]], rng_factory: Callable[[], Any],
+              batches: int = 200, batch_size: int = 50) -> Dict[str, float]:
+    """Documents per second of each batch generator over the same number of batches"""
+    results = {}
+    for name, generate in generators.items():
+        rng = rng_factory()
+        started = time.perf_counter()
+        for _ in range(batches):
+            generate(rng, batch_size)
+        results[name] = batches * batch_size / (time.perf_counter() - started)
+    return results
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+In-Process Fake MongoDB Cluster for the Sharding Imbalance Simulator
+Chunk ranges per shard key with splits and a simple balancer, pymongo-like API
+"""
+
+import time
+import bisect
+import struct
+import hashlib
+import itertools
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    from bson import ObjectId
+except ImportError:  # Only needed for DB_DRIVER=mongo
+    ObjectId = None
+
+# Shard key of each sharded collection; the rest are unsharded and live on the primary shard
+SHARD_KEYS = {
+    'sensor_readings': 'sensor_id',
+    'device_metadata': 'device_id',
+    'aggregated_metrics': 'timestamp',
+    'aggregated_metrics_hashed': 'hashed:timestamp',
+    'aggregated_metrics_bucketed': 'bucket,timestamp',
+}
+
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+
+def hashed_value(value: Any) -> int:
+    """Signed 64-bit hash of a shard key value, from its MD5 like MongoDB's hashed indexes"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    digest = hashlib.md5(repr(value).encode('utf-8')).digest()
+    return struct.unpack('<q', digest[:8])[0]
+
+
+class ShardKey:
+    """Shard key from a spec: 'sensor_id', 'sensor_id,timestamp' or 'hashed:sensor_id'"""
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        self.hashed = spec.startswith('hashed:')
+        self.fields = tuple(field.strip() for field in spec.split(':', 1)[-1].split(','))
+        if self.hashed and len(self.fields) != 1:
+            raise ValueError(f"Hashed shard key must have a single field: {spec}")
+
+    def value(self, document: Dict[str, Any]) -> Any:
+        try:
+            values = tuple(document[field] for field in self.fields)
+        except KeyError as e:
+            raise ValueError(f"Document has no shard key field {e} for {self.spec}") from None
+        if self.hashed:
+            return hashed_value(values[0])
+        return values[0] if len(values) == 1 else values
+
+
+class Chunk:
+    """Shard key range [min, max); None stands for MinKey/MaxKey"""
+
+    def __init__(self, min_key: Any, max_key: Any, shard: str):
+        self.min = min_key
+        self.max = max_key
+        self.shard = shard
+        self.keys: List[Any] = []
+
+    def contains(self, key: Any) -> bool:
+        return (self.min is None or key >= self.min) and (self.max is None or key < self.max)
+
+
+def initial_chunks(shard_key: Optional[ShardKey], shards: List[str]) -> List[Chunk]:
+    """One chunk on the first shard, or for a hashed key two per shard over the hash range like shardCollection"""
+    if not shard_key or not shard_key.hashed:
+        return [Chunk(None, None, shards[0])]
+    count = 2 * len(shards)
+    step = (INT64_MAX - INT64_MIN) // count
+    bounds = [None] + [INT64_MIN + step * i for i in range(1, count)] + [None]
+    return [Chunk(bounds[i], bounds[i + 1], shards[i % len(shards)]) for i in range(count)]
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids: List[Any]):
+        self.inserted_ids = inserted_ids
+
+
+class UpdateResult:
+    def __init__(self, matched_count: int, modified_count: int, upserted_id: Any = None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+
+class BulkWriteResult:
+    def __init__(self, matched_count: int, modified_count: int, upserted_ids: Dict[int, Any]):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_ids = upserted_ids
+        self.upserted_count = len(upserted_ids)
+
+
+class ReplaceOne:
+    """Stand-in for pymongo.ReplaceOne when pymongo is not installed (same attribute names)"""
+
+    def __init__(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False):
+        self._filter = filter
+        self._doc = replacement
+        self._upsert = upsert
+
+
+class FakeCollection:
+    """Documents plus, for sharded collections, the chunk ranges they fall in.
+
+    A chunk that reaches `chunk_max_docs` documents is split at its median
+    shard key; both halves stay on the same shard, as in MongoDB. When the
+    balancer is on, after each split one chunk is migrated from the shard
+    with the most chunks to the one with the fewest once they differ by
+    `migration_threshold`, so chunk counts even out while a hot key range
+    keeps landing on whichever shard owns it.
+    """
+
+    def __init__(self, cluster: 'FakeMongoCluster', name: str):
+        self.cluster = cluster
+        self.name = name
+        self.lock = threading.RLock()
+        self.docs: Dict[Any, Dict[str, Any]] = {}
+        self.shard_key = ShardKey(SHARD_KEYS[name]) if name in SHARD_KEYS else None
+        self.by_shard_key: Dict[Any, List[Any]] = {}
+        self.chunks = initial_chunks(self.shard_key, cluster.shards)
+        self.splits = 0
+        self.migrations = 0
+        self.writes_per_shard = {shard: 0 for shard in cluster.shards}
+
+    # pymongo API
+
+    def insert_one(self, document: Dict[str, Any]):
+        return InsertManyResult(self.insert_many([document]).inserted_ids)
+
+    def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True) -> InsertManyResult:
+        self.cluster.round_trip()
+        inserted = []
+        with self.lock:
+            for document in documents:
+                document.setdefault('_id', self.cluster.new_id())
+                self._store(document)
+                inserted.append(document['_id'])
+        return InsertManyResult(inserted)
+
+    def replace_one(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        self.cluster.round_trip()
+        with self.lock:
+            return self._replace(filter, replacement, upsert)
+
+    def bulk_write(self, requests: List[Any], ordered: bool = True) -> BulkWriteResult:
+        """ReplaceOne operations (pymongo's or the stand-in above) in a single round trip"""
+        self.cluster.round_trip()
+        matched, upserted = 0, {}
+        with self.lock:
+            for index, request in enumerate(requests):
+                result = self._replace(request._filter, request._doc, request._upsert)
+                matched += result.matched_count
+                if result.upserted_id is not None:
+                    upserted[index] = result.upserted_id
+        return BulkWriteResult(matched, matched, upserted)
+
+    def count_documents(self, filter: Dict[str, Any]) -> int:
+        with self.lock:
+            return len(self._find_ids(filter))
+
+    def find(self, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [dict(self.docs[doc_id]) for doc_id in self._find_ids(filter or {})]
+
+    def delete_many(self, filter: Dict[str, Any]):
+        with self.lock:
+            for doc_id in self._find_ids(filter):
+                self._remove(doc_id)
+
+    # Sharding
+
+    def chunk_for(self, key: Any) -> Chunk:
+        mins = [chunk.min for chunk in self.chunks[1:]]
+        return self.chunks[bisect.bisect_right(mins, key)]
+
+    def distribution(self) -> Dict[str, Dict[str, int]]:
+        """Chunks, documents and writes per shard, like sh.status() / getShardDistribution()"""
+        with self.lock:
+            stats = {shard: {'chunks': 0, 'docs': 0, 'writes': self.writes_per_shard[shard]}
+                     for shard in self.cluster.shards}
+            for chunk in self.chunks:
+                stats[chunk.shard]['chunks'] += 1
+                stats[chunk.shard]['docs'] += len(chunk.keys)
+            return stats
+
+    def _store(self, document: Dict[str, Any]):
+        self.docs[document['_id']] = document
+        if not self.shard_key:
+            self.writes_per_shard[self.cluster.shards[0]] += 1
+            return
+        key = self.shard_key.value(document)
+        self.by_shard_key.setdefault(key, []).append(document['_id'])
+        chunk = self.chunk_for(key)
+        bisect.insort(chunk.keys, key)
+        self.writes_per_shard[chunk.shard] += 1
+        if len(chunk.keys) >= self.cluster.chunk_max_docs:
+            self._split(chunk)
+
+    def _replace(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool) -> UpdateResult:
+        matches = self._find_ids(filter)
+        if matches:
+            doc_id = matches[0]
+            self._remove(doc_id)
+            self._store({**replacement, '_id': doc_id})
+            return UpdateResult(1, 1)
+        if not upsert:
+            return UpdateResult(0, 0)
+        document = {**filter, **replacement}
+        document.setdefault('_id', self.cluster.new_id())
+        self._store(document)
+        return UpdateResult(0, 0, document['_id'])
+
+    def _remove(self, doc_id: Any):
+        document = self.docs.pop(doc_id)
+        if not self.shard_key:
+            return
+        key = self.shard_key.value(document)
+        self.by_shard_key[key].remove(doc_id)
+        chunk = self.chunk_for(key)
+        chunk.keys.pop(bisect.bisect_left(chunk.keys, key))
+
+    def _split(self, chunk: Chunk):
+        median = chunk.keys[len(chunk.keys) // 2]
+        if median == chunk.keys[0]:
+            return  # Jumbo chunk: every document has the same shard key
+        right = Chunk(median, chunk.max, chunk.shard)
+        split_at = bisect.bisect_left(chunk.keys, median)
+        right.keys, chunk.keys = chunk.keys[split_at:], chunk.keys[:split_at]
+        chunk.max = median
+        self.chunks.insert(self.chunks.index(chunk) + 1, right)
+        self.splits += 1
+        if self.cluster.balancer:
+            self._balance()
+
+    def _balance(self):
+        counts = {shard: 0 for shard in self.cluster.shards}
+        for chunk in self.chunks:
+            counts[chunk.shard] += 1
+        donor = max(counts, key=counts.get)
+        recipient = min(counts, key=counts.get)
+        if counts[donor] - counts[recipient] >= self.cluster.migration_threshold:
+            moved = next(chunk for chunk in self.chunks if chunk.shard == donor)
+            moved.shard = recipient
+            self.migrations += 1
+
+    def _find_ids(self, filter: Dict[str, Any]) -> List[Any]:
+        if not filter:
+            return list(self.docs)
+        if self.shard_key and set(filter) == set(self.shard_key.fields):
+            return list(self.by_shard_key.get(self.shard_key.value(filter), []))
+        if '_id' in filter and len(filter) == 1:
+            return [filter['_id']] if filter['_id'] in self.docs else []
+        return [doc_id for doc_id, document in self.docs.items()
+                if all(document.get(field) == value for field, value in filter.items())]
+
+
+class FakeDatabase:
+    def __init__(self, cluster: 'FakeMongoCluster'):
+        self.cluster = cluster
+        self.collections: Dict[str, FakeCollection] = {}
+        self.lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        with self.lock:
+            if name not in self.collections:
+                self.collections[name] = FakeCollection(self.cluster, name)
+            return self.collections[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+
+class FakeMongoCluster:
+    """Stand-in for a mongos-fronted sharded cluster, shared by every client of a process"""
+
+    def __init__(self, shards: int = 3, chunk_max_docs: int = 1000, balancer: bool = True,
+                 migration_threshold: int = 2, latency: float = 0.001):
+        self.shards = [f"shard{i + 1:02d}" for i in range(shards)]
+        self.chunk_max_docs = chunk_max_docs
+        self.balancer = balancer
+        self.migration_threshold = migration_threshold
+        self.latency = latency
+        self.databases: Dict[str, FakeDatabase] = {}
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+
+    def __getitem__(self, name: str) -> FakeDatabase:
+        with self.lock:
+            if name not in self.databases:
+                self.databases[name] = FakeDatabase(self)
+            return self.databases[name]
+
+    def new_id(self):
+        return ObjectId() if ObjectId else next(self.ids)
+
+    def round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
@@ -4,15 +4,31 @@ Simulador de Datos Desbalanceados para MongoDB Sharding
 Genera patrones que causan hotspots y desbalance en el cluster
 """
 
-import pymongo
+try:
+    import pymongo
+    from pymongo import ReplaceOne
+except ImportError:  # Solo necesario con DB_DRIVER=mongo
+    pymongo = None
+    from fake_mongo import ReplaceOne
 import threading
 import time
 import random
 import logging
 import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 import json
 
+from prometheus_client import start_http_server
+
+from fake_mongo import FakeMongoCluster
+from process_launcher import ProcessLauncher, owns, per_process_path, process_count, process_index
+from batch_generator import benchmark, np
+from sensor_documents import SensorReadingGenerator
+from shard_write_monitor import ShardWriteMonitor
+from workload_trace import OperationSeeds, TraceWriter
+from trace_replay import TraceReplayer, load_transactions
+
 # Configuración de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -28,6 +44,9 @@ class ShardingImbalanceSimulator:
         self.mongo_host = os.getenv('MONGO_HOST', 'mongos-router')
         self.mongo_port = int(os.getenv('MONGO_PORT', 27017))
         self.db_name = os.getenv('MONGO_DB', 'sensornet_db')
+        # Credenciales opcionales (el docker-compose del escenario levanta mongod con usuario root)
+        self.mongo_user = os.getenv('MONGO_USER', '')
+        self.mongo_pass = os.getenv('MONGO_PASS', '')
         
         # Configuración del problema
         self.hotspot_start = int(os.getenv('HOTSPOT_SENSOR_RANGE_START', 1000))
@@ -36,278 +55,486 @@ class ShardingImbalanceSimulator:
         self.total_sensors = int(os.getenv('TOTAL_SENSORS', 10000))
         self.readings_per_second = int(os.getenv('READINGS_PER_SECOND', 100))
         
-        self.running = True
+        # Escritura en pipeline: SENSOR_INFLIGHT_BATCHES batches de insert_many en vuelo por generador.
+        # Con más de uno, cada slot del pipeline va a la traza como su propio worker
+        # (id = worker_id * SENSOR_INFLIGHT_BATCHES + slot): así los begin/end de batches solapados
+        # no se cruzan, y el replay reproduce cada slot como un carril aparte
+        self.sensor_batch_size = int(os.getenv('SENSOR_BATCH_SIZE', 50))
+        self.sensor_inflight_batches = max(1, int(os.getenv('SENSOR_INFLIGHT_BATCHES', 1)))
+        # Atraso máximo (segundos) que se intenta recuperar escribiendo sin pausa antes de resincronizar
+        self.sensor_max_lag = float(os.getenv('SENSOR_MAX_LAG', 5))
         
-        # Tipos de dispositivos con diferentes patrones
-        self.device_types = {
-            'temperature': {'weight': 0.4, 'data_size': 'small'},
-            'humidity': {'weight': 0.3, 'data_size': 'small'},
-            'pressure': {'weight': 0.15, 'data_size': 'medium'},
-            'vibration': {'weight': 0.1, 'data_size': 'large'},
-            'camera': {'weight': 0.05, 'data_size': 'xlarge'}
+        # Un único MongoClient por proceso, compartido por todos los workers
+        self.client = None
+        self.client_lock = threading.Lock()
+        self.pool_options = {
+            'maxPoolSize': int(os.getenv('MONGO_MAX_POOL_SIZE', 50)),
+            'minPoolSize': int(os.getenv('MONGO_MIN_POOL_SIZE', 5)),
+            'maxIdleTimeMS': int(os.getenv('MONGO_MAX_IDLE_MS', 60000)),
+            'waitQueueTimeoutMS': int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 10000)),
         }
+        if self.mongo_user:
+            self.pool_options.update(username=self.mongo_user, password=self.mongo_pass)
         
-        # Ubicaciones geográficas (algunas más activas)
-        self.locations = {
-            'datacenter_1': {'weight': 0.5, 'region': 'us-east'},
-            'datacenter_2': {'weight': 0.25, 'region': 'us-west'},
-            'datacenter_3': {'weight': 0.15, 'region': 'eu-west'},
-            'datacenter_4': {'weight': 0.1, 'region': 'asia-pacific'}
-        }
+        # DB_DRIVER=fake usa un cluster en memoria con rangos de chunks por shard (sin docker-compose)
+        self.fake_cluster = None
+        if os.getenv('DB_DRIVER', 'mongo') == 'fake':
+            self.fake_cluster = FakeMongoCluster(
+                shards=int(os.getenv('FAKE_SHARDS', 3)),
+                chunk_max_docs=int(os.getenv('FAKE_CHUNK_MAX_DOCS', 1000)),
+                balancer=os.getenv('FAKE_BALANCER', 'true').lower() == 'true',
+                latency=float(os.getenv('FAKE_LATENCY', 0.001))
+            )
         
-    def get_connection(self):
-        """Obtiene conexión a MongoDB"""
-        client = pymongo.MongoClient(self.mongo_host, self.mongo_port)
-        return client[self.db_name]
-    
-    def generate_sensor_reading(self):
-        """Genera una lectura de sensor con patrón problemático"""
+        # Semilla por worker y traza de operaciones (SIMULATION_SEED, TRACE_FILE) para poder reproducir la carga
+        seed = int(os.environ['SIMULATION_SEED']) if os.getenv('SIMULATION_SEED') else None
+        trace_file = per_process_path(os.getenv('TRACE_FILE', ''))
+        self.seeds = OperationSeeds(seed, TraceWriter(trace_file, seed) if trace_file else None)
         
-        # PATRÓN PROBLEMÁTICO: 80% de los datos en el rango hotspot
-        if random.random() < self.hotspot_probability:
-            sensor_id = random.randint(self.hotspot_start, self.hotspot_end)
-        else:
-            # 20% distribuido en el resto
-            sensor_id = random.randint(1, self.total_sensors)
-            if self.hotspot_start <= sensor_id <= self.hotspot_end:
-                # Evitar el rango hotspot en el 20%
-                sensor_id = random.randint(self.hotspot_end + 1, self.total_sensors)
+        # Replay de una traza grabada (REPLAY_SPEED=0 la reproduce lo más rápido posible)
+        self.replay_file = os.getenv('REPLAY_FILE', '')
+        self.replay_speed = float(os.getenv('REPLAY_SPEED', 1))
+        self.replay_parallelism = int(os.getenv('REPLAY_PARALLELISM', 0))
         
-        # Seleccionar tipo de dispositivo (algunos generan más datos)
-        device_type = random.choices(
-            list(self.device_types.keys()),
-            weights=[info['weight'] for info in self.device_types.values()]
-        )[0]
+        self.running = True
         
-        # Seleccionar ubicación (algunas más activas)
-        location = random.choices(
-            list(self.locations.keys()),
-            weights=[info['weight'] for info in self.locations.values()]
-        )[0]
+        # Colección de aggregated_metrics según el diseño de shard key
+        self.metrics_collections = {
+            'monotonic': 'aggregated_metrics',
+            'hashed': 'aggregated_metrics_hashed',
+            'bucketed': 'aggregated_metrics_bucketed'
+        }
         
-        # Generar datos según el tipo de dispositivo
-        data_size = self.device_types[device_type]['data_size']
+        # GENERATION_MODE=batch sortea sensor_id, tipo y ubicación de todo el batch de una vez;
+        # 'numpy' genera además los datos de cada lectura con arrays de NumPy (requiere numpy);
+        # 'document' (por defecto) mantiene la secuencia de sorteos original, compatible con trazas ya grabadas
+        self.generation_mode = os.getenv('GENERATION_MODE', 'document')
+        # Los documentos de sensor_readings salen de sensor_documents (importable sin efectos, lo usa
+        # también shard_key_analyzer); tipos de dispositivo y ubicaciones con sus pesos viven allí
+        self.documents = SensorReadingGenerator(self.hotspot_start, self.hotspot_end, self.total_sensors,
+                                                self.hotspot_probability, self.generation_mode)
+        self.device_types = self.documents.device_types
+        self.locations = self.documents.locations
+        self.device_type_names = tuple(self.device_types)
+        self.location_names = tuple(self.locations)
+        # GENERATION_BENCHMARK=N mide documentos/seg de cada modo de generación sobre N batches y termina
+        self.generation_benchmark = int(os.getenv('GENERATION_BENCHMARK', 0))
         
-        if data_size == 'small':
-            sensor_data = {
-                'value': round(random.uniform(0, 100), 2),
-                'unit': 'celsius' if device_type == 'temperature' else 'percent'
-            }
-        elif data_size == 'medium':
-            sensor_data = {
-                'value': round(random.uniform(900, 1100), 2),
-                'unit': 'hPa',
-                'calibration': {
-                    'offset': random.uniform(-0.5, 0.5),
-                    'scale': random.uniform(0.98, 1.02)
-                }
-            }
-        elif data_size == 'large':
-            sensor_data = {
-                'x_axis': [random.uniform(-10, 10) for _ in range(100)],
-                'y_axis': [random.uniform(-10, 10) for _ in range(100)],
-                'z_axis': [random.uniform(-10, 10) for _ in range(100)],
-                'frequency': random.randint(1000, 5000),
-                'amplitude': random.uniform(0.1, 2.0)
-            }
-        else:  # xlarge
-            sensor_data = {
-                'image_metadata': {
-                    'resolution': '1920x1080',
-                    'format': 'jpeg',
-                    'size_bytes': random.randint(500000, 2000000)
-                },
-                'analysis': {
-                    'objects_detected': random.randint(0, 10),
-                    'confidence_scores': [random.uniform(0.5, 1.0) for _ in range(random.randint(1, 5))],
-                    'processing_time_ms': random.randint(100, 1000)
-                },
-                'raw_data': 'x' * random.randint(1000, 5000)  # Simular datos grandes
-            }
+        # METADATA_WRITE_MODE=bulk envía los upserts de metadatos en un solo bulk_write desordenado
+        # (device_id repetidos deduplicados); 'per_document' (por defecto) hace un replace_one por dispositivo
+        self.metadata_write_mode = os.getenv('METADATA_WRITE_MODE', 'per_document')
+        self.metadata_batch_size = int(os.getenv('METADATA_BATCH_SIZE', 100))
         
-        return {
-            'sensor_id': sensor_id,
-            'device_type': device_type,
-            'location': location,
-            'region': self.locations[location]['region'],
-            'timestamp': datetime.utcnow(),
-            'sensor_data': sensor_data,
-            'metadata': {
-                'battery_level': random.randint(10, 100),
-                'signal_strength': random.randint(-100, -30),
-                'firmware_version': f"v{random.randint(1, 5)}.{random.randint(0, 9)}.{random.randint(0, 9)}"
-            }
-        }
+        # METRICS_INGEST_MODE=timeseries emite métricas continuamente (METRICS_PER_SECOND) en lugar de
+        # 20 resúmenes por hora; METRICS_KEY_LAYOUTS elige la colección (y su shard key) donde se escriben:
+        # monotonic (timestamp), hashed (timestamp hasheado) y/o bucketed (bucket + timestamp)
+        self.metrics_ingest_mode = os.getenv('METRICS_INGEST_MODE', 'hourly')
+        self.metrics_per_second = float(os.getenv('METRICS_PER_SECOND', 200))
+        self.metrics_buckets = int(os.getenv('METRICS_BUCKETS', 16))
+        self.metrics_key_layouts = [
+            layout.strip() for layout in os.getenv('METRICS_KEY_LAYOUTS', 'monotonic').split(',') if layout.strip()
+        ]
+        
+        # Tasa de escritura por shard exportada en METRICS_PORT (WRITE_MONITOR_INTERVAL=0 la desactiva)
+        self.metrics_port = int(os.getenv('METRICS_PORT', 8000))
+        self.write_monitor_interval = float(os.getenv('WRITE_MONITOR_INTERVAL', 15))
+        self.write_monitor = None
+        
+    def get_connection(self):
+        """Obtiene conexión a MongoDB"""
+        if self.fake_cluster:
+            return self.fake_cluster[self.db_name]
+        with self.client_lock:
+            if self.client is None:
+                # El pool reutiliza conexiones a mongos entre workers en lugar de abrir un cliente por thread
+                self.client = pymongo.MongoClient(self.mongo_host, self.mongo_port, **self.pool_options)
+        return self.client[self.db_name]
+    
+    def generate_sensor_batch(self, rng, batch_size, mode=None):
+        """Genera un batch de lecturas; en modo batch sortea cada columna entera de una vez"""
+        return self.documents.generate_batch(rng, batch_size, mode)
+    
+    def run_operation(self, worker_type, worker_id, operation, rng):
+        """Ejecuta una operación con su propio RNG sembrado y registra inicio y resultado en la traza"""
+        op_rng = self.seeds.begin(worker_type, worker_id, rng)
+        outcome = operation(worker_id, op_rng)
+        self.seeds.end(worker_type, worker_id, outcome)
+        return outcome
     
     def sensor_data_generator(self, worker_id):
         """Genera datos de sensores continuamente"""
         db = self.get_connection()
-        collection = db.sensor_readings
+        rng = self.seeds.worker('sensor_data', worker_id)
+        batch_size = self.sensor_batch_size
+        in_flight_limit = self.sensor_inflight_batches
+        interval = batch_size / self.readings_per_second
+        operation = lambda _, op_rng: self.insert_sensor_batch(db, worker_id, op_rng, batch_size)
         
-        batch_size = 50
-        batch = []
+        pipeline = None
+        if in_flight_limit > 1:
+            pipeline = ThreadPoolExecutor(max_workers=in_flight_limit, thread_name_prefix=f"DataWriter-{worker_id}")
+        in_flight = {}  # future -> slot
+        free_slots = list(range(in_flight_limit))
+        started = next_due = last_report = time.monotonic()
+        batches = 0
         
         while self.running:
-            try:
-                # Generar batch de lecturas
-                for _ in range(batch_size):
-                    reading = self.generate_sensor_reading()
-                    batch.append(reading)
-                
-                # Insertar batch
-                result = collection.insert_many(batch)
-                logging.info(f"DataGenerator {worker_id}: Insertadas {len(result.inserted_ids)} lecturas")
-                
-                batch = []  # Limpiar batch
-                
-                # Controlar velocidad de inserción
-                time.sleep(batch_size / self.readings_per_second)
-                
-            except Exception as e:
-                logging.error(f"DataGenerator {worker_id}: Error - {e}")
+            if pipeline:
+                # Con el pipeline lleno se espera al primer batch que termine
+                outcomes = []
+                if not free_slots:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    outcomes = [future.result() for future in done]
+                    free_slots.extend(in_flight.pop(future) for future in done)
+                slot = free_slots.pop()
+                future = pipeline.submit(self.run_operation, 'sensor_data', worker_id * in_flight_limit + slot,
+                                         operation, rng)
+                in_flight[future] = slot
+            else:
+                outcomes = [self.run_operation('sensor_data', worker_id, operation, rng)]
+            batches += 1
+            
+            if any(outcome != 'success' for outcome in outcomes):
                 time.sleep(5)
+                next_due = time.monotonic()
+                continue
+            
+            # Controlar velocidad de inserción: se descuenta el tiempo de escritura de la pausa
+            next_due += interval
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif -delay > self.sensor_max_lag:
+                next_due = time.monotonic()
+            
+            now = time.monotonic()
+            if now - last_report >= 60:
+                logging.info(
+                    f"DataGenerator {worker_id}: {batches * batch_size / (now - started):.0f} lecturas/s "
+                    f"(objetivo {self.readings_per_second}, {len(in_flight)} batches en vuelo)"
+                )
+                last_report = now
+        
+        if pipeline:
+            pipeline.shutdown(wait=True)
+    
+    def insert_sensor_batch(self, db, worker_id, rng, batch_size=50):
+        """Genera e inserta un batch de lecturas"""
+        try:
+            # Generar batch de lecturas
+            batch = self.generate_sensor_batch(rng, batch_size)
+            
+            # Insertar batch
+            # Desordenado: mongos reparte el batch entre shards en paralelo y un error no corta el resto
+            result = db.sensor_readings.insert_many(batch, ordered=False)
+            logging.info(f"DataGenerator {worker_id}: Insertadas {len(result.inserted_ids)} lecturas")
+            return 'success'
+            
+        except Exception as e:
+            logging.error(f"DataGenerator {worker_id}: Error - {e}")
+            return 'error'
     
     def device_metadata_generator(self, worker_id):
         """Genera y actualiza metadatos de dispositivos"""
         db = self.get_connection()
-        collection = db.device_metadata
+        rng = self.seeds.worker('device_metadata', worker_id)
         
         while self.running:
-            try:
-                # Generar metadatos para dispositivos en el rango hotspot
-                devices_batch = []
+            outcome = self.run_operation(
+                'device_metadata', worker_id,
+                lambda wid, op_rng: self.upsert_device_metadata(db, wid, op_rng), rng
+            )
+            # Pausa entre actualizaciones
+            time.sleep(300 if outcome == 'success' else 30)  # 5 minutos
+    
+    def upsert_device_metadata(self, db, worker_id, rng):
+        """Genera y hace upsert de un batch de metadatos de dispositivos"""
+        collection = db.device_metadata
+        try:
+            # Generar metadatos para dispositivos en el rango hotspot
+            devices_batch = []
+            
+            for _ in range(self.metadata_batch_size):
+                # PROBLEMA: Concentrar metadatos en el mismo rango problemático
+                if rng.random() < 0.7:
+                    device_id = rng.randint(self.hotspot_start, self.hotspot_end)
+                else:
+                    device_id = rng.randint(1, self.total_sensors)
                 
-                for _ in range(100):
-                    # PROBLEMA: Concentrar metadatos en el mismo rango problemático
-                    if random.random() < 0.7:
-                        device_id = random.randint(self.hotspot_start, self.hotspot_end)
-                    else:
-                        device_id = random.randint(1, self.total_sensors)
-                    
-                    device_type = random.choice(list(self.device_types.keys()))
-                    location = random.choice(list(self.locations.keys()))
-                    
-                    device_metadata = {
-                        'device_id': device_id,
-                        'device_type': device_type,
-                        'location': location,
-                        'region': self.locations[location]['region'],
-                        'installation_date': datetime.utcnow() - timedelta(days=random.randint(1, 365)),
-                        'last_maintenance': datetime.utcnow() - timedelta(days=random.randint(1, 90)),
-                        'specifications': {
-                            'model': f"Model-{device_type.upper()}-{random.randint(100, 999)}",
-                            'manufacturer': random.choice(['SensorTech', 'IoTCorp', 'DataDevices']),
-                            'power_consumption': random.uniform(0.5, 5.0),
-                            'operating_range': {
-                                'min_temp': random.randint(-40, 0),
-                                'max_temp': random.randint(50, 85),
-                                'humidity_tolerance': random.randint(0, 95)
-                            }
-                        },
-                        'status': random.choice(['active', 'maintenance', 'offline']),
-                        'last_updated': datetime.utcnow()
-                    }
-                    
-                    devices_batch.append(device_metadata)
+                device_type = rng.choice(self.device_type_names)
+                location = rng.choice(self.location_names)
                 
-                # Upsert batch de metadatos
+                device_metadata = {
+                    'device_id': device_id,
+                    'device_type': device_type,
+                    'location': location,
+                    'region': self.locations[location]['region'],
+                    'installation_date': datetime.utcnow() - timedelta(days=rng.randint(1, 365)),
+                    'last_maintenance': datetime.utcnow() - timedelta(days=rng.randint(1, 90)),
+                    'specifications': {
+                        'model': f"Model-{device_type.upper()}-{rng.randint(100, 999)}",
+                        'manufacturer': rng.choice(['SensorTech', 'IoTCorp', 'DataDevices']),
+                        'power_consumption': rng.uniform(0.5, 5.0),
+                        'operating_range': {
+                            'min_temp': rng.randint(-40, 0),
+                            'max_temp': rng.randint(50, 85),
+                            'humidity_tolerance': rng.randint(0, 95)
+                        }
+                    },
+                    'status': rng.choice(['active', 'maintenance', 'offline']),
+                    'last_updated': datetime.utcnow()
+                }
+                
+                devices_batch.append(device_metadata)
+            
+            # Upsert batch de metadatos
+            started = time.monotonic()
+            if self.metadata_write_mode == 'bulk':
+                # El hotspot repite device_id: solo cuenta la última versión de cada dispositivo
+                latest = {device['device_id']: device for device in devices_batch}
+                operations = [
+                    ReplaceOne({'device_id': device_id}, device, upsert=True)
+                    for device_id, device in latest.items()
+                ]
+                collection.bulk_write(operations, ordered=False)
+            else:
+                operations = devices_batch
                 for device in devices_batch:
                     collection.replace_one(
                         {'device_id': device['device_id']},
                         device,
                         upsert=True
                     )
-                
-                logging.info(f"MetadataGenerator {worker_id}: Actualizados {len(devices_batch)} dispositivos")
-                
-                # Pausa entre actualizaciones
-                time.sleep(300)  # 5 minutos
-                
-            except Exception as e:
-                logging.error(f"MetadataGenerator {worker_id}: Error - {e}")
-                time.sleep(30)
+            elapsed = time.monotonic() - started
+            
+            rate = len(operations) / elapsed if elapsed > 0 else 0.0
+            logging.info(
+                f"MetadataGenerator {worker_id}: Actualizados {len(operations)} dispositivos "
+                f"({len(devices_batch) - len(operations)} repetidos descartados, {rate:.0f} ops/s)"
+            )
+            return 'success'
+            
+        except Exception as e:
+            logging.error(f"MetadataGenerator {worker_id}: Error - {e}")
+            return 'error'
     
     def aggregated_metrics_generator(self, worker_id):
-        """Genera métricas agregadas por hora"""
+        """Genera métricas agregadas por hora (o continuamente en modo timeseries)"""
         db = self.get_connection()
-        collection = db.aggregated_metrics
+        rng = self.seeds.worker('aggregated_metrics', worker_id)
+        # Cada operación inserta un resumen por tipo de dispositivo y ubicación
+        interval = len(self.device_types) * len(self.locations) / self.metrics_per_second
+        next_due = time.monotonic()
         
         while self.running:
-            try:
-                # Generar métricas agregadas
-                current_hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
-                
-                metrics_batch = []
-                
-                # Métricas por tipo de dispositivo y ubicación
-                for device_type in self.device_types.keys():
-                    for location in self.locations.keys():
-                        # PROBLEMA: Timestamp monotónico causa hotspots temporales
-                        metric = {
-                            'timestamp': current_hour,
-                            'metric_type': 'hourly_summary',
-                            'device_type': device_type,
-                            'location': location,
-                            'region': self.locations[location]['region'],
-                            'metrics': {
-                                'total_readings': random.randint(100, 10000),
-                                'avg_value': random.uniform(10, 90),
-                                'min_value': random.uniform(0, 20),
-                                'max_value': random.uniform(80, 100),
-                                'error_count': random.randint(0, 50),
-                                'offline_devices': random.randint(0, 10)
-                            },
-                            'created_at': datetime.utcnow()
-                        }
-                        metrics_batch.append(metric)
-                
-                # Insertar métricas
-                result = collection.insert_many(metrics_batch)
-                logging.info(f"MetricsGenerator {worker_id}: Insertadas {len(result.inserted_ids)} métricas agregadas")
-                
+            outcome = self.run_operation(
+                'aggregated_metrics', worker_id,
+                lambda wid, op_rng: self.insert_aggregated_metrics(db, wid, op_rng), rng
+            )
+            if self.metrics_ingest_mode != 'timeseries':
                 # Esperar hasta la siguiente hora
-                time.sleep(3600)  # 1 hora
-                
-            except Exception as e:
-                logging.error(f"MetricsGenerator {worker_id}: Error - {e}")
-                time.sleep(300)
+                time.sleep(3600 if outcome == 'success' else 300)  # 1 hora
+                continue
+            if outcome != 'success':
+                time.sleep(5)
+                next_due = time.monotonic()
+                continue
+            next_due += interval
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif -delay > self.sensor_max_lag:
+                next_due = time.monotonic()
     
-    def start_simulation(self):
-        """Inicia la simulación de datos desbalanceados"""
-        logging.info("Iniciando simulación de sharding imbalance...")
+    def insert_timeseries_metrics(self, db, worker_id, rng):
+        """Inserta un resumen por tipo y ubicación con timestamp actual en cada diseño de shard key"""
+        try:
+            metrics_batch = []
+            for device_type in self.device_types.keys():
+                for location in self.locations.keys():
+                    # PROBLEMA: con shard key {timestamp: 1} todos caen en el chunk con MaxKey
+                    metrics_batch.append({
+                        'timestamp': datetime.utcnow(),
+                        'bucket': rng.randrange(self.metrics_buckets),
+                        'metric_type': 'timeseries',
+                        'device_type': device_type,
+                        'location': location,
+                        'region': self.locations[location]['region'],
+                        'metrics': {
+                            'readings': rng.randint(1, 100),
+                            'avg_value': rng.uniform(10, 90),
+                            'error_count': rng.randint(0, 5)
+                        }
+                    })
+            
+            for layout in self.metrics_key_layouts:
+                # Copias: insert_many añade _id a cada documento
+                db[self.metrics_collections[layout]].insert_many(
+                    [dict(metric) for metric in metrics_batch], ordered=False
+                )
+            return 'success'
+            
+        except Exception as e:
+            logging.error(f"MetricsGenerator {worker_id}: Error - {e}")
+            return 'error'
+    
+    def insert_aggregated_metrics(self, db, worker_id, rng):
+        """Inserta las métricas agregadas de la hora actual"""
+        if self.metrics_ingest_mode == 'timeseries':
+            return self.insert_timeseries_metrics(db, worker_id, rng)
+        collection = db.aggregated_metrics
+        try:
+            # Generar métricas agregadas
+            current_hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+            
+            metrics_batch = []
+            
+            # Métricas por tipo de dispositivo y ubicación
+            for device_type in self.device_types.keys():
+                for location in self.locations.keys():
+                    # PROBLEMA: Timestamp monotónico causa hotspots temporales
+                    metric = {
+                        'timestamp': current_hour,
+                        'metric_type': 'hourly_summary',
+                        'device_type': device_type,
+                        'location': location,
+                        'region': self.locations[location]['region'],
+                        'metrics': {
+                            'total_readings': rng.randint(100, 10000),
+                            'avg_value': rng.uniform(10, 90),
+                            'min_value': rng.uniform(0, 20),
+                            'max_value': rng.uniform(80, 100),
+                            'error_count': rng.randint(0, 50),
+                            'offline_devices': rng.randint(0, 10)
+                        },
+                        'created_at': datetime.utcnow()
+                    }
+                    metrics_batch.append(metric)
+            
+            # Insertar métricas
+            result = collection.insert_many(metrics_batch)
+            logging.info(f"MetricsGenerator {worker_id}: Insertadas {len(result.inserted_ids)} métricas agregadas")
+            return 'success'
+            
+        except Exception as e:
+            logging.error(f"MetricsGenerator {worker_id}: Error - {e}")
+            return 'error'
+    
+    def replay(self):
+        """Reproduce una traza grabada regenerando cada operación desde su semilla"""
+        db = self.get_connection()
+        operations = {
+            'sensor_data': lambda wid, rng: self.insert_sensor_batch(db, wid, rng, self.sensor_batch_size),
+            'device_metadata': lambda wid, rng: self.upsert_device_metadata(db, wid, rng),
+            'aggregated_metrics': lambda wid, rng: self.insert_aggregated_metrics(db, wid, rng)
+        }
+        transactions = load_transactions(self.replay_file, list(operations))
+        logging.info(f"Replay de {len(transactions)} operaciones desde {self.replay_file}")
+        replayer = TraceReplayer(
+            transactions,
+            lambda tx: operations[tx.worker_type](tx.worker_id, random.Random(tx.seed)),
+            speed=self.replay_speed,
+            parallelism=self.replay_parallelism
+        )
+        logging.info(f"Replay terminado: {replayer.run()}")
+        self.log_chunk_distribution()
+    
+    def benchmark_generation(self):
+        """Compara documentos/seg de la generación por documento, por batch y con NumPy"""
+        modes = ['document', 'batch'] + (['numpy'] if np else [])
+        if not np:
+            logging.warning("Benchmark sin modo numpy: numpy no está instalado")
+        generators = {
+            mode: lambda rng, size, mode=mode: self.generate_sensor_batch(rng, size, mode)
+            for mode in modes
+        }
+        results = benchmark(generators, lambda: random.Random(0), batches=self.generation_benchmark)
+        baseline = results['document']
+        for mode, rate in results.items():
+            logging.info(f"Generación {mode}: {rate:.0f} docs/s ({rate / baseline:.1f}x)")
+        return results
+    
+    def log_chunk_distribution(self):
+        """Distribución de chunks y documentos por shard del cluster en memoria"""
+        if not self.fake_cluster:
+            return
+        db = self.fake_cluster[self.db_name]
+        for name in ['sensor_readings', 'device_metadata'] + self.aggregated_collections():
+            collection = db[name]
+            shards = ", ".join(
+                f"{shard}: {stats['chunks']} chunks/{stats['docs']} docs/{stats['writes']} writes"
+                for shard, stats in collection.distribution().items()
+            )
+            logging.info(f"{name} (splits={collection.splits}, migraciones={collection.migrations}) - {shards}")
+    
+    def aggregated_collections(self):
+        """Colecciones donde escribe el generador de métricas agregadas"""
+        if self.metrics_ingest_mode != 'timeseries':
+            return ['aggregated_metrics']
+        return [self.metrics_collections[layout] for layout in self.metrics_key_layouts]
+    
+    def start_write_monitor(self):
+        """Arranca el monitor de escrituras por shard (con un cluster real, solo en el primer proceso)"""
+        if self.write_monitor_interval <= 0 or (not self.fake_cluster and process_index() != 0):
+            return
+        # Solo colecciones de solo inserts: con un cluster real la tasa sale de la variación del conteo
+        # de documentos por shard, y los upserts de device_metadata reemplazan sin cambiar ese conteo
+        collections = ['sensor_readings'] + self.aggregated_collections()
+        self.write_monitor = ShardWriteMonitor(self.get_connection(), collections, self.write_monitor_interval)
+        self.write_monitor.start()
+    
+    def log_write_rates(self):
+        """Escrituras por segundo de cada shard según el último muestreo del monitor"""
+        if not self.write_monitor:
+            return
+        for name, rates in self.write_monitor.summary().items():
+            total = sum(rates.values())
+            shards = ", ".join(
+                f"{shard}: {rate:.0f}/s ({rate / total:.0%})" if total else f"{shard}: 0/s"
+                for shard, rate in sorted(rates.items())
+            )
+            logging.info(f"Escrituras {name} - {shards}")
+    
+    def start_workers(self):
+        """Arranca los workers que le tocan a este proceso (todos si SIMULATOR_PROCESSES=1)"""
+        workers = (
+            # Generación de datos de sensores
+            [(self.sensor_data_generator, i, f"DataGenerator-{i}") for i in range(3)] +
+            # Metadatos de dispositivos y métricas agregadas
+            [(self.device_metadata_generator, 0, "MetadataGenerator-0"),
+             (self.aggregated_metrics_generator, 0, "MetricsGenerator-0")]
+        )
         
         threads = []
-        
-        # Crear threads de generación de datos de sensores
-        for i in range(3):
-            thread = threading.Thread(
-                target=self.sensor_data_generator,
-                args=(i,),
-                name=f"DataGenerator-{i}"
-            )
+        for index, (target, worker_id, name) in enumerate(workers):
+            if not owns(index):
+                continue
+            thread = threading.Thread(target=target, args=(worker_id,), name=name)
             thread.daemon = True
             threads.append(thread)
             thread.start()
+        return threads
+    
+    def stop_workers(self, threads):
+        """Detiene los workers y cierra la traza"""
+        self.running = False
         
-        # Crear thread de metadatos de dispositivos
-        thread = threading.Thread(
-            target=self.device_metadata_generator,
-            args=(0,),
-            name="MetadataGenerator-0"
-        )
-        thread.daemon = True
-        threads.append(thread)
-        thread.start()
+        # Esperar que terminen los threads
+        for thread in threads:
+            thread.join(timeout=10)
+        if self.write_monitor:
+            self.write_monitor.stop()
+        self.seeds.close()
+        if self.client:
+            self.client.close()
+    
+    def start_simulation(self):
+        """Inicia la simulación de datos desbalanceados"""
+        logging.info("Iniciando simulación de sharding imbalance...")
         
-        # Crear thread de métricas agregadas
-        thread = threading.Thread(
-            target=self.aggregated_metrics_generator,
-            args=(0,),
-            name="MetricsGenerator-0"
-        )
-        thread.daemon = True
-        threads.append(thread)
-        thread.start()
+        start_http_server(self.metrics_port)
+        threads = self.start_workers()
+        self.start_write_monitor()
         
         logging.info(f"Simulación iniciada - Generando datos desbalanceados")
         logging.info(f"Hotspot range: {self.hotspot_start}-{self.hotspot_end} ({self.hotspot_probability*100}% de datos)")
@@ -317,14 +544,34 @@ class ShardingImbalanceSimulator:
             while True:
                 time.sleep(60)
                 logging.info("Simulación activa - generando desbalance...")
+                self.log_chunk_distribution()
+                self.log_write_rates()
         except KeyboardInterrupt:
             logging.info("Deteniendo simulación...")
-            self.running = False
-            
-            # Esperar que terminen los threads
-            for thread in threads:
-                thread.join(timeout=10)
+            self.stop_workers(threads)
 
-if __name__ == "__main__":
+def run_worker_process(stop_event):
+    """Punto de entrada de cada proceso lanzado por ProcessLauncher"""
     simulator = ShardingImbalanceSimulator()
-    simulator.start_simulation()
+    threads = simulator.start_workers()
+    simulator.start_write_monitor()
+    logging.info(f"Proceso iniciado con {len(threads)} workers")
+    while not stop_event.wait(60):
+        logging.info("Simulación activa - generando desbalance...")
+        simulator.log_chunk_distribution()
+        simulator.log_write_rates()
+    simulator.stop_workers(threads)
+
+if __name__ == "__main__":
+    if process_count() > 1 and not os.getenv('REPLAY_FILE'):
+        # Reparte los workers entre SIMULATOR_PROCESSES procesos (un GIL por proceso)
+        ProcessLauncher(run_worker_process, metrics_port=int(os.getenv('METRICS_PORT', 8000)),
+                        name='sharding-simulator').run()
+    else:
+        simulator = ShardingImbalanceSimulator()
+        if simulator.generation_benchmark:
+            simulator.benchmark_generation()
+        elif simulator.replay_file:
+            simulator.replay()
+        else:
+            simulator.start_simulation()
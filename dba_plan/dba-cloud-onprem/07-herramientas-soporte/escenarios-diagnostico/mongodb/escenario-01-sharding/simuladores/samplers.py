@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Precomputed Samplers for the Sharding Imbalance Simulator
+Categorical and hotspot sensor-id draws built once, with single and batch sampling
+"""
+
+import bisect
+from itertools import accumulate
+from typing import Any, Dict, List, Sequence
+
+
+class WeightedSampler:
+    """Categorical draw over {key: weight}, with cumulative weights computed once.
+
+    sample() makes the same single random() call and bisect that
+    random.choices() makes, so it returns exactly what
+    rng.choices(keys, weights)[0] would, without rebuilding the key and
+    weight lists on every call.
+    """
+
+    def __init__(self, weights: Dict[Any, float]):
+        self.keys = list(weights)
+        self.cum_weights = list(accumulate(weights.values()))
+        self.total = self.cum_weights[-1]
+        self.hi = len(self.keys) - 1
+
+    def sample(self, rng) -> Any:
+        return self.keys[bisect.bisect(self.cum_weights, rng.random() * self.total, 0, self.hi)]
+
+    def sample_many(self, rng, k: int) -> List[Any]:
+        return rng.choices(self.keys, cum_weights=self.cum_weights, k=k)
+
+
+class HotspotSampler:
+    """Sensor ids where `probability` of the draws land in [hot_start, hot_end].
+
+    The remaining draws follow the simulator's original rule: uniform over
+    1..total, with any hit inside the hotspot re-drawn above it. That
+    mixture is flattened once into three uniform segments (below, inside
+    and above the hotspot) with their total probabilities, so a draw is a
+    segment choice plus an offset.
+    """
+
+    def __init__(self, hot_start: int, hot_end: int, total: int, probability: float):
+        hot_size = hot_end - hot_start + 1
+        cold = 1 - probability
+        # (first id, segment size, probability of landing in it)
+        segments = [
+            (1, hot_start - 1, cold * (hot_start - 1) / total),
+            (hot_start, hot_size, probability),
+            (hot_end + 1, total - hot_end, cold * (total - hot_end + hot_size) / total),
+        ]
+        segments = [segment for segment in segments if segment[1] > 0 and segment[2] > 0]
+        self.segments = [(first, size) for first, size, _ in segments]
+        self.segment_sampler = WeightedSampler({index: segment[2] for index, segment in enumerate(segments)})
+
+    def sample(self, rng) -> int:
+        first, size = self.segments[self.segment_sampler.sample(rng)]
+        return first + int(rng.random() * size)
+
+    def sample_many(self, rng, k: int) -> List[int]:
+        segments = [self.segments[index] for index in self.segment_sampler.sample_many(rng, k)]
+        return [first + int(rng.random() * size) for first, size in segments]
+
+
+def batch_columns(rng, k: int, samplers: Sequence[Any]) -> List[List[Any]]:
+    """Draw `k` values from each sampler, one whole column at a time"""
+    return [sampler.sample_many(rng, k) for sampler in samplers]
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Sensor Reading Documents for the Sharding Imbalance Simulator
+Hotspot sensor ids, weighted device types and locations, and the per-size-class reading payloads
+"""
+
+import random
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from samplers import HotspotSampler, WeightedSampler, batch_columns
+from batch_generator import NumpyBatchGenerator
+
+# Device types with their share of the readings and the size of their payload
+DEVICE_TYPES = {
+    'temperature': {'weight': 0.4, 'data_size': 'small'},
+    'humidity': {'weight': 0.3, 'data_size': 'small'},
+    'pressure': {'weight': 0.15, 'data_size': 'medium'},
+    'vibration': {'weight': 0.1, 'data_size': 'large'},
+    'camera': {'weight': 0.05, 'data_size': 'xlarge'}
+}
+
+# Locations, some far busier than others
+LOCATIONS = {
+    'datacenter_1': {'weight': 0.5, 'region': 'us-east'},
+    'datacenter_2': {'weight': 0.25, 'region': 'us-west'},
+    'datacenter_3': {'weight': 0.15, 'region': 'eu-west'},
+    'datacenter_4': {'weight': 0.1, 'region': 'asia-pacific'}
+}
+
+
+class SensorReadingGenerator:
+    """Builds the simulator's sensor_readings documents; no connection, logging or env access.
+
+    'document' mode keeps the original draw sequence, so recorded traces
+    replay to the same documents; 'batch' draws the sensor id, device type
+    and location columns of a batch at once, and 'numpy' builds the whole
+    batch with NumpyBatchGenerator (needs numpy).
+    """
+
+    def __init__(self, hotspot_start: int = 1000, hotspot_end: int = 2000, total_sensors: int = 10000,
+                 hotspot_probability: float = 0.8, mode: str = 'document'):
+        self.hotspot_start = hotspot_start
+        self.hotspot_end = hotspot_end
+        self.total_sensors = total_sensors
+        self.hotspot_probability = hotspot_probability
+        self.mode = mode
+        self.device_types = DEVICE_TYPES
+        self.locations = LOCATIONS
+        # Sampling tables built once instead of rebuilding weight lists for every reading
+        self.device_type_sampler = WeightedSampler({name: info['weight'] for name, info in self.device_types.items()})
+        self.location_sampler = WeightedSampler({name: info['weight'] for name, info in self.locations.items()})
+        self.sensor_sampler = HotspotSampler(hotspot_start, hotspot_end, total_sensors, hotspot_probability)
+        self.numpy_generator = NumpyBatchGenerator(self) if mode == 'numpy' else None
+
+    def generate_reading(self, rng: Any = random) -> Dict[str, Any]:
+        """One reading with the problematic pattern"""
+        # hotspot_probability of the readings land in the hotspot range
+        if rng.random() < self.hotspot_probability:
+            sensor_id = rng.randint(self.hotspot_start, self.hotspot_end)
+        else:
+            # The rest spread over all sensors, with hotspot hits re-drawn above it
+            sensor_id = rng.randint(1, self.total_sensors)
+            if self.hotspot_start <= sensor_id <= self.hotspot_end:
+                sensor_id = rng.randint(self.hotspot_end + 1, self.total_sensors)
+
+        device_type = self.device_type_sampler.sample(rng)
+        location = self.location_sampler.sample(rng)
+        return self.build_reading(sensor_id, device_type, location, rng)
+
+    def generate_batch(self, rng: Any, batch_size: int, mode: Optional[str] = None) -> List[Dict[str, Any]]:
+        """`batch_size` readings; `mode` overrides the generator's mode for this batch"""
+        mode = mode or self.mode
+        if mode == 'numpy':
+            if self.numpy_generator is None:
+                self.numpy_generator = NumpyBatchGenerator(self)
+            return self.numpy_generator.generate(rng, batch_size)
+        if mode != 'batch':
+            return [self.generate_reading(rng) for _ in range(batch_size)]
+        sensor_ids, device_types, locations = batch_columns(
+            rng, batch_size, (self.sensor_sampler, self.device_type_sampler, self.location_sampler)
+        )
+        return [
+            self.build_reading(sensor_id, device_type, location, rng)
+            for sensor_id, device_type, location in zip(sensor_ids, device_types, locations)
+        ]
+
+    def build_reading(self, sensor_id: int, device_type: str, location: str, rng: Any) -> Dict[str, Any]:
+        """Reading document with a payload sized by the device type"""
+        data_size = self.device_types[device_type]['data_size']
+
+        if data_size == 'small':
+            sensor_data = {
+                'value': round(rng.uniform(0, 100), 2),
+                'unit': 'celsius' if device_type == 'temperature' else 'percent'
+            }
+        elif data_size == 'medium':
+            sensor_data = {
+                'value': round(rng.uniform(900, 1100), 2),
+                'unit': 'hPa',
+                'calibration': {
+                    'offset': rng.uniform(-0.5, 0.5),
+                    'scale': rng.uniform(0.98, 1.02)
+                }
+            }
+        elif data_size == 'large':
+            sensor_data = {
+                'x_axis': [rng.uniform(-10, 10) for _ in range(100)],
+                'y_axis': [rng.uniform(-10, 10) for _ in range(100)],
+                'z_axis': [rng.uniform(-10, 10) for _ in range(100)],
+                'frequency': rng.randint(1000, 5000),
+                'amplitude': rng.uniform(0.1, 2.0)
+            }
+        else:  # xlarge
+            sensor_data = {
+                'image_metadata': {
+                    'resolution': '1920x1080',
+                    'format': 'jpeg',
+                    'size_bytes': rng.randint(500000, 2000000)
+                },
+                'analysis': {
+                    'objects_detected': rng.randint(0, 10),
+                    'confidence_scores': [rng.uniform(0.5, 1.0) for _ in range(rng.randint(1, 5))],
+                    'processing_time_ms': rng.randint(100, 1000)
+                },
+                'raw_data': 'x' * rng.randint(1000, 5000)  # Large opaque payload
+            }
+
+        return {
+            'sensor_id': sensor_id,
+            'device_type': device_type,
+            'location': location,
+            'region': self.locations[location]['region'],
+            'timestamp': datetime.utcnow(),
+            'sensor_data': sensor_data,
+            'metadata': {
+                'battery_level': rng.randint(10, 100),
+                'signal_strength': rng.randint(-100, -30),
+                'firmware_version': f"v{rng.randint(1, 5)}.{rng.randint(0, 9)}.{rng.randint(0, 9)}"
+            }
+        }
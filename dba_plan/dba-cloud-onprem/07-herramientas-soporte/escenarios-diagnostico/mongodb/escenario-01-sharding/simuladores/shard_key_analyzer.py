@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Offline Shard-Key Skew Analyzer for the Sharding Scenario
+Streams generated documents through a chunk split and balancer model per candidate key and scores the imbalance
+"""
+
+import os
+import bisect
+import logging
+import random
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from fake_mongo import Chunk, ShardKey, initial_chunks
+from sensor_documents import SensorReadingGenerator
+
+logger = logging.getLogger(__name__)
+
+
+def imbalance(counts: List[int]) -> float:
+    """0 when the load is even across shards, 1 when one shard takes all of it"""
+    total = sum(counts)
+    if total == 0 or len(counts) < 2:
+        return 0.0
+    return (max(counts) * len(counts) / total - 1) / (len(counts) - 1)
+
+
+class ChunkSplitSimulation:
+    """Chunk ranges, splits and balancer rounds for one key, fed one document at a time.
+
+    Splitting and balancing follow the in-memory cluster: a chunk is split
+    at its median key (or the next distinct key, when the median is also
+    its lowest) once it holds `chunk_max_docs` documents, and after
+    each split one chunk moves from the shard with the most chunks to the
+    one with the fewest when they differ by `migration_threshold`. A chunk
+    whose documents all share one key cannot split and is counted as jumbo.
+    Hashed keys start pre-split into two chunks per shard, as
+    shardCollection does for an empty collection. Only the shard keys are
+    kept, never the documents.
+    """
+
+    def __init__(self, key: ShardKey, shards: int = 3, chunk_max_docs: int = 1000,
+                 migration_threshold: int = 2, balancer: bool = True, window: int = 1000):
+        self.key = key
+        self.shards = [f"shard{i + 1:02d}" for i in range(shards)]
+        self.chunk_max_docs = chunk_max_docs
+        self.migration_threshold = migration_threshold
+        self.balancer = balancer
+        self.window = window
+        self.chunks = initial_chunks(key, self.shards)
+        self.bounds = [chunk.min for chunk in self.chunks[1:]]
+        self.splits = 0
+        self.migrations = 0
+        self.documents = 0
+        self.writes = {shard: 0 for shard in self.shards}
+        self.window_writes = {shard: 0 for shard in self.shards}
+        self.histogram: List[Dict[str, int]] = []
+
+    def add(self, document: Dict[str, Any]):
+        key = self.key.value(document)
+        chunk = self.chunks[bisect.bisect_right(self.bounds, key)]
+        bisect.insort(chunk.keys, key)
+        self.writes[chunk.shard] += 1
+        self.window_writes[chunk.shard] += 1
+        self.documents += 1
+        if len(chunk.keys) >= self.chunk_max_docs:
+            self.split(chunk)
+        if self.documents % self.window == 0:
+            self.close_window()
+
+    def split(self, chunk: Chunk):
+        median = chunk.keys[len(chunk.keys) // 2]
+        if median == chunk.keys[0]:
+            upper = bisect.bisect_right(chunk.keys, median)
+            if upper == len(chunk.keys):
+                return  # Jumbo chunk: every document has the same shard key
+            median = chunk.keys[upper]
+        split_at = bisect.bisect_left(chunk.keys, median)
+        right = Chunk(median, chunk.max, chunk.shard)
+        right.keys, chunk.keys = chunk.keys[split_at:], chunk.keys[:split_at]
+        chunk.max = median
+        index = self.chunks.index(chunk) + 1
+        self.chunks.insert(index, right)
+        self.bounds.insert(index - 1, median)
+        self.splits += 1
+        if self.balancer:
+            self.balance()
+
+    def balance(self):
+        counts = {shard: 0 for shard in self.shards}
+        for chunk in self.chunks:
+            counts[chunk.shard] += 1
+        donor = max(counts, key=counts.get)
+        recipient = min(counts, key=counts.get)
+        if counts[donor] - counts[recipient] >= self.migration_threshold:
+            moved = next(chunk for chunk in self.chunks if chunk.shard == donor)
+            moved.shard = recipient
+            self.migrations += 1
+
+    def close_window(self):
+        if any(self.window_writes.values()):
+            self.histogram.append(self.window_writes)
+            self.window_writes = {shard: 0 for shard in self.shards}
+
+    def result(self) -> Dict[str, Any]:
+        """Per-shard documents, chunks and writes plus the imbalance scores of this key"""
+        self.close_window()
+        docs = {shard: 0 for shard in self.shards}
+        chunks = {shard: 0 for shard in self.shards}
+        jumbo = 0
+        for chunk in self.chunks:
+            docs[chunk.shard] += len(chunk.keys)
+            chunks[chunk.shard] += 1
+            if len(chunk.keys) >= self.chunk_max_docs and chunk.keys[0] == chunk.keys[-1]:
+                jumbo += 1
+        # Write skew is judged window by window: a monotonic key spreads its data but not its writes
+        write_imbalance = (sum(imbalance(list(window.values())) for window in self.histogram) / len(self.histogram)
+                           if self.histogram else 0.0)
+        data_imbalance = imbalance(list(docs.values()))
+        return {
+            'key': self.key.spec,
+            'documents': self.documents,
+            'chunks': len(self.chunks),
+            'splits': self.splits,
+            'migrations': self.migrations,
+            'jumbo_chunks': jumbo,
+            'shards': {shard: {'docs': docs[shard], 'chunks': chunks[shard], 'writes': self.writes[shard]}
+                       for shard in self.shards},
+            'write_histogram': [[window[shard] for shard in self.shards] for window in self.histogram],
+            'write_imbalance': round(write_imbalance, 4),
+            'data_imbalance': round(data_imbalance, 4),
+            'imbalance_score': round(max(write_imbalance, data_imbalance), 4),
+        }
+
+
+def analyze(documents: Iterable[Dict[str, Any]], keys: List[str], **options: Any) -> List[Dict[str, Any]]:
+    """Single pass over `documents` feeding every candidate key; results sorted best key first"""
+    simulations = [ChunkSplitSimulation(ShardKey(spec), **options) for spec in keys]
+    for document in documents:
+        for simulation in simulations:
+            simulation.add(document)
+    return sorted((simulation.result() for simulation in simulations), key=lambda result: result['imbalance_score'])
+
+
+def format_report(results: List[Dict[str, Any]], width: int = 40) -> str:
+    """Text report with a per-shard bar of the write share of each key"""
+    lines = []
+    for result in results:
+        lines.append(f"{result['key']}: score={result['imbalance_score']:.3f} "
+                     f"(writes {result['write_imbalance']:.3f}, data {result['data_imbalance']:.3f}) "
+                     f"chunks={result['chunks']} splits={result['splits']} migrations={result['migrations']} "
+                     f"jumbo={result['jumbo_chunks']}")
+        total = max(1, result['documents'])
+        for shard, stats in result['shards'].items():
+            share = stats['writes'] / total
+            lines.append(f"  {shard} {'#' * round(share * width):<{width}} {share:6.1%} writes, "
+                         f"{stats['docs']} docs, {stats['chunks']} chunks")
+    return '\n'.join(lines)
+
+
+def generated_documents(source: str, count: int, seed: Optional[int] = None, batch_size: int = 500,
+                        readings: Optional[SensorReadingGenerator] = None) -> Iterator[Dict[str, Any]]:
+    """Sensor readings as ShardingImbalanceSimulator writes them ('imbalance') or ShardingSimulator's
+    documents ('simple'), batch by batch"""
+    rng = random.Random(seed)
+    if source == 'simple':
+        from sharding_simulator import generate_imbalanced_documents
+        generate = lambda size: generate_imbalanced_documents(size, rng)
+    else:
+        readings = readings or SensorReadingGenerator()
+        generate = lambda size: readings.generate_batch(rng, size)
+    produced = 0
+    while produced < count:
+        batch = generate(min(batch_size, count - produced))
+        produced += len(batch)
+        yield from batch
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    source = os.getenv('ANALYZER_SOURCE', 'imbalance')
+    default_keys = 'shard_key;hashed:shard_key' if source == 'simple' else 'sensor_id;sensor_id,timestamp;hashed:sensor_id'
+    keys = [key for key in os.getenv('ANALYZER_KEYS', default_keys).split(';') if key]
+    count = int(os.getenv('ANALYZER_DOCS', 100000))
+    seed = int(os.environ['SIMULATION_SEED']) if os.getenv('SIMULATION_SEED') else None
+
+    # Same hotspot and generation settings the simulator reads
+    readings = SensorReadingGenerator(
+        int(os.getenv('HOTSPOT_SENSOR_RANGE_START', 1000)),
+        int(os.getenv('HOTSPOT_SENSOR_RANGE_END', 2000)),
+        int(os.getenv('TOTAL_SENSORS', 10000)),
+        float(os.getenv('HOTSPOT_PROBABILITY', 0.8)),
+        os.getenv('GENERATION_MODE', 'document')
+    )
+
+    logger.info(f"Analyzing {count} '{source}' documents for keys {keys}")
+    results = analyze(
+        generated_documents(source, count, seed, readings=readings), keys,
+        shards=int(os.getenv('FAKE_SHARDS', 3)),
+        chunk_max_docs=int(os.getenv('FAKE_CHUNK_MAX_DOCS', 1000)),
+        balancer=os.getenv('FAKE_BALANCER', 'true').lower() == 'true',
+        window=int(os.getenv('ANALYZER_WINDOW', 1000))
+    )
+    print(format_report(results))
+
+
+if __name__ == "__main__":
+    main()
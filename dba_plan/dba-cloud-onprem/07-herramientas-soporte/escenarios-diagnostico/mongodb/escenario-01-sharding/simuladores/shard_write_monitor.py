@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Per-Shard Write-Rate Monitor for the Sharding Imbalance Simulator
+Polls document counts per shard of each collection and exports write rates and shares as Prometheus gauges
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from prometheus_client import Gauge
+
+logger = logging.getLogger(__name__)
+
+shard_write_rate = Gauge('mongodb_shard_writes_per_second', 'Documents written per second to each shard over the last interval',
+                         ['collection', 'shard'], multiprocess_mode='livesum')
+shard_write_share = Gauge('mongodb_shard_write_share', 'Fraction of the collection writes of the last interval taken by each shard',
+                          ['collection', 'shard'], multiprocess_mode='livesum')
+
+
+class ShardWriteMonitor:
+    """Background thread that turns per-shard write counts into rates every `interval` seconds.
+
+    On the in-memory cluster the counts are each collection's
+    writes_per_shard; on a real cluster they are the per-shard document
+    counts $collStats reports through mongos. Those only equal the writes
+    of insert-only collections: an upsert that replaces a document leaves
+    the count unchanged, so collections written that way must not be
+    monitored.
+    """
+
+    def __init__(self, db: Any, collections: List[str], interval: float = 15.0):
+        self.db = db
+        self.collections = collections
+        self.interval = interval
+        self.previous: Dict[str, Tuple[float, Dict[str, int]]] = {}
+        self.latest: Dict[str, Dict[str, float]] = {}
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name='ShardWriteMonitor', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join(timeout=self.interval + 5)
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning(f"Shard write monitor: {e}")
+            self.stopped.wait(self.interval)
+
+    def counts(self, name: str) -> Dict[str, int]:
+        collection = self.db[name]
+        if hasattr(collection, 'writes_per_shard'):
+            with collection.lock:
+                return dict(collection.writes_per_shard)
+        return {stats['shard']: stats['count']
+                for stats in collection.aggregate([{'$collStats': {'count': {}}}]) if 'shard' in stats}
+
+    def sample(self):
+        """Read the counts of every collection and refresh the gauges"""
+        now = time.monotonic()
+        for name in self.collections:
+            counts = self.counts(name)
+            previous = self.previous.get(name)
+            self.previous[name] = (now, counts)
+            if previous is None:
+                continue
+            elapsed = now - previous[0]
+            deltas = {shard: max(0, count - previous[1].get(shard, 0)) for shard, count in counts.items()}
+            total = sum(deltas.values())
+            self.latest[name] = {shard: delta / elapsed for shard, delta in deltas.items()}
+            for shard, delta in deltas.items():
+                shard_write_rate.labels(collection=name, shard=shard).set(delta / elapsed)
+                shard_write_share.labels(collection=name, shard=shard).set(delta / total if total else 0.0)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Latest writes per second per shard of each collection"""
+        return {name: dict(rates) for name, rates in self.latest.items()}
@@ -4,6 +4,15 @@ import os, sys, time, threading, random
 from pymongo import MongoClient
 from datetime import datetime
 
+def generate_imbalanced_documents(count=100, rng=random):
+    """Documents with a skewed, low-cardinality shard key (3 of every 4 on hot_shard_1)"""
+    return [{
+        'shard_key': rng.choice(['hot_shard_1', 'hot_shard_1', 'hot_shard_1', 'cold_shard_2']),
+        'data': f'Document {i}',
+        'timestamp': datetime.now(),
+        'value': rng.randint(1, 1000)
+    } for i in range(count)]
+
 class ShardingSimulator:
     def __init__(self):
         self.client = MongoClient(
@@ -20,14 +29,7 @@ class ShardingSimulator:
         while self.running:
             try:
                 # Insert data with skewed shard key distribution
-                docs = []
-                for i in range(100):
-                    docs.append({
-                        'shard_key': random.choice(['hot_shard_1', 'hot_shard_1', 'hot_shard_1', 'cold_shard_2']),
-                        'data': f'Document {i}',
-                        'timestamp': datetime.now(),
-                        'value': random.randint(1, 1000)
-                    })
+                docs = generate_imbalanced_documents(100)
                 
                 self.db.sharded_collection.insert_many(docs)
                 time.sleep(2)
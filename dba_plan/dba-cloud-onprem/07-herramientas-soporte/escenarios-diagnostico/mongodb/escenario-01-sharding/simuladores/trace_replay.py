@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Trace Replay Engine for the Diagnostic Scenario Simulators
+Re-issues a recorded workload with time scaling and configurable parallelism
+"""
+
+import time
+import queue
+import logging
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from workload_trace import TraceReader, TraceRecord
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayTransaction(NamedTuple):
+    """Records of one logical operation, from its 'begin' up to the next one of the same worker"""
+    offset: float
+    worker_type: str
+    worker_id: int
+    records: List[TraceRecord]
+
+    @property
+    def seed(self) -> int:
+        """Value recorded with 'begin'; operation-seeded simulators store their operation seed there"""
+        return int(self.records[0].value)
+
+    def values(self, op: str) -> List[float]:
+        return [record.value for record in self.records if record.op == op]
+
+
+def load_transactions(path: str, worker_types: Optional[List[str]] = None) -> List[ReplayTransaction]:
+    """Split a trace into per-worker logical operations, ordered by start time"""
+    transactions = []
+    for (worker_type, worker_id), records in TraceReader(path).by_worker().items():
+        if worker_types and worker_type not in worker_types:
+            continue
+        current: List[TraceRecord] = []
+        for record in records:
+            if record.op == 'begin' and current:
+                transactions.append(ReplayTransaction(current[0].offset, worker_type, worker_id, current))
+                current = []
+            if record.op == 'begin' or current:
+                current.append(record)
+        if current:
+            transactions.append(ReplayTransaction(current[0].offset, worker_type, worker_id, current))
+    transactions.sort(key=lambda tx: tx.offset)
+    return transactions
+
+
+class ReplayStats:
+    """Outcome counts and schedule lag of a replay"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.outcomes: Dict[str, int] = {}
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.completed = 0
+
+    def completion(self, outcome: str, lag: float):
+        with self.lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            self.completed += 1
+            self.lag_total += lag
+            self.lag_max = max(self.lag_max, lag)
+
+
+class TraceReplayer:
+    """Replays recorded operations through an executor callback.
+
+    speed scales the recorded schedule: 1.0 is real time, 10.0 ten times
+    faster and 0 as fast as possible. Delays inside a transaction are the
+    recorded ones whatever the speed, since they model how long locks are
+    held. With parallelism 0 every recorded worker gets its own thread and
+    runs its operations in their original order; with parallelism N a fixed
+    set of N threads takes operations from a single time-ordered queue.
+    """
+
+    def __init__(self, transactions: List[ReplayTransaction],
+                 execute: Callable[[ReplayTransaction], str],
+                 speed: float = 1.0, parallelism: int = 0):
+        if speed < 0:
+            raise ValueError("speed must be >= 0 (0 replays as fast as possible)")
+        self.transactions = transactions
+        self.execute = execute
+        self.speed = speed
+        self.parallelism = parallelism
+        self.stats = ReplayStats()
+        self.stop_event = threading.Event()
+        self.started = None
+        self.elapsed = 0.0
+
+    def due(self, transaction: ReplayTransaction) -> float:
+        """Monotonic time at which a transaction should start"""
+        if self.speed == 0:
+            return self.started
+        return self.started + transaction.offset / self.speed
+
+    def run_one(self, transaction: ReplayTransaction):
+        wait = self.due(transaction) - time.monotonic()
+        if wait > 0 and self.stop_event.wait(wait):
+            return
+        lag = max(0.0, time.monotonic() - self.due(transaction))
+        try:
+            outcome = self.execute(transaction)
+        except Exception as e:
+            logger.error(f"Replay {transaction.worker_type} {transaction.worker_id} failed: {e}")
+            outcome = 'error'
+        self.stats.completion(outcome or 'success', lag)
+
+    def run(self) -> str:
+        """Replay every transaction and return a one-line summary"""
+        self.started = time.monotonic()
+        threads = []
+
+        if self.parallelism <= 0:
+            lanes: Dict[tuple, List[ReplayTransaction]] = {}
+            for transaction in self.transactions:
+                lanes.setdefault((transaction.worker_type, transaction.worker_id), []).append(transaction)
+
+            def lane_worker(lane: List[ReplayTransaction]):
+                for transaction in lane:
+                    if self.stop_event.is_set():
+                        return
+                    self.run_one(transaction)
+
+            for (worker_type, worker_id), lane in lanes.items():
+                threads.append(threading.Thread(target=lane_worker, args=(lane,),
+                                                name=f"replay-{worker_type}-{worker_id}"))
+        else:
+            backlog: queue.Queue = queue.Queue()
+            for transaction in self.transactions:
+                backlog.put(transaction)
+
+            def pool_worker():
+                while not self.stop_event.is_set():
+                    try:
+                        transaction = backlog.get_nowait()
+                    except queue.Empty:
+                        return
+                    self.run_one(transaction)
+
+            for i in range(self.parallelism):
+                threads.append(threading.Thread(target=pool_worker, name=f"replay-{i + 1}"))
+
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stop_event.set()
+        self.elapsed = time.monotonic() - self.started
+        return self.summary()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def summary(self) -> str:
+        recorded_span = self.transactions[-1].offset if self.transactions else 0.0
+        completed = self.stats.completed or 1
+        outcomes = ", ".join(f"{outcome}={count}" for outcome, count in sorted(self.stats.outcomes.items()))
+        return (f"replayed {self.stats.completed}/{len(self.transactions)} operations "
+                f"(recorded over {recorded_span:.1f}s) in {self.elapsed:.1f}s "
+                f"at speed {'max' if self.speed == 0 else f'{self.speed:g}x'}: {outcomes}; "
+                f"schedule lag avg {self.stats.lag_total / completed * 1000:.1f} ms "
+                f"max {self.stats.lag_max * 1000:.1f} ms")
@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+Asyncio Execution Engine for the MySQL Deadlock Simulator
+Runs buyer/restocker/reporter workloads as coroutines over a pluggable driver
+"""
+
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import aiomysql
+    import pymysql
+except ImportError:  # Only needed for ASYNC_DRIVER=aiomysql
+    aiomysql = None
+    pymysql = None
+
+from latency_recorder import LatencyRecorder
+from load_generator import ArrivalProcess, LoadStats, owned_workers, target_rates
+from metrics import (
+    deadlock_counter, transaction_counter, connection_gauge, response_time, round_trips, lock_hold_time
+)
+from retry_policy import RetryPolicy
+from workloads import WorkerStream, WorkloadStreams
+from write_batch import WriteBatch, RoundTripCounter
+from fake_mysql import FakeMySQLError, FakeMySQLServer
+from lock_manager import DeadlockDetected, LockTransaction, LockWaitTimeout
+from queries import (
+    BUYER_LOCK_SQL, DECREMENT_STOCK_SQL, INSERT_ORDER_SQL, INSERT_ORDER_ITEM_SQL,
+    INSERT_MOVEMENT_OUT_SQL, RESTOCK_LOCK_SQL, INCREMENT_STOCK_SQL,
+    INSERT_MOVEMENT_IN_SQL, REPORT_SQL
+)
+
+logger = logging.getLogger(__name__)
+
+
+class DriverError(Exception):
+    """Database error carrying the MySQL error number (1213 = deadlock)"""
+
+    def __init__(self, errno: int, msg: str):
+        super().__init__(f"{errno} ({msg})")
+        self.errno = errno
+        self.msg = msg
+
+
+class QueryResult:
+    """Rows and last insert id of one executed statement"""
+
+    def __init__(self, rows: List[Tuple], lastrowid: Optional[int] = None):
+        self.rows = rows
+        self.lastrowid = lastrowid
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+class AsyncDriver:
+    """Interface the async engine needs from a database driver"""
+
+    async def start(self):
+        """Open pools or other shared resources"""
+
+    async def close(self):
+        """Release shared resources"""
+
+    def connection(self):
+        """Async context manager yielding a connection with begin/execute/commit/rollback"""
+        raise NotImplementedError
+
+
+class AioMySQLConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    async def begin(self):
+        await self._conn.begin()
+
+    async def execute(self, sql: str, params: Tuple = ()) -> QueryResult:
+        try:
+            async with self._conn.cursor() as cursor:
+                await cursor.execute(sql, params)
+                rows = await cursor.fetchall() if cursor.description else []
+                return QueryResult(list(rows), cursor.lastrowid)
+        except pymysql.err.MySQLError as e:
+            raise DriverError(e.args[0], e.args[1] if len(e.args) > 1 else str(e))
+
+    async def commit(self):
+        await self._conn.commit()
+
+    async def rollback(self):
+        await self._conn.rollback()
+
+
+class AioMySQLDriver(AsyncDriver):
+    """Real MySQL access through an aiomysql connection pool"""
+
+    def __init__(self, db_config: Dict[str, Any], pool_size: int):
+        if aiomysql is None:
+            raise RuntimeError("ASYNC_DRIVER=aiomysql requires the aiomysql package")
+        self.db_config = db_config
+        self.pool_size = pool_size
+        self.pool = None
+
+    async def start(self):
+        self.pool = await aiomysql.create_pool(
+            host=self.db_config['host'],
+            port=self.db_config['port'],
+            user=self.db_config['user'],
+            password=self.db_config['password'],
+            db=self.db_config['database'],
+            charset=self.db_config.get('charset', 'utf8mb4'),
+            autocommit=False,
+            minsize=1,
+            maxsize=self.pool_size
+        )
+        connection_gauge.set_function(lambda: self.pool.size if self.pool else 0)
+
+    async def close(self):
+        if self.pool:
+            self.pool.close()
+            await self.pool.wait_closed()
+
+    @asynccontextmanager
+    async def connection(self):
+        async with self.pool.acquire() as conn:
+            yield AioMySQLConnection(conn)
+
+
+class FakeAsyncDriver(AsyncDriver):
+    """In-process stand-in for MySQL backed by a fake_mysql.FakeMySQLServer.
+
+    Data and locks live in the server, so the threaded and asyncio modes
+    share the catalog, the InnoDB-style lock manager and its deadlock
+    detection. Locks taken by a transaction stay until commit or rollback.
+    """
+
+    def __init__(self, server: Optional[FakeMySQLServer] = None, latency: float = 0.001):
+        self.server = server or FakeMySQLServer(latency)
+        self.latency = latency
+
+    @asynccontextmanager
+    async def connection(self):
+        conn = FakeAsyncConnection(self)
+        connection_gauge.inc()
+        try:
+            yield conn
+        finally:
+            await conn.rollback()
+            connection_gauge.dec()
+
+
+class FakeAsyncConnection:
+    def __init__(self, driver: FakeAsyncDriver):
+        self.driver = driver
+        self.server = driver.server
+        self.txn = LockTransaction(asyncio.Event())
+        self.undo: List[Tuple[str, int, int]] = []
+
+    async def begin(self):
+        self.server.locks.release_all(self.txn)
+
+    async def execute(self, sql: str, params: Tuple = ()) -> QueryResult:
+        await asyncio.sleep(self.driver.latency)
+        try:
+            for key, mode in self.server.catalog.lock_requests(sql, params):
+                await self.server.locks.acquire_async(self.txn, key, mode)
+            rows, lastrowid = self.server.catalog.apply(sql, params, self.undo)
+        except DeadlockDetected:
+            raise DriverError(1213, "Deadlock found when trying to get lock; try restarting transaction")
+        except LockWaitTimeout:
+            raise DriverError(1205, "Lock wait timeout exceeded; try restarting transaction")
+        except FakeMySQLError as e:
+            raise DriverError(e.errno, e.msg)
+        self.txn.rows_modified = len(self.undo)
+        return QueryResult(rows, lastrowid)
+
+    async def commit(self):
+        self.undo = []
+        self.server.locks.release_all(self.txn)
+
+    async def rollback(self):
+        self.server.catalog.rollback(self.undo)
+        self.undo = []
+        self.server.locks.release_all(self.txn)
+
+
+class AsyncDeadlockEngine:
+    """Runs the DeadlockSimulator workloads as coroutines in a single event loop"""
+
+    def __init__(self, config: Dict[str, Any], driver: AsyncDriver,
+                 latency: Optional[LatencyRecorder] = None, retry_policy: Optional[RetryPolicy] = None,
+                 streams: Optional[WorkloadStreams] = None, stop_event: Any = None):
+        self.config = config
+        self.driver = driver
+        self.latency = latency
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.streams = streams or WorkloadStreams()
+        self.running = True
+        # Set by the process launcher to stop every process at once
+        self.stop_event = stop_event
+        self.load_stats: List[LoadStats] = []
+
+    async def buyer_transaction(self, buyer_id: int, stream: WorkerStream, product_ids: List[int]) -> str:
+        """Coroutine version of DeadlockSimulator.buyer_transaction"""
+        batched = self.config.get('batched_writes', False)
+        write_mode = 'batched' if batched else 'per_row'
+        async with self.driver.connection() as raw_conn:
+            conn = RoundTripCounter(raw_conn)
+            batch = WriteBatch()
+            lock_started = time.perf_counter()
+            try:
+                with response_time.time():
+                    await conn.begin()
+
+                    for product_id in product_ids:
+                        result = (await conn.execute(BUYER_LOCK_SQL, (product_id,))).fetchone()
+                        if not result:
+                            continue
+
+                        stock, price = result
+                        quantity_to_buy = stream.quantity(1, min(3, stock))
+
+                        if stock >= quantity_to_buy:
+                            await asyncio.sleep(stream.delay(0.01, self.config['transaction_delay']))
+                            await conn.execute(DECREMENT_STOCK_SQL, (quantity_to_buy, product_id))
+                            order_id = (await conn.execute(
+                                INSERT_ORDER_SQL, (buyer_id, price * quantity_to_buy))).lastrowid
+                            if batched:
+                                batch.add(order_id, product_id, quantity_to_buy, price)
+                                continue
+                            await conn.execute(INSERT_ORDER_ITEM_SQL,
+                                               (order_id, product_id, quantity_to_buy, price))
+                            await conn.execute(INSERT_MOVEMENT_OUT_SQL,
+                                               (product_id, quantity_to_buy, order_id))
+
+                    for sql, params in batch.statements():
+                        await conn.execute(sql, params)
+
+                    await conn.commit()
+                    transaction_counter.labels(status='success').inc()
+                    logger.info(f"Buyer {buyer_id} completed purchase successfully")
+                    return 'success'
+            except Exception as e:
+                await conn.rollback()
+                return self._count_failure('Buyer', buyer_id, e)
+            finally:
+                lock_hold_time.labels(worker_type='buyer', write_mode=write_mode).observe(
+                    time.perf_counter() - lock_started)
+                round_trips.labels(worker_type='buyer', write_mode=write_mode).observe(conn.count + 2)
+
+    async def restocking_transaction(self, restocker_id: int, stream: WorkerStream,
+                                     product_ids: List[int]) -> str:
+        """Coroutine version of DeadlockSimulator.restocking_transaction"""
+        async with self.driver.connection() as conn:
+            try:
+                with response_time.time():
+                    await conn.begin()
+
+                    for product_id in product_ids:
+                        result = (await conn.execute(RESTOCK_LOCK_SQL, (product_id,))).fetchone()
+                        if not result:
+                            continue
+
+                        restock_quantity = stream.quantity(10, 50)
+                        await asyncio.sleep(stream.delay(0.02, self.config['transaction_delay'] * 2))
+                        await conn.execute(INCREMENT_STOCK_SQL, (restock_quantity, product_id))
+                        await conn.execute(INSERT_MOVEMENT_IN_SQL, (product_id, restock_quantity))
+
+                    await conn.commit()
+                    transaction_counter.labels(status='success').inc()
+                    logger.info(f"Restocker {restocker_id} completed restocking successfully")
+                    return 'success'
+            except Exception as e:
+                await conn.rollback()
+                return self._count_failure('Restocker', restocker_id, e)
+
+    async def reporting_transaction(self, reporter_id: int, stream: WorkerStream,
+                                    id_range: Tuple[int, int]) -> str:
+        """Coroutine version of DeadlockSimulator.reporting_transaction"""
+        async with self.driver.connection() as conn:
+            try:
+                with response_time.time():
+                    await conn.begin()
+                    await conn.execute(REPORT_SQL, id_range)
+                    await asyncio.sleep(stream.delay(0.1, 0.5))
+                    await conn.commit()
+                    transaction_counter.labels(status='success').inc()
+                    logger.info(f"Reporter {reporter_id} completed report successfully")
+                    return 'success'
+            except Exception as e:
+                await conn.rollback()
+                return self._count_failure('Reporter', reporter_id, e)
+
+    def _count_failure(self, role: str, worker_id: int, error: Exception) -> str:
+        if isinstance(error, DriverError) and error.errno == 1213:
+            deadlock_counter.inc()
+            transaction_counter.labels(status='deadlock').inc()
+            logger.warning(f"{role} {worker_id} encountered deadlock: {error}")
+            return 'deadlock'
+        if isinstance(error, DriverError):
+            transaction_counter.labels(status='error').inc()
+            logger.error(f"{role} {worker_id} transaction failed: {error}")
+        else:
+            transaction_counter.labels(status='error').inc()
+            logger.error(f"{role} {worker_id} unexpected error: {error}")
+        return 'error'
+
+    async def run_attempt(self, worker_type: str, worker_id: int, stream: WorkerStream,
+                          plan: Dict[str, Any]) -> str:
+        """Run one attempt and record its latency under its outcome"""
+        outcome = 'error'
+        started = time.perf_counter()
+        try:
+            outcome = await self.transaction_for(worker_type)(worker_id, stream, **plan)
+        except asyncio.CancelledError:
+            # Cut short at shutdown: neither a latency sample nor an outcome in the trace
+            raise
+        except BaseException:
+            self.record_attempt(worker_type, stream, outcome, started)
+            raise
+        self.record_attempt(worker_type, stream, outcome, started)
+        return outcome
+
+    def record_attempt(self, worker_type: str, stream: WorkerStream, outcome: str, started: float):
+        stream.end(outcome)
+        if self.latency:
+            self.latency.record(worker_type, outcome, time.perf_counter() - started)
+
+    async def run_transaction(self, worker_type: str, worker_id: int) -> str:
+        """Run one logical transaction, retrying it with the same inputs per the retry policy"""
+        stream = self.streams.for_worker(worker_type, worker_id)
+        plan = stream.plan()
+        attempt = 1
+
+        while True:
+            stream.attempt(attempt)
+            outcome = await self.run_attempt(worker_type, worker_id, stream, plan)
+            delay = self.retry_policy.next_delay(worker_type, attempt, outcome)
+            if delay is None:
+                return outcome
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def transaction_for(self, worker_type: str):
+        return {
+            'buyer': self.buyer_transaction,
+            'restocker': self.restocking_transaction,
+            'reporter': self.reporting_transaction
+        }[worker_type]
+
+    async def worker(self, worker_type: str, worker_id: int):
+        """Logical client that continuously executes transactions"""
+        while self.running:
+            try:
+                await self.run_transaction(worker_type, worker_id)
+                await asyncio.sleep(self.streams.for_worker(worker_type, worker_id).think(0.5, 2.0))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"{worker_type} {worker_id} task error: {e}")
+                await asyncio.sleep(5)
+
+    def start_open_loop(self, worker_type: str, target_tps: float, worker_ids: List[int]) -> List[asyncio.Task]:
+        """Schedule arrivals at target_tps and run them on one consumer task per worker id"""
+        stream = f"arrivals:{worker_type}"
+        if self.config.get('simulator_processes', 1) > 1:
+            stream += f":{self.config['process_index']}"
+        arrivals = ArrivalProcess(target_tps, self.config['arrival_process'], self.streams.rng(stream))
+        backlog: asyncio.Queue = asyncio.Queue(maxsize=self.config['max_backlog'])
+        stats = LoadStats(worker_type)
+        self.load_stats.append(stats)
+
+        async def dispatch():
+            next_arrival = time.monotonic()
+            while self.running:
+                next_arrival += arrivals.next_interval()
+                delay = next_arrival - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                try:
+                    backlog.put_nowait(next_arrival)
+                    stats.arrival()
+                except asyncio.QueueFull:
+                    stats.arrival(missed=True)
+
+        async def executor(worker_id: int):
+            while self.running:
+                # Bounded wait (as LoadGenerator.executor does) so an idle executor sees the stop
+                try:
+                    scheduled = await asyncio.wait_for(backlog.get(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    continue
+                started = time.monotonic()
+                try:
+                    await self.run_transaction(worker_type, worker_id)
+                except Exception as e:
+                    logger.error(f"{worker_type} {worker_id} executor error: {e}")
+                stats.completion(started - scheduled, time.monotonic() - started)
+
+        logger.info(f"Open-loop {worker_type}: {target_tps} tps ({self.config['arrival_process']}) "
+                    f"over {len(worker_ids)} executors")
+        return [asyncio.create_task(dispatch())] + [
+            asyncio.create_task(executor(worker_id)) for worker_id in worker_ids
+        ]
+
+    async def wait_for_database(self) -> bool:
+        """Wait until the driver can run a trivial query"""
+        max_attempts = 30
+        for attempt in range(max_attempts):
+            try:
+                async with self.driver.connection() as conn:
+                    await conn.execute("SELECT 1")
+                logger.info("Database is ready")
+                return True
+            except Exception:
+                logger.info(f"Waiting for database... attempt {attempt + 1}/{max_attempts}")
+                await asyncio.sleep(2)
+
+        logger.error("Database not ready after maximum attempts")
+        return False
+
+    async def wait_until_stopped(self, seconds: float) -> bool:
+        """Sleep up to `seconds`, returning True early if the stop event is set"""
+        deadline = time.monotonic() + seconds
+        while not (self.stop_event and self.stop_event.is_set()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(remaining, 0.5))
+        return True
+
+    async def run(self):
+        """Start every logical client as a task and run for the configured duration"""
+        await self.driver.start()
+        try:
+            if not await self.wait_for_database():
+                logger.error("Cannot connect to database. Exiting.")
+                return
+
+            tasks = []
+            started_at = time.monotonic()
+            if self.config['load_mode'] == 'open':
+                for worker_type, tps in target_rates(self.config).items():
+                    tasks.extend(self.start_open_loop(worker_type, tps, owned_workers(self.config, worker_type)))
+            else:
+                for worker_type in ('buyer', 'restocker', 'reporter'):
+                    for worker_id in owned_workers(self.config, worker_type):
+                        tasks.append(asyncio.create_task(self.worker(worker_type, worker_id)))
+
+            logger.info(f"Started {len(tasks)} async workers")
+
+            try:
+                if self.config['simulation_duration'] > 0:
+                    logger.info(f"Running simulation for {self.config['simulation_duration']} seconds")
+                    await self.wait_until_stopped(self.config['simulation_duration'])
+                else:
+                    logger.info("Running simulation indefinitely (Ctrl+C to stop)")
+                    while not await self.wait_until_stopped(60):
+                        logger.info("Simulation still running...")
+            finally:
+                logger.info("Stopping simulation...")
+                self.running = False
+                elapsed = time.monotonic() - started_at
+                _, pending = await asyncio.wait(tasks, timeout=5)
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                for stats in self.load_stats:
+                    logger.info(f"Open-loop summary - {stats.summary(elapsed)}")
+        finally:
+            await self.driver.close()
+
+
+def create_driver(config: Dict[str, Any], db_config: Dict[str, Any],
+                  fake_server: Optional[FakeMySQLServer] = None) -> AsyncDriver:
+    """Build the async driver selected by ASYNC_DRIVER"""
+    if config['async_driver'] == 'fake':
+        server = fake_server or FakeMySQLServer(config['fake_latency'], config['fake_lock_wait_timeout'])
+        return FakeAsyncDriver(server, latency=config['fake_latency'])
+    if config['async_driver'] == 'aiomysql':
+        return AioMySQLDriver(db_config, config['pool_size'])
+    raise ValueError(f"Unknown ASYNC_DRIVER: {config['async_driver']}")
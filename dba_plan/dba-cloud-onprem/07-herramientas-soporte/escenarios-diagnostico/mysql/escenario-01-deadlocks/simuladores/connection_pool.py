@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Connection Pool for the MySQL Deadlock Simulator
+Bounded, thread-safe pool with per-worker connection reuse
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available before the checkout timeout"""
+
+
+class ConnectionPool:
+    """Keeps at most `max_size` open connections and hands them out to workers.
+
+    A worker that passes the same `worker_key` on every checkout gets back the
+    connection it used last, as long as nobody else took it in the meantime.
+    Connections idle for longer than `health_check_interval` seconds are
+    checked with `health_check` before being handed out and replaced if dead.
+    """
+
+    def __init__(self, connect: Callable[[], Any], max_size: int = 10,
+                 checkout_timeout: float = 30.0,
+                 health_check_interval: float = 0.5,
+                 health_check: Optional[Callable[[Any], bool]] = None,
+                 on_open: Optional[Callable[[], None]] = None,
+                 on_close: Optional[Callable[[], None]] = None,
+                 on_wait: Optional[Callable[[float], None]] = None):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._connect = connect
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self._health_check = health_check or (lambda conn: conn.is_connected())
+        self._on_open = on_open
+        self._on_close = on_close
+        self._on_wait = on_wait
+
+        self._cond = threading.Condition()
+        self._idle: List[Any] = []
+        self._released_at: Dict[int, float] = {}
+        self._affinity: Dict[Hashable, Any] = {}
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+
+    def acquire(self, worker_key: Optional[Hashable] = None):
+        """Check out a connection, preferring the one `worker_key` used last"""
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+        conn = None
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+                conn = self._take_idle(worker_key)
+                if conn is not None:
+                    break
+                if self._size < self.max_size:
+                    # Reserve the slot now, open the connection outside the lock
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"No connection available after {self.checkout_timeout}s "
+                        f"(pool size {self.max_size})"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+            released_at = self._released_at.pop(id(conn), 0.0) if conn is not None else 0.0
+
+        if self._on_wait:
+            self._on_wait(time.monotonic() - start)
+
+        if conn is not None and time.monotonic() - released_at >= self.health_check_interval:
+            if not self._is_healthy(conn):
+                logger.warning("Discarding dead pooled connection")
+                with self._cond:
+                    self._forget(conn)
+                self._close(conn)
+                conn = None
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+            if self._on_open:
+                self._on_open()
+        return conn
+
+    def release(self, conn, worker_key: Optional[Hashable] = None, discard: bool = False):
+        """Return a connection to the pool, or close it if `discard` is set"""
+        with self._cond:
+            self._in_use -= 1
+            if discard or self._closed:
+                self._size -= 1
+                self._forget(conn)
+            else:
+                self._idle.append(conn)
+                self._released_at[id(conn)] = time.monotonic()
+                if worker_key is not None:
+                    self._affinity[worker_key] = conn
+            self._cond.notify()
+
+        if discard or self._closed:
+            self._close(conn)
+
+    def close_all(self):
+        """Close idle connections; connections still checked out close on release"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._affinity.clear()
+            self._released_at.clear()
+            self._cond.notify_all()
+
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of pool occupancy"""
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                'max_size': self.max_size
+            }
+
+    def _take_idle(self, worker_key):
+        if not self._idle:
+            return None
+        preferred = self._affinity.get(worker_key) if worker_key is not None else None
+        if preferred is not None:
+            for i, conn in enumerate(self._idle):
+                if conn is preferred:
+                    return self._idle.pop(i)
+        # LIFO keeps the hottest connections in use and lets the rest age out
+        return self._idle.pop()
+
+    def _forget(self, conn):
+        self._released_at.pop(id(conn), None)
+        for key in [k for k, c in self._affinity.items() if c is conn]:
+            del self._affinity[key]
+
+    def _is_healthy(self, conn) -> bool:
+        try:
+            return bool(self._health_check(conn))
+        except Exception:
+            return False
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled connection: {e}")
+        finally:
+            if self._on_close:
+                self._on_close()
@@ -4,14 +4,20 @@ Simulador de Deadlocks para Escenario MySQL
 Genera patrones realistas de deadlocks en e-commerce
 """
 
-import mysql.connector
+try:
+    import mysql.connector
+except ImportError:  # Solo necesario con DB_DRIVER=mysql
+    mysql = None
 import threading
 import time
-import random
 import logging
 import os
 from datetime import datetime
 
+from fake_mysql import DatabaseError, FakeMySQLServer, InventoryCatalog
+from retry_policy import RetryPolicy
+from workloads import WorkloadStreams
+
 # Configuración de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -41,186 +47,279 @@ class DeadlockSimulator:
         self.products = list(range(1, 101))  # 100 productos
         self.customers = list(range(1, 1001))  # 1000 clientes
         
+        # DB_DRIVER=fake usa un backend en memoria con locks de registro y gap de InnoDB y detección de deadlocks
+        self.fake_server = None
+        if os.getenv('DB_DRIVER', 'mysql') == 'fake':
+            self.fake_server = FakeMySQLServer(
+                float(os.getenv('FAKE_LATENCY', '0.001')),
+                float(os.getenv('FAKE_LOCK_WAIT_TIMEOUT', '50')),
+                InventoryCatalog(len(self.products))
+            )
+        
+        # Semilla por worker y traza binaria opcional de cada valor aleatorio (SIMULATION_SEED, TRACE_FILE)
+        self.streams = WorkloadStreams.from_config({
+            'simulation_seed': int(os.environ['SIMULATION_SEED']) if os.getenv('SIMULATION_SEED') else None,
+            'trace_file': os.getenv('TRACE_FILE', '')
+        })
+        
+        # Reintentos ante deadlock (RETRY_MAX_ATTEMPTS=1 conserva el comportamiento original)
+        self.retry_policy = RetryPolicy.from_config({
+            'retry_max_attempts': int(os.getenv('RETRY_MAX_ATTEMPTS', '1')),
+            'retry_backoff': os.getenv('RETRY_BACKOFF', 'exponential'),
+            'retry_base_delay': float(os.getenv('RETRY_BASE_DELAY', '0.05')),
+            'retry_max_delay': float(os.getenv('RETRY_MAX_DELAY', '2.0')),
+            'retry_jitter': os.getenv('RETRY_JITTER', 'full'),
+            'retry_budget_ratio': float(os.getenv('RETRY_BUDGET_RATIO', '0')),
+            'retry_budget_min_per_second': float(os.getenv('RETRY_BUDGET_MIN_PER_SECOND', '1'))
+        }, self.streams.rng('retry'))
+        
         self.running = True
         
     def get_connection(self):
         """Obtiene conexión a la base de datos"""
+        if self.fake_server:
+            return self.fake_server.connect()
         return mysql.connector.connect(**self.db_config)
     
+    def run_with_retries(self, stream, attempt_fn, plan):
+        """Ejecuta una transacción reintentándola con los mismos datos según la política de reintentos"""
+        worker_type = stream.worker_type
+        attempt = 1
+        while True:
+            stream.attempt(attempt)
+            outcome = attempt_fn(plan)
+            stream.end(outcome)
+            delay = self.retry_policy.next_delay(worker_type, attempt, outcome)
+            if delay is None:
+                return outcome
+            logging.info(f"{worker_type}: reintento {attempt + 1} en {delay:.3f}s")
+            time.sleep(delay)
+            attempt += 1
+    
+    def plan_purchase(self, stream):
+        """Selecciona cliente y productos de una compra"""
+        rng = stream.rng
+        customer_id = rng.choice(self.customers)
+        product1 = rng.choice(self.products)
+        product2 = rng.choice(self.products)
+        
+        # Asegurar que sean productos diferentes
+        while product2 == product1:
+            product2 = rng.choice(self.products)
+        
+        # PATRÓN QUE CAUSA DEADLOCK:
+        # Ordenar productos de forma inconsistente
+        if rng.random() < self.deadlock_probability:
+            # Orden que favorece deadlock
+            first_product, second_product = max(product1, product2), min(product1, product2)
+        else:
+            # Orden consistente
+            first_product, second_product = min(product1, product2), max(product1, product2)
+        
+        stream.record('begin')
+        stream.record('customer', customer_id)
+        stream.record('product', first_product)
+        stream.record('product', second_product)
+        return {'customer_id': customer_id, 'products': (first_product, second_product)}
+    
     def buyer_process(self, buyer_id):
         """Simula proceso de compra que puede causar deadlocks"""
+        stream = self.streams.for_worker('buyer', buyer_id)
         while self.running:
-            try:
-                conn = self.get_connection()
-                cursor = conn.cursor()
-                
-                # Seleccionar productos y cliente aleatoriamente
-                customer_id = random.choice(self.customers)
-                product1 = random.choice(self.products)
-                product2 = random.choice(self.products)
-                
-                # Asegurar que sean productos diferentes
-                while product2 == product1:
-                    product2 = random.choice(self.products)
-                
-                # PATRÓN QUE CAUSA DEADLOCK:
-                # Ordenar productos de forma inconsistente
-                if random.random() < self.deadlock_probability:
-                    # Orden que favorece deadlock
-                    first_product, second_product = max(product1, product2), min(product1, product2)
-                else:
-                    # Orden consistente
-                    first_product, second_product = min(product1, product2), max(product1, product2)
-                
-                logging.info(f"Buyer {buyer_id}: Iniciando compra - Cliente {customer_id}, Productos {first_product}, {second_product}")
-                
-                # Transacción de compra
-                cursor.execute("START TRANSACTION")
+            plan = self.plan_purchase(stream)
+            self.run_with_retries(stream, lambda p: self.purchase_attempt(buyer_id, stream, p), plan)
+            
+            # Pausa entre transacciones
+            time.sleep(stream.think(0.5, 2.0))
+    
+    def purchase_attempt(self, buyer_id, stream, plan):
+        """Un intento de compra; devuelve 'success', 'deadlock' o 'error'"""
+        conn = cursor = None
+        customer_id = plan['customer_id']
+        first_product, second_product = plan['products']
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            logging.info(f"Buyer {buyer_id}: Iniciando compra - Cliente {customer_id}, Productos {first_product}, {second_product}")
+            
+            # Transacción de compra
+            cursor.execute("START TRANSACTION")
+            
+            # 1. Verificar y reservar inventario del primer producto
+            cursor.execute("""
+                SELECT stock FROM inventory 
+                WHERE product_id = %s FOR UPDATE
+            """, (first_product,))
+            
+            stock1 = cursor.fetchone()
+            if stock1 and stock1[0] > 0:
+                # Simular tiempo de procesamiento
+                time.sleep(stream.delay(0.1, 0.3))
                 
-                # 1. Verificar y reservar inventario del primer producto
+                # 2. Verificar y reservar inventario del segundo producto
                 cursor.execute("""
                     SELECT stock FROM inventory 
                     WHERE product_id = %s FOR UPDATE
-                """, (first_product,))
+                """, (second_product,))
                 
-                stock1 = cursor.fetchone()
-                if stock1 and stock1[0] > 0:
-                    # Simular tiempo de procesamiento
-                    time.sleep(random.uniform(0.1, 0.3))
+                stock2 = cursor.fetchone()
+                if stock2 and stock2[0] > 0:
+                    # 3. Crear orden
+                    cursor.execute("""
+                        INSERT INTO orders (customer_id, total_amount, status, created_at)
+                        VALUES (%s, %s, 'processing', NOW())
+                    """, (customer_id, stream.rng.uniform(50, 500)))
+                    
+                    order_id = cursor.lastrowid
                     
-                    # 2. Verificar y reservar inventario del segundo producto
+                    # 4. Actualizar inventario
                     cursor.execute("""
-                        SELECT stock FROM inventory 
-                        WHERE product_id = %s FOR UPDATE
+                        UPDATE inventory 
+                        SET stock = stock - 1, last_updated = NOW()
+                        WHERE product_id = %s
+                    """, (first_product,))
+                    
+                    cursor.execute("""
+                        UPDATE inventory 
+                        SET stock = stock - 1, last_updated = NOW()
+                        WHERE product_id = %s
                     """, (second_product,))
                     
-                    stock2 = cursor.fetchone()
-                    if stock2 and stock2[0] > 0:
-                        # 3. Crear orden
-                        cursor.execute("""
-                            INSERT INTO orders (customer_id, total_amount, status, created_at)
-                            VALUES (%s, %s, 'processing', NOW())
-                        """, (customer_id, random.uniform(50, 500)))
-                        
-                        order_id = cursor.lastrowid
-                        
-                        # 4. Actualizar inventario
-                        cursor.execute("""
-                            UPDATE inventory 
-                            SET stock = stock - 1, last_updated = NOW()
-                            WHERE product_id = %s
-                        """, (first_product,))
-                        
-                        cursor.execute("""
-                            UPDATE inventory 
-                            SET stock = stock - 1, last_updated = NOW()
-                            WHERE product_id = %s
-                        """, (second_product,))
-                        
-                        # 5. Crear items de orden
-                        cursor.execute("""
-                            INSERT INTO order_items (order_id, product_id, quantity, price)
-                            VALUES (%s, %s, 1, %s), (%s, %s, 1, %s)
-                        """, (order_id, first_product, random.uniform(20, 100),
-                              order_id, second_product, random.uniform(20, 100)))
-                        
-                        # 6. Procesar pago (simular delay)
-                        time.sleep(random.uniform(0.2, 0.5))
-                        
-                        cursor.execute("""
-                            INSERT INTO payments (order_id, amount, status, processed_at)
-                            VALUES (%s, %s, 'completed', NOW())
-                        """, (order_id, random.uniform(50, 500)))
-                        
-                        conn.commit()
-                        logging.info(f"Buyer {buyer_id}: Compra exitosa - Orden {order_id}")
-                    else:
-                        conn.rollback()
-                        logging.warning(f"Buyer {buyer_id}: Sin stock producto {second_product}")
-                else:
-                    conn.rollback()
-                    logging.warning(f"Buyer {buyer_id}: Sin stock producto {first_product}")
-                
-                cursor.close()
-                conn.close()
-                
-            except mysql.connector.Error as e:
-                if "Deadlock found" in str(e):
-                    logging.error(f"Buyer {buyer_id}: DEADLOCK detectado - {e}")
+                    # 5. Crear items de orden
+                    cursor.execute("""
+                        INSERT INTO order_items (order_id, product_id, quantity, price)
+                        VALUES (%s, %s, 1, %s), (%s, %s, 1, %s)
+                    """, (order_id, first_product, stream.rng.uniform(20, 100),
+                          order_id, second_product, stream.rng.uniform(20, 100)))
+                    
+                    # 6. Procesar pago (simular delay)
+                    time.sleep(stream.delay(0.2, 0.5))
+                    
+                    cursor.execute("""
+                        INSERT INTO payments (order_id, amount, status, processed_at)
+                        VALUES (%s, %s, 'completed', NOW())
+                    """, (order_id, stream.rng.uniform(50, 500)))
+                    
+                    conn.commit()
+                    logging.info(f"Buyer {buyer_id}: Compra exitosa - Orden {order_id}")
                 else:
-                    logging.error(f"Buyer {buyer_id}: Error DB - {e}")
-                try:
                     conn.rollback()
+                    logging.warning(f"Buyer {buyer_id}: Sin stock producto {second_product}")
+            else:
+                conn.rollback()
+                logging.warning(f"Buyer {buyer_id}: Sin stock producto {first_product}")
+            
+            return 'success'
+            
+        except DatabaseError as e:
+            try:
+                conn.rollback()
+            except:
+                pass
+            if e.errno == 1213 or "Deadlock found" in str(e):
+                logging.error(f"Buyer {buyer_id}: DEADLOCK detectado - {e}")
+                return 'deadlock'
+            logging.error(f"Buyer {buyer_id}: Error DB - {e}")
+            return 'error'
+        finally:
+            try:
+                if cursor:
                     cursor.close()
+                if conn:
                     conn.close()
-                except:
-                    pass
-            
-            # Pausa entre transacciones
-            time.sleep(random.uniform(0.5, 2.0))
+            except:
+                pass
+    
+    def plan_restock(self, stream):
+        """Selecciona los productos de un restock, en orden aleatorio (causa deadlocks)"""
+        products_to_restock = stream.rng.sample(self.products, stream.rng.randint(3, 8))
+        stream.rng.shuffle(products_to_restock)
+        stream.record('begin')
+        for product_id in products_to_restock:
+            stream.record('product', product_id)
+        return {'products': products_to_restock}
     
     def restock_process(self, restock_id):
         """Simula proceso de restock que puede causar deadlocks"""
+        stream = self.streams.for_worker('restocker', restock_id)
         while self.running:
-            try:
-                conn = self.get_connection()
-                cursor = conn.cursor()
-                
-                # Seleccionar múltiples productos para restock
-                products_to_restock = random.sample(self.products, random.randint(3, 8))
-                
-                logging.info(f"Restock {restock_id}: Iniciando restock - Productos {products_to_restock}")
-                
-                cursor.execute("START TRANSACTION")
-                
-                # Actualizar inventario en orden aleatorio (causa deadlocks)
-                random.shuffle(products_to_restock)
+            plan = self.plan_restock(stream)
+            self.run_with_retries(stream, lambda p: self.restock_attempt(restock_id, stream, p), plan)
+            
+            # Pausa entre restocks
+            time.sleep(stream.think(5, 15))
+    
+    def restock_attempt(self, restock_id, stream, plan):
+        """Un intento de restock; devuelve 'success', 'deadlock' o 'error'"""
+        conn = cursor = None
+        products_to_restock = plan['products']
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            logging.info(f"Restock {restock_id}: Iniciando restock - Productos {products_to_restock}")
+            
+            cursor.execute("START TRANSACTION")
+            
+            for product_id in products_to_restock:
+                # Bloquear producto para actualización
+                cursor.execute("""
+                    SELECT stock FROM inventory 
+                    WHERE product_id = %s FOR UPDATE
+                """, (product_id,))
                 
-                for product_id in products_to_restock:
-                    # Bloquear producto para actualización
-                    cursor.execute("""
-                        SELECT stock FROM inventory 
-                        WHERE product_id = %s FOR UPDATE
-                    """, (product_id,))
-                    
-                    current_stock = cursor.fetchone()[0]
-                    new_stock = current_stock + random.randint(10, 50)
-                    
-                    # Simular tiempo de procesamiento
-                    time.sleep(random.uniform(0.1, 0.2))
-                    
-                    cursor.execute("""
-                        UPDATE inventory 
-                        SET stock = %s, last_updated = NOW()
-                        WHERE product_id = %s
-                    """, (new_stock, product_id))
-                    
-                    # Log de restock
-                    cursor.execute("""
-                        INSERT INTO inventory_logs (product_id, old_stock, new_stock, operation, created_at)
-                        VALUES (%s, %s, %s, 'restock', NOW())
-                    """, (product_id, current_stock, new_stock))
+                current_stock = cursor.fetchone()[0]
+                new_stock = current_stock + stream.quantity(10, 50)
                 
-                conn.commit()
-                logging.info(f"Restock {restock_id}: Restock exitoso")
+                # Simular tiempo de procesamiento
+                time.sleep(stream.delay(0.1, 0.2))
                 
-                cursor.close()
-                conn.close()
+                cursor.execute("""
+                    UPDATE inventory 
+                    SET stock = %s, last_updated = NOW()
+                    WHERE product_id = %s
+                """, (new_stock, product_id))
                 
-            except mysql.connector.Error as e:
-                if "Deadlock found" in str(e):
-                    logging.error(f"Restock {restock_id}: DEADLOCK detectado - {e}")
-                else:
-                    logging.error(f"Restock {restock_id}: Error DB - {e}")
-                try:
-                    conn.rollback()
+                # Log de restock
+                cursor.execute("""
+                    INSERT INTO inventory_logs (product_id, old_stock, new_stock, operation, created_at)
+                    VALUES (%s, %s, %s, 'restock', NOW())
+                """, (product_id, current_stock, new_stock))
+            
+            conn.commit()
+            logging.info(f"Restock {restock_id}: Restock exitoso")
+            return 'success'
+            
+        except DatabaseError as e:
+            try:
+                conn.rollback()
+            except:
+                pass
+            if e.errno == 1213 or "Deadlock found" in str(e):
+                logging.error(f"Restock {restock_id}: DEADLOCK detectado - {e}")
+                return 'deadlock'
+            logging.error(f"Restock {restock_id}: Error DB - {e}")
+            return 'error'
+        finally:
+            try:
+                if cursor:
                     cursor.close()
+                if conn:
                     conn.close()
-                except:
-                    pass
-            
-            # Pausa entre restocks
-            time.sleep(random.uniform(5, 15))
+            except:
+                pass
+    
+    def log_lock_stats(self):
+        """Deadlocks y esperas de lock por segundo del backend en memoria (comparables con Innodb_deadlocks)"""
+        if not self.fake_server:
+            return
+        stats = self.fake_server.locks.stats
+        seconds = stats.per_second(10)
+        if seconds:
+            deadlocks = sum(bucket['deadlocks'] for bucket in seconds) / len(seconds)
+            waits = sum(bucket['lock_waits'] for bucket in seconds) / len(seconds)
+            logging.info(f"Locks: {deadlocks:.1f} deadlocks/s, {waits:.1f} esperas/s - {stats.status()}")
     
     def start_simulation(self):
         """Inicia la simulación de deadlocks"""
@@ -257,6 +356,7 @@ class DeadlockSimulator:
             while True:
                 time.sleep(10)
                 logging.info("Simulación activa...")
+                self.log_lock_stats()
         except KeyboardInterrupt:
             logging.info("Deteniendo simulación...")
             self.running = False
@@ -264,6 +364,7 @@ class DeadlockSimulator:
             # Esperar que terminen los threads
             for thread in threads:
                 thread.join(timeout=5)
+            self.streams.close()
 
 if __name__ == "__main__":
     simulator = DeadlockSimulator()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+In-Process Fake MySQL Backend for the MySQL Deadlock Simulator
+Record and gap locks, deadlock detection and a mysql.connector-like API for offline runs
+"""
+
+import re
+import time
+import fnmatch
+import threading
+from typing import Any, List, Optional, Tuple
+
+try:
+    from mysql.connector import Error as DatabaseError
+except ImportError:  # Only needed for DB_DRIVER=mysql
+    class DatabaseError(Exception):
+        """Stand-in for mysql.connector.Error when the connector is not installed"""
+
+        def __init__(self, msg: Optional[str] = None, errno: Optional[int] = None):
+            super().__init__(f"{errno} ({msg})" if errno else msg)
+            self.msg = msg
+            self.errno = errno
+
+from queries import (
+    BUYER_LOCK_SQL, DECREMENT_STOCK_SQL, INSERT_ORDER_SQL, INSERT_ORDER_ITEM_SQL,
+    INSERT_MOVEMENT_OUT_SQL, RESTOCK_LOCK_SQL, INCREMENT_STOCK_SQL,
+    INSERT_MOVEMENT_IN_SQL, REPORT_SQL, INSERT_ORDER_ITEMS_BATCH_SQL, INSERT_MOVEMENTS_OUT_BATCH_SQL
+)
+from lock_manager import (
+    S, X, GAP, INSERT_INTENTION, SUPREMUM, LockKey, LockManager, LockTransaction,
+    DeadlockDetected, LockWaitTimeout, record, gap, next_key
+)
+
+DEADLOCK = 1213
+LOCK_WAIT_TIMEOUT = 1205
+
+
+class FakeMySQLError(DatabaseError):
+    """Error raised by the fake backend, carrying a MySQL error number"""
+
+    def __init__(self, errno: int, msg: str):
+        super().__init__(msg=msg, errno=errno)
+
+
+class FakeCatalog:
+    """The simulator's products, order and movement tables, kept in memory.
+
+    `lock_requests` lists the InnoDB locks a statement takes and `apply`
+    executes it, appending what it changed to the caller's undo log so a
+    rollback can revert it. Locks are taken by the caller through a
+    lock_manager.LockManager, which lets the threaded and asyncio fakes
+    share the data model.
+    """
+
+    PRODUCTS = [
+        ('Laptop Pro', 1299.99, 50), ('Wireless Mouse', 29.99, 200),
+        ('Mechanical Keyboard', 89.99, 100), ('Monitor 27"', 299.99, 75),
+        ('USB Cable', 9.99, 500), ('Smartphone', 699.99, 30),
+        ('Tablet', 399.99, 40), ('Headphones', 149.99, 80),
+        ('Speaker', 79.99, 60), ('Charger', 19.99, 150)
+    ]
+
+    def __init__(self):
+        self.products = {
+            i + 1: {'name': name, 'price': price, 'stock': stock}
+            for i, (name, price, stock) in enumerate(self.PRODUCTS)
+        }
+        self.sold = {product_id: 0 for product_id in self.products}
+        self.restocked = {product_id: 0 for product_id in self.products}
+        self.next_id = {'orders': 1, 'order_items': 1, 'inventory_movements': 1}
+        self.lock = threading.Lock()
+
+    def lock_requests(self, sql: str, params: Tuple) -> List[Tuple[LockKey, str]]:
+        """Locks InnoDB takes for a statement: PRIMARY KEY lookups lock just the record,
+        range scans take next-key locks, inserts need an insert intention on the gap
+        at the end of the table and a shared lock on each foreign key parent row"""
+        if sql is BUYER_LOCK_SQL or sql is RESTOCK_LOCK_SQL:
+            return self._product_lock(params[0])
+        if sql is DECREMENT_STOCK_SQL or sql is INCREMENT_STOCK_SQL:
+            return self._product_lock(params[1])
+        if sql is REPORT_SQL:
+            low, high = params
+            requests = []
+            for product_id in range(low, high + 1):
+                if product_id in self.products:
+                    requests.extend(next_key('products', product_id))
+            requests.append((gap('products', self._next_product(high)), GAP))
+            return requests
+        if sql is INSERT_ORDER_SQL:
+            return [(gap('orders'), INSERT_INTENTION), (record('users', params[0]), S)]
+        if sql is INSERT_ORDER_ITEM_SQL:
+            return self._order_item_locks(params[0], params[1])
+        if sql is INSERT_MOVEMENT_OUT_SQL or sql is INSERT_MOVEMENT_IN_SQL:
+            return [(gap('inventory_movements'), INSERT_INTENTION), (record('products', params[0]), S)]
+        if sql.startswith(INSERT_ORDER_ITEMS_BATCH_SQL):
+            return [request for i in range(0, len(params), 4)
+                    for request in self._order_item_locks(params[i], params[i + 1])]
+        if sql.startswith(INSERT_MOVEMENTS_OUT_BATCH_SQL):
+            return [(gap('inventory_movements'), INSERT_INTENTION)] + [
+                (record('products', params[i]), S) for i in range(0, len(params), 3)]
+        return []
+
+    def _product_lock(self, product_id: int) -> List[Tuple[LockKey, str]]:
+        if product_id in self.products:
+            return [(record('products', product_id), X)]
+        # A unique lookup that finds nothing locks the gap where the row would be
+        return [(gap('products', self._next_product(product_id)), GAP)]
+
+    def _next_product(self, product_id: int) -> Any:
+        following = [other for other in self.products if other > product_id]
+        return min(following) if following else SUPREMUM
+
+    def _order_item_locks(self, order_id: int, product_id: int) -> List[Tuple[LockKey, str]]:
+        return [(gap('order_items'), INSERT_INTENTION),
+                (record('orders', order_id), S), (record('products', product_id), S)]
+
+    def apply(self, sql: str, params: Tuple, undo: List[Tuple[str, int, int]]) -> Tuple[List[Tuple], Optional[int]]:
+        """Execute one statement; returns (rows, lastrowid)"""
+        with self.lock:
+            products = self.products
+
+            if sql is BUYER_LOCK_SQL or sql is RESTOCK_LOCK_SQL:
+                row = products.get(params[0])
+                if row is None:
+                    return [], None
+                if sql is BUYER_LOCK_SQL:
+                    return [(row['stock'], row['price'])], None
+                return [(row['stock'],)], None
+
+            if sql is DECREMENT_STOCK_SQL or sql is INCREMENT_STOCK_SQL:
+                quantity, product_id = params
+                delta = -quantity if sql is DECREMENT_STOCK_SQL else quantity
+                products[product_id]['stock'] += delta
+                undo.append(('stock', product_id, delta))
+                return [], None
+
+            if sql is INSERT_ORDER_SQL:
+                return [], self._next_id('orders')
+
+            if sql is INSERT_ORDER_ITEM_SQL:
+                _, product_id, quantity, _ = params
+                self._sell(product_id, quantity, undo)
+                return [], self._next_id('order_items')
+
+            if sql is INSERT_MOVEMENT_OUT_SQL or sql is INSERT_MOVEMENT_IN_SQL:
+                if sql is INSERT_MOVEMENT_IN_SQL:
+                    product_id, quantity = params
+                    self.restocked[product_id] += quantity
+                    undo.append(('restocked', product_id, quantity))
+                return [], self._next_id('inventory_movements')
+
+            if sql.startswith(INSERT_ORDER_ITEMS_BATCH_SQL):
+                first_id = None
+                for i in range(0, len(params), 4):
+                    _, product_id, quantity, _ = params[i:i + 4]
+                    self._sell(product_id, quantity, undo)
+                    row_id = self._next_id('order_items')
+                    first_id = first_id or row_id
+                return [], first_id
+
+            if sql.startswith(INSERT_MOVEMENTS_OUT_BATCH_SQL):
+                first_id = None
+                for _ in range(0, len(params), 3):
+                    row_id = self._next_id('inventory_movements')
+                    first_id = first_id or row_id
+                return [], first_id
+
+            if sql is REPORT_SQL:
+                low, high = params
+                return [
+                    (product_id, products[product_id]['name'], products[product_id]['stock'],
+                     self.sold[product_id], self.restocked[product_id])
+                    for product_id in range(low, high + 1) if product_id in products
+                ], None
+
+            if sql.strip().upper() == 'SELECT 1':
+                return [(1,)], None
+
+        raise FakeMySQLError(1064, f"Fake backend does not understand: {sql.strip()[:60]}")
+
+    def rollback(self, undo: List[Tuple[str, int, int]]):
+        with self.lock:
+            for kind, product_id, amount in reversed(undo):
+                if kind == 'stock':
+                    self.products[product_id]['stock'] -= amount
+                elif kind == 'sold':
+                    self.sold[product_id] -= amount
+                else:
+                    self.restocked[product_id] -= amount
+
+    def _sell(self, product_id: int, quantity: int, undo: List[Tuple[str, int, int]]):
+        self.sold[product_id] += quantity
+        undo.append(('sold', product_id, quantity))
+
+    def _next_id(self, table: str) -> int:
+        row_id = self.next_id[table]
+        self.next_id[table] += 1
+        return row_id
+
+
+class InventoryCatalog:
+    """The inventory schema deadlock-simulator.py writes to, matched by statement text.
+
+    inventory.product_id is treated as a non-unique secondary index, so
+    FOR UPDATE and UPDATE by product_id take a next-key lock on the match
+    plus the gap after it, as InnoDB does for non-unique equality lookups.
+    """
+
+    STATEMENTS = {
+        'select_stock': re.compile(r'^SELECT stock FROM inventory WHERE product_id = %s FOR UPDATE$'),
+        'decrement_stock': re.compile(r'^UPDATE inventory SET stock = stock - 1, last_updated = NOW\(\) WHERE product_id = %s$'),
+        'set_stock': re.compile(r'^UPDATE inventory SET stock = %s, last_updated = NOW\(\) WHERE product_id = %s$'),
+        'insert_order': re.compile(r'^INSERT INTO orders \(customer_id,'),
+        'insert_order_items': re.compile(r'^INSERT INTO order_items '),
+        'insert_payment': re.compile(r'^INSERT INTO payments '),
+        'insert_log': re.compile(r'^INSERT INTO inventory_logs '),
+        'start_transaction': re.compile(r'^START TRANSACTION$'),
+    }
+    INSERTS = {'insert_order': 'orders', 'insert_order_items': 'order_items',
+               'insert_payment': 'payments', 'insert_log': 'inventory_logs'}
+
+    def __init__(self, products: int = 100, initial_stock: int = 50):
+        self.stock = {product_id: initial_stock for product_id in range(1, products + 1)}
+        self.next_id = {'orders': 1, 'order_items': 1, 'payments': 1, 'inventory_logs': 1}
+        self.lock = threading.Lock()
+
+    def statement(self, sql: str) -> str:
+        normalized = ' '.join(sql.split())
+        for name, pattern in self.STATEMENTS.items():
+            if pattern.match(normalized):
+                return name
+        raise FakeMySQLError(1064, f"Fake backend does not understand: {normalized[:60]}")
+
+    def lock_requests(self, sql: str, params: Tuple) -> List[Tuple[LockKey, str]]:
+        name = self.statement(sql)
+        if name == 'select_stock' or name == 'decrement_stock':
+            return self._product_locks(params[0])
+        if name == 'set_stock':
+            return self._product_locks(params[1])
+        if name == 'insert_order_items':
+            return [(gap('order_items'), INSERT_INTENTION), (record('orders', params[0]), S)]
+        if name == 'insert_payment':
+            return [(gap('payments'), INSERT_INTENTION), (record('orders', params[0]), S)]
+        if name in self.INSERTS:
+            return [(gap(self.INSERTS[name]), INSERT_INTENTION)]
+        return []
+
+    def _product_locks(self, product_id: int) -> List[Tuple[LockKey, str]]:
+        following = [other for other in self.stock if other > product_id]
+        requests = next_key('inventory', product_id) if product_id in self.stock else []
+        return requests + [(gap('inventory', min(following) if following else SUPREMUM), GAP)]
+
+    def apply(self, sql: str, params: Tuple, undo: List[Tuple[str, int, int]]) -> Tuple[List[Tuple], Optional[int]]:
+        name = self.statement(sql)
+        with self.lock:
+            if name == 'select_stock':
+                stock = self.stock.get(params[0])
+                return ([(stock,)] if stock is not None else []), None
+            if name == 'decrement_stock':
+                self._set_stock(params[0], self.stock[params[0]] - 1, undo)
+                return [], None
+            if name == 'set_stock':
+                self._set_stock(params[1], params[0], undo)
+                return [], None
+            if name == 'start_transaction':
+                return [], None
+            table = self.INSERTS[name]
+            row_id = self.next_id[table]
+            self.next_id[table] += 1
+            return [], row_id
+
+    def rollback(self, undo: List[Tuple[str, int, int]]):
+        with self.lock:
+            for _, product_id, previous in reversed(undo):
+                self.stock[product_id] = previous
+
+    def _set_stock(self, product_id: int, stock: int, undo: List[Tuple[str, int, int]]):
+        undo.append(('stock', product_id, self.stock[product_id]))
+        self.stock[product_id] = stock
+
+
+class FakeMySQLServer:
+    """Shared state every FakeMySQLConnection of a process talks to"""
+
+    def __init__(self, latency: float = 0.001, lock_wait_timeout: float = 50.0, catalog: Any = None):
+        self.latency = latency
+        self.catalog = catalog or FakeCatalog()
+        self.locks = LockManager(lock_wait_timeout)
+
+    def connect(self) -> 'FakeMySQLConnection':
+        return FakeMySQLConnection(self)
+
+    def show_status(self, sql: str) -> List[Tuple[str, str]]:
+        """Answer SHOW GLOBAL STATUS [LIKE 'pattern'] from the lock statistics"""
+        match = re.search(r"LIKE\s+'([^']*)'", sql, re.I)
+        pattern = match.group(1).replace('%', '*').replace('_', '?') if match else '*'
+        return [(name, str(value)) for name, value in self.locks.stats.status().items()
+                if fnmatch.fnmatchcase(name.lower(), pattern.lower())]
+
+
+class FakeMySQLConnection:
+    """The subset of mysql.connector's connection API used by the simulators"""
+
+    def __init__(self, server: FakeMySQLServer):
+        self.server = server
+        self.connected = True
+        self.txn = LockTransaction(threading.Event())
+        self.undo: List[Tuple[str, int, int]] = []
+
+    def cursor(self) -> 'FakeCursor':
+        return FakeCursor(self)
+
+    def start_transaction(self):
+        self._end()
+
+    def commit(self):
+        self.undo = []
+        self._end()
+
+    def rollback(self):
+        self.server.catalog.rollback(self.undo)
+        self.undo = []
+        self._end()
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    def close(self):
+        if self.connected:
+            self.rollback()
+            self.connected = False
+
+    def execute(self, sql: str, params: Tuple) -> Tuple[List[Tuple], Optional[int]]:
+        if not self.connected:
+            raise FakeMySQLError(2006, "MySQL server has gone away")
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if sql.lstrip().upper().startswith('SHOW GLOBAL STATUS'):
+            return self.server.show_status(sql), None
+        try:
+            for key, mode in self.server.catalog.lock_requests(sql, params):
+                self.server.locks.acquire(self.txn, key, mode)
+        except DeadlockDetected:
+            raise FakeMySQLError(DEADLOCK, "Deadlock found when trying to get lock; try restarting transaction")
+        except LockWaitTimeout:
+            raise FakeMySQLError(LOCK_WAIT_TIMEOUT, "Lock wait timeout exceeded; try restarting transaction")
+        result = self.server.catalog.apply(sql, params, self.undo)
+        self.txn.rows_modified = len(self.undo)
+        return result
+
+    def _end(self):
+        self.server.locks.release_all(self.txn)
+
+
+class FakeCursor:
+    def __init__(self, conn: FakeMySQLConnection):
+        self.conn = conn
+        self.rows: List[Tuple] = []
+        self.lastrowid = None
+        self.rowcount = -1
+
+    def execute(self, sql: str, params: Tuple = ()):
+        try:
+            self.rows, lastrowid = self.conn.execute(sql, tuple(params or ()))
+        except FakeMySQLError as e:
+            if e.errno == DEADLOCK:
+                # InnoDB rolls back the whole victim transaction
+                self.conn.rollback()
+            raise
+        self.lastrowid = lastrowid if lastrowid is not None else self.lastrowid
+        self.rowcount = len(self.rows)
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        self.rows = []
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+HDR Latency Recorder for the MySQL Deadlock Simulator
+Per transaction type and outcome percentiles with coordinated-omission correction
+"""
+
+import math
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from metrics import latency_percentile
+
+logger = logging.getLogger(__name__)
+
+REPORTED_PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+class HdrHistogram:
+    """Log-linear histogram of integer values in the spirit of HdrHistogram.
+
+    Every value between `lowest` and `highest` is recorded with a relative
+    error below 10^-significant_figures, using a fixed array of counters, so
+    recording is O(1) and memory does not grow with the number of samples.
+    """
+
+    def __init__(self, lowest: int = 1, highest: int = 3_600_000_000, significant_figures: int = 3):
+        if not 1 <= significant_figures <= 5:
+            raise ValueError("significant_figures must be between 1 and 5")
+        self.lowest = lowest
+        self.highest = highest
+
+        largest_single_unit = 2 * 10 ** significant_figures
+        sub_bucket_count_magnitude = math.ceil(math.log2(largest_single_unit))
+        self.unit_magnitude = int(math.floor(math.log2(lowest)))
+        self.sub_bucket_half_count_magnitude = max(sub_bucket_count_magnitude, 1) - 1
+        self.sub_bucket_count = 1 << (self.sub_bucket_half_count_magnitude + 1)
+        self.sub_bucket_half_count = self.sub_bucket_count // 2
+        self.sub_bucket_mask = (self.sub_bucket_count - 1) << self.unit_magnitude
+
+        smallest_untrackable = self.sub_bucket_count << self.unit_magnitude
+        bucket_count = 1
+        while smallest_untrackable <= highest:
+            smallest_untrackable <<= 1
+            bucket_count += 1
+        self.counts = [0] * ((bucket_count + 1) * self.sub_bucket_half_count)
+
+        self.total_count = 0
+        self.min_value = None
+        self.max_value = 0
+        self.total = 0
+
+    def _index(self, value: int) -> int:
+        bucket_index = ((value | self.sub_bucket_mask).bit_length()
+                        - self.unit_magnitude - (self.sub_bucket_half_count_magnitude + 1))
+        sub_bucket_index = value >> (bucket_index + self.unit_magnitude)
+        return ((bucket_index + 1) << self.sub_bucket_half_count_magnitude) + \
+            (sub_bucket_index - self.sub_bucket_half_count)
+
+    def _value_at(self, index: int) -> int:
+        """Highest value that maps to the counter at `index`"""
+        bucket_index = (index >> self.sub_bucket_half_count_magnitude) - 1
+        sub_bucket_index = (index & (self.sub_bucket_half_count - 1)) + self.sub_bucket_half_count
+        if bucket_index < 0:
+            sub_bucket_index -= self.sub_bucket_half_count
+            bucket_index = 0
+        shift = bucket_index + self.unit_magnitude
+        return ((sub_bucket_index + 1) << shift) - 1
+
+    def record(self, value: int, count: int = 1):
+        value = min(max(int(value), 0), self.highest)
+        self.counts[self._index(value)] += count
+        self.total_count += count
+        self.total += value * count
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if value > self.max_value:
+            self.max_value = value
+
+    def record_corrected(self, value: int, expected_interval: int):
+        """Record `value` and back-fill the samples a stalled closed-loop client never sent"""
+        self.record(value)
+        if expected_interval <= 0 or value <= expected_interval:
+            return
+        missing = value - expected_interval
+        while missing >= expected_interval:
+            self.record(missing)
+            missing -= expected_interval
+
+    def percentile(self, percentile: float) -> int:
+        if self.total_count == 0:
+            return 0
+        target = max(1, math.ceil(percentile / 100.0 * self.total_count))
+        running = 0
+        for index, count in enumerate(self.counts):
+            if count:
+                running += count
+                if running >= target:
+                    return min(self._value_at(index), self.max_value)
+        return self.max_value
+
+    def mean(self) -> float:
+        return self.total / self.total_count if self.total_count else 0.0
+
+    def add(self, other: 'HdrHistogram'):
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total_count += other.total_count
+        self.total += other.total
+        if other.min_value is not None and (self.min_value is None or other.min_value < self.min_value):
+            self.min_value = other.min_value
+        self.max_value = max(self.max_value, other.max_value)
+
+
+class LatencyRecorder:
+    """Thread-safe latency histograms keyed by (transaction type, outcome).
+
+    Latencies are recorded in microseconds into three histograms per key: one
+    for the current reporting interval, one for the whole run and one for the
+    whole run with coordinated-omission correction, which needs the interval
+    at which each worker type is expected to start transactions.
+    """
+
+    def __init__(self, expected_intervals: Optional[Dict[str, float]] = None):
+        self.expected_intervals_us = {
+            tx_type: int(seconds * 1_000_000) for tx_type, seconds in (expected_intervals or {}).items()
+        }
+        self.lock = threading.Lock()
+        self.interval: Dict[Tuple[str, str], HdrHistogram] = {}
+        self.cumulative: Dict[Tuple[str, str], HdrHistogram] = {}
+        self.corrected: Dict[Tuple[str, str], HdrHistogram] = {}
+        self.stop_event = threading.Event()
+
+    def record(self, tx_type: str, outcome: str, seconds: float):
+        value = int(seconds * 1_000_000)
+        key = (tx_type, outcome)
+        with self.lock:
+            if key not in self.cumulative:
+                self.interval[key] = HdrHistogram()
+                self.cumulative[key] = HdrHistogram()
+                self.corrected[key] = HdrHistogram()
+            self.interval[key].record(value)
+            self.cumulative[key].record(value)
+            self.corrected[key].record_corrected(value, self.expected_intervals_us.get(tx_type, 0))
+
+    def report_interval(self) -> List[str]:
+        """Percentiles since the previous call, also published as Prometheus gauges"""
+        with self.lock:
+            snapshot, self.interval = self.interval, {key: HdrHistogram() for key in self.interval}
+
+        lines = []
+        for (tx_type, outcome), histogram in sorted(snapshot.items()):
+            if histogram.total_count == 0:
+                continue
+            for percentile in REPORTED_PERCENTILES:
+                latency_percentile.labels(type=tx_type, outcome=outcome, quantile=str(percentile / 100)).set(
+                    histogram.percentile(percentile) / 1_000_000
+                )
+            lines.append(f"{tx_type}/{outcome}: {self._format(histogram)}")
+        return lines
+
+    def final_report(self) -> List[str]:
+        """Whole-run percentiles, raw and corrected for coordinated omission"""
+        with self.lock:
+            keys = sorted(self.cumulative)
+            lines = []
+            for key in keys:
+                tx_type, outcome = key
+                lines.append(f"{tx_type}/{outcome} raw: {self._format(self.cumulative[key])}")
+                if self.expected_intervals_us.get(tx_type):
+                    lines.append(f"{tx_type}/{outcome} corrected: {self._format(self.corrected[key])}")
+            return lines
+
+    def start_reporter(self, interval_seconds: float) -> threading.Thread:
+        """Log and publish interval percentiles every `interval_seconds` in a daemon thread"""
+        def loop():
+            while not self.stop_event.wait(interval_seconds):
+                for line in self.report_interval():
+                    logger.info(f"Latency {line}")
+
+        thread = threading.Thread(target=loop, name="latency-reporter", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.stop_event.set()
+
+    @staticmethod
+    def _format(histogram: HdrHistogram) -> str:
+        percentiles = ", ".join(
+            f"p{percentile:g}={histogram.percentile(percentile) / 1000:.1f}ms"
+            for percentile in REPORTED_PERCENTILES
+        )
+        return (f"n={histogram.total_count}, mean={histogram.mean() / 1000:.1f}ms, {percentiles}, "
+                f"max={histogram.max_value / 1000:.1f}ms")
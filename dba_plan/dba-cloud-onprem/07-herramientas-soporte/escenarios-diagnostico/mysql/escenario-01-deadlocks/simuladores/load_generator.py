@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Open-Loop Load Generator for the MySQL Deadlock Simulator
+Issues transactions at a target rate regardless of how fast they complete
+"""
+
+import time
+import queue
+import random
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from metrics import arrivals_counter, missed_arrivals, queue_delay, service_time
+
+logger = logging.getLogger(__name__)
+
+
+class ArrivalProcess:
+    """Inter-arrival times for a target rate: 'poisson' (exponential gaps) or 'constant'"""
+
+    def __init__(self, target_tps: float, kind: str = 'poisson', rng: Optional[random.Random] = None):
+        if target_tps <= 0:
+            raise ValueError("target_tps must be positive")
+        if kind not in ('poisson', 'constant'):
+            raise ValueError(f"Unknown arrival process: {kind}")
+        self.target_tps = target_tps
+        self.kind = kind
+        self.rng = rng or random.Random()
+
+    def next_interval(self) -> float:
+        if self.kind == 'constant':
+            return 1.0 / self.target_tps
+        return self.rng.expovariate(self.target_tps)
+
+
+class LoadStats:
+    """Per worker type totals for the end-of-run summary"""
+
+    def __init__(self, worker_type: str):
+        self.worker_type = worker_type
+        self.lock = threading.Lock()
+        self.arrivals = 0
+        self.missed = 0
+        self.completed = 0
+        self.queue_delay_total = 0.0
+        self.queue_delay_max = 0.0
+        self.service_time_total = 0.0
+
+    def arrival(self, missed: bool = False):
+        arrivals_counter.labels(worker_type=self.worker_type).inc()
+        if missed:
+            missed_arrivals.labels(worker_type=self.worker_type).inc()
+        with self.lock:
+            self.arrivals += 1
+            if missed:
+                self.missed += 1
+
+    def completion(self, delay: float, service: float):
+        queue_delay.labels(worker_type=self.worker_type).observe(delay)
+        service_time.labels(worker_type=self.worker_type).observe(service)
+        with self.lock:
+            self.completed += 1
+            self.queue_delay_total += delay
+            self.queue_delay_max = max(self.queue_delay_max, delay)
+            self.service_time_total += service
+
+    def summary(self, elapsed: float) -> str:
+        with self.lock:
+            completed = self.completed or 1
+            return (
+                f"{self.worker_type}: offered {self.arrivals / elapsed:.1f} tps, "
+                f"completed {self.completed / elapsed:.1f} tps, missed {self.missed}, "
+                f"queue delay avg {self.queue_delay_total / completed * 1000:.1f} ms "
+                f"max {self.queue_delay_max * 1000:.1f} ms, "
+                f"service time avg {self.service_time_total / completed * 1000:.1f} ms"
+            )
+
+
+class OpenLoopScheduler:
+    """Generates arrivals for one worker type and hands them to a fixed set of executor threads.
+
+    Arrivals are scheduled on a fixed timeline, so when the database slows
+    down they pile up in the backlog instead of being silently skipped. An
+    arrival that finds the backlog full is dropped and counted as missed.
+    Queueing delay is measured from the scheduled arrival time to the start
+    of the transaction, service time from start to end.
+    """
+
+    def __init__(self, worker_type: str, execute: Callable[[int], None], workers: int,
+                 target_tps: float, arrival_process: str = 'poisson', max_backlog: int = 1000,
+                 rng: Optional[random.Random] = None):
+        self.worker_type = worker_type
+        self.execute = execute
+        self.workers = workers
+        self.arrivals = ArrivalProcess(target_tps, arrival_process, rng)
+        self.backlog: queue.Queue = queue.Queue(maxsize=max_backlog)
+        self.stats = LoadStats(worker_type)
+        self.stop_event = threading.Event()
+        self.threads: List[threading.Thread] = []
+        self.started_at = None
+        self.stopped_at = None
+
+    def start(self) -> List[threading.Thread]:
+        self.started_at = time.monotonic()
+        dispatcher = threading.Thread(target=self.dispatch, name=f"{self.worker_type}-dispatcher")
+        self.threads.append(dispatcher)
+        for i in range(self.workers):
+            self.threads.append(threading.Thread(
+                target=self.executor, args=(i + 1,), name=f"{self.worker_type}-{i + 1}"
+            ))
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+        return self.threads
+
+    def stop(self):
+        self.stopped_at = time.monotonic()
+        self.stop_event.set()
+
+    def dispatch(self):
+        """Put arrivals on the backlog at their scheduled times"""
+        next_arrival = time.monotonic()
+        while not self.stop_event.is_set():
+            next_arrival += self.arrivals.next_interval()
+            delay = next_arrival - time.monotonic()
+            if delay > 0 and self.stop_event.wait(delay):
+                break
+            try:
+                self.backlog.put_nowait(next_arrival)
+                self.stats.arrival()
+            except queue.Full:
+                self.stats.arrival(missed=True)
+
+    def executor(self, worker_id: int):
+        """Run transactions for arrivals taken from the backlog"""
+        while not self.stop_event.is_set():
+            try:
+                scheduled = self.backlog.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            started = time.monotonic()
+            try:
+                self.execute(worker_id)
+            except Exception as e:
+                logger.error(f"{self.worker_type} {worker_id} executor error: {e}")
+            self.stats.completion(started - scheduled, time.monotonic() - started)
+
+    def summary(self) -> str:
+        now = self.stopped_at or time.monotonic()
+        elapsed = max(now - (self.started_at or now), 1e-9)
+        return self.stats.summary(elapsed) + f", backlog {self.backlog.qsize()}"
+
+
+def target_rates(config: Dict) -> Dict[str, float]:
+    """Target TPS per worker type for this process, skipping disabled types and types it has no workers of"""
+    rates = {
+        'buyer': config['target_tps_buyer'],
+        'restocker': config['target_tps_restocker'],
+        'reporter': config['target_tps_reporter']
+    }
+    # With SIMULATOR_PROCESSES > 1 each process generates the share of the rate of the workers it owns;
+    # a process that owns none of a type's workers gets none of its rate
+    shares = {}
+    for worker_type, tps in rates.items():
+        total = config[f'concurrent_{worker_type}s']
+        owned = len(owned_workers(config, worker_type))
+        if tps > 0 and owned:
+            shares[worker_type] = tps * owned / total
+    return shares
+
+
+def owned_workers(config: Dict, worker_type: str) -> List[int]:
+    """Ids of the workers of a type run by this process; ids are numbered across all processes"""
+    processes = config.get('simulator_processes', 1)
+    index = config.get('process_index', 0)
+    return [worker_id for worker_id in range(1, config[f'concurrent_{worker_type}s'] + 1)
+            if (worker_id - 1) % processes == index]
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+InnoDB-Style Lock Manager for the MySQL Deadlock Simulator fakes
+Record and gap locks, an incrementally checked wait-for graph and Innodb_* lock statistics
+"""
+
+import time
+import asyncio
+import itertools
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Record lock modes
+S = 'S'
+X = 'X'
+# Gap lock (open interval before a record) and the insert intention that waits on it
+GAP = 'GAP'
+INSERT_INTENTION = 'INSERT_INTENTION'
+
+SUPREMUM = 'supremum'
+
+LockKey = Tuple[str, str, Any]
+
+# InnoDB gives up on deadlock checks this deep or long and treats the waiter as a victim
+MAX_DEPTH = 200
+MAX_STEPS = 1000000
+
+
+def record(table: str, key: Any) -> LockKey:
+    return ('record', table, key)
+
+
+def gap(table: str, before: Any = SUPREMUM) -> LockKey:
+    """The gap just before index value `before` (SUPREMUM is the gap after the last record)"""
+    return ('gap', table, before)
+
+
+def next_key(table: str, key: Any) -> List[Tuple[LockKey, str]]:
+    """Next-key lock: the record plus the gap before it"""
+    return [(record(table, key), X), (gap(table, key), GAP)]
+
+
+def compatible(held: str, requested: str) -> bool:
+    if held in (GAP, INSERT_INTENTION) or requested in (GAP, INSERT_INTENTION):
+        # Gap locks only stop inserts; nothing waits for an insert intention
+        return not (held == GAP and requested == INSERT_INTENTION)
+    return held == S and requested == S
+
+
+class DeadlockDetected(Exception):
+    """The requesting transaction was chosen as a deadlock victim"""
+
+
+class LockWaitTimeout(Exception):
+    """A lock wait outlasted the lock wait timeout"""
+
+
+class LockTransaction:
+    """Lock-manager view of one transaction.
+
+    `waker` is a threading.Event for threaded callers or an asyncio.Event
+    for coroutines; the manager sets it whenever a lock the transaction is
+    waiting for may have become free, or when it is picked as a victim.
+    """
+
+    ids = itertools.count(1)
+
+    def __init__(self, waker: Any):
+        self.id = next(self.ids)
+        self.waker = waker
+        self.held: Dict[LockKey, Set[str]] = {}
+        self.waiting_key: Optional[LockKey] = None
+        self.waiting_mode: Optional[str] = None
+        self.waiting_for: Set['LockTransaction'] = set()
+        self.wait_started = 0.0
+        self.victim = False
+        self.rows_modified = 0
+
+    @property
+    def weight(self) -> int:
+        """InnoDB's victim weight: rows modified plus locks held"""
+        return self.rows_modified + len(self.held)
+
+
+class LockStats:
+    """Cumulative lock counters plus one bucket per wall-clock second"""
+
+    def __init__(self, history_seconds: int = 300):
+        self.deadlocks = 0
+        self.lock_waits = 0
+        self.lock_wait_timeouts = 0
+        self.current_waits = 0
+        self.lock_time = 0.0
+        self.lock_time_max = 0.0
+        self.buckets: deque = deque(maxlen=history_seconds)
+
+    def _bucket(self) -> Dict[str, float]:
+        second = int(time.time())
+        if not self.buckets or self.buckets[-1]['second'] != second:
+            self.buckets.append({'second': second, 'deadlocks': 0, 'lock_waits': 0,
+                                 'lock_wait_timeouts': 0, 'lock_time': 0.0})
+        return self.buckets[-1]
+
+    def count(self, event: str, amount: float = 1):
+        setattr(self, event, getattr(self, event) + amount)
+        self._bucket()[event] += amount
+
+    def waited(self, seconds: float):
+        self.count('lock_time', seconds)
+        self.lock_time_max = max(self.lock_time_max, seconds)
+
+    def status(self) -> Dict[str, int]:
+        """Counters named and scaled like SHOW GLOBAL STATUS (times in milliseconds)"""
+        return {
+            'Innodb_deadlocks': self.deadlocks,
+            'Innodb_row_lock_current_waits': self.current_waits,
+            'Innodb_row_lock_time': int(self.lock_time * 1000),
+            'Innodb_row_lock_time_avg': int(self.lock_time * 1000 / self.lock_waits) if self.lock_waits else 0,
+            'Innodb_row_lock_time_max': int(self.lock_time_max * 1000),
+            'Innodb_row_lock_waits': self.lock_waits,
+        }
+
+    def per_second(self, seconds: int = 60) -> List[Dict[str, float]]:
+        """Completed one-second buckets of the last `seconds` seconds, oldest first"""
+        now = int(time.time())
+        return [dict(bucket) for bucket in self.buckets if now - seconds <= bucket['second'] < now]
+
+
+class LockManager:
+    """Lock table and wait-for graph shared by every connection of a fake server.
+
+    Waits on a key queue in arrival order and, as in InnoDB, a request is
+    blocked both by conflicting locks held by other transactions and by
+    conflicting requests queued ahead of it, so a newcomer cannot overtake
+    older waiters. Those blockers are the requester's wait-for edges. Since
+    a new cycle has to go through a new edge, only the transactions
+    reachable from the requester are searched, instead of the whole graph;
+    the edges of the other waiters are recomputed from the current lock
+    table as the search reaches them, so a committed holder never leaves a
+    stale edge behind. The victim is the cheapest
+    transaction on the cycle by InnoDB's weight; a search deeper than
+    MAX_DEPTH or longer than MAX_STEPS makes the requester the victim, as
+    InnoDB does.
+    """
+
+    def __init__(self, lock_wait_timeout: float = 50.0, history_seconds: int = 300):
+        self.lock_wait_timeout = lock_wait_timeout
+        self.mutex = threading.Lock()
+        self.locks: Dict[LockKey, Dict[LockTransaction, Set[str]]] = {}
+        # Waiting transactions of each key in arrival order, with the mode each one requested
+        self.waiters: Dict[LockKey, Dict[LockTransaction, str]] = {}
+        self.stats = LockStats(history_seconds)
+
+    def acquire(self, txn: LockTransaction, key: LockKey, mode: str):
+        """Blocking acquire for threaded callers"""
+        deadline = None
+        while not self.request(txn, key, mode):
+            if deadline is None:
+                deadline = time.monotonic() + self.lock_wait_timeout
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.cancel(txn)
+                raise LockWaitTimeout()
+            txn.waker.wait(remaining)
+            txn.waker.clear()
+
+    async def acquire_async(self, txn: LockTransaction, key: LockKey, mode: str):
+        """Acquire for coroutines; `txn.waker` must be an asyncio.Event"""
+        deadline = None
+        while not self.request(txn, key, mode):
+            if deadline is None:
+                deadline = time.monotonic() + self.lock_wait_timeout
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.cancel(txn)
+                raise LockWaitTimeout()
+            try:
+                await asyncio.wait_for(txn.waker.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+            txn.waker.clear()
+
+    def request(self, txn: LockTransaction, key: LockKey, mode: str) -> bool:
+        """Grant the lock, or register the wait and return False; raises DeadlockDetected"""
+        with self.mutex:
+            if txn.victim:
+                self._stop_waiting(txn)
+                raise DeadlockDetected()
+
+            if any(held == mode or (held == X and mode == S) for held in txn.held.get(key, ())):
+                # Already holds an equal or stronger lock: granted without queueing, as in InnoDB
+                self._stop_waiting(txn, wake_queue=False)
+                return True
+            blockers = self._blockers(txn, key, mode)
+            if not blockers:
+                self._stop_waiting(txn, wake_queue=False)
+                self.locks.setdefault(key, {}).setdefault(txn, set()).add(mode)
+                txn.held.setdefault(key, set()).add(mode)
+                return True
+
+            if txn.waiting_key is None:
+                txn.wait_started = time.monotonic()
+                self.stats.count('lock_waits')
+                self.stats.current_waits += 1
+            elif txn.waiting_key != key:
+                self._leave_queue(txn)
+            txn.waiting_key = key
+            txn.waiting_mode = mode
+            txn.waiting_for = blockers
+            # A waiter that asks again keeps its place in the queue
+            self.waiters.setdefault(key, {})[txn] = mode
+
+            cycle = self._find_cycle(txn)
+            if cycle is None:
+                return False
+            self.stats.count('deadlocks')
+            victim = min(cycle, key=lambda member: (member.weight, member is not txn))
+            if victim is txn:
+                self._stop_waiting(txn)
+                raise DeadlockDetected()
+            victim.victim = True
+            victim.waker.set()
+            return False
+
+    def cancel(self, txn: LockTransaction):
+        """Abandon the current wait after a lock wait timeout"""
+        with self.mutex:
+            if txn.waiting_key is not None:
+                self.stats.count('lock_wait_timeouts')
+            self._stop_waiting(txn)
+
+    def release_all(self, txn: LockTransaction):
+        """Release every lock at commit or rollback and wake the transactions waiting on them"""
+        with self.mutex:
+            self._stop_waiting(txn)
+            for key in txn.held:
+                holders = self.locks.get(key)
+                if holders is not None:
+                    holders.pop(txn, None)
+                    if not holders:
+                        del self.locks[key]
+                for waiter in self.waiters.get(key, ()):
+                    waiter.waiting_for.discard(txn)
+                    waiter.waker.set()
+            txn.held = {}
+            txn.victim = False
+            txn.rows_modified = 0
+
+    def _blockers(self, txn: LockTransaction, key: LockKey, mode: str) -> Set[LockTransaction]:
+        """Other holders of a conflicting lock on `key`, plus conflicting requests queued ahead of `txn`"""
+        blockers = {other for other, modes in self.locks.get(key, {}).items()
+                    if other is not txn and any(not compatible(held, mode) for held in modes)}
+        for other, wanted in self.waiters.get(key, {}).items():
+            if other is txn:
+                break
+            if not other.victim and not compatible(wanted, mode):
+                blockers.add(other)
+        return blockers
+
+    def _leave_queue(self, txn: LockTransaction, wake_queue: bool = True):
+        waiters = self.waiters.get(txn.waiting_key)
+        if waiters is None:
+            return
+        waiters.pop(txn, None)
+        if not waiters:
+            del self.waiters[txn.waiting_key]
+        elif wake_queue:
+            # Requests queued behind this one may have been waiting only for it
+            for waiter in waiters:
+                waiter.waker.set()
+
+    def _stop_waiting(self, txn: LockTransaction, wake_queue: bool = True):
+        if txn.waiting_key is None:
+            return
+        self._leave_queue(txn, wake_queue)
+        self.stats.waited(time.monotonic() - txn.wait_started)
+        self.stats.current_waits -= 1
+        txn.waiting_key = None
+        txn.waiting_mode = None
+        txn.waiting_for = set()
+
+    def _find_cycle(self, txn: LockTransaction) -> Optional[List[LockTransaction]]:
+        """Depth-first search from the requester's new edges back to the requester"""
+        path = [txn]
+        edges = [iter(txn.waiting_for)]
+        visited = {txn}
+        steps = 0
+        while edges:
+            holder = next(edges[-1], None)
+            if holder is None:
+                edges.pop()
+                path.pop()
+                continue
+            if holder is txn:
+                return path
+            steps += 1
+            if steps > MAX_STEPS or len(path) > MAX_DEPTH:
+                return [txn]
+            if holder in visited or holder.victim or holder.waiting_key is None:
+                continue
+            visited.add(holder)
+            holder.waiting_for = self._blockers(holder, holder.waiting_key, holder.waiting_mode)
+            path.append(holder)
+            edges.append(iter(holder.waiting_for))
+        return None
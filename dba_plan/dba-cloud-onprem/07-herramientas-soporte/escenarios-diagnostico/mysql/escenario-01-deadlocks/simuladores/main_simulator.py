@@ -9,13 +9,34 @@ import sys
 import time
 import logging
 import threading
-import random
+import asyncio
 from datetime import datetime
-from typing import List, Dict, Any
-import mysql.connector
-from mysql.connector import Error
+from typing import List, Dict, Any, Tuple
+try:
+    import mysql.connector
+except ImportError:  # Only needed for DB_DRIVER=mysql
+    mysql = None
 import yaml
-from prometheus_client import Counter, Histogram, Gauge, start_http_server
+from prometheus_client import start_http_server
+from connection_pool import ConnectionPool
+from fake_mysql import DatabaseError, FakeMySQLServer
+from latency_recorder import LatencyRecorder
+from load_generator import OpenLoopScheduler, owned_workers, target_rates
+from process_launcher import ProcessLauncher, per_process_path, process_count, process_index
+from retry_policy import RetryPolicy
+from workloads import WorkerStream, WorkloadStreams
+from trace_replay import ReplayStream, TraceReplayer, load_transactions
+from write_batch import WriteBatch, RoundTripCounter
+from metrics import (
+    deadlock_counter, transaction_counter, connection_gauge, response_time,
+    pool_wait_time, pool_connections, round_trips, lock_hold_time,
+    fake_global_status, fake_lock_events_per_second
+)
+from queries import (
+    BUYER_LOCK_SQL, DECREMENT_STOCK_SQL, INSERT_ORDER_SQL, INSERT_ORDER_ITEM_SQL,
+    INSERT_MOVEMENT_OUT_SQL, RESTOCK_LOCK_SQL, INCREMENT_STOCK_SQL,
+    INSERT_MOVEMENT_IN_SQL, REPORT_SQL
+)
 
 # Configure logging
 logging.basicConfig(
@@ -28,12 +49,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Prometheus metrics
-deadlock_counter = Counter('mysql_deadlocks_total', 'Total number of deadlocks detected')
-transaction_counter = Counter('mysql_transactions_total', 'Total number of transactions', ['status'])
-connection_gauge = Gauge('mysql_active_connections', 'Number of active connections')
-response_time = Histogram('mysql_transaction_duration_seconds', 'Transaction duration')
-
 class DeadlockSimulator:
     def __init__(self):
         self.config = self.load_config()
@@ -47,10 +62,23 @@ class DeadlockSimulator:
             'charset': 'utf8mb4'
         }
         self.running = True
+        # A multiprocessing.Event when started by the process launcher
+        self.stop_event = threading.Event()
         self.connections = []
+        self.lock_stats_server = None
+        self.lock_stats_stop = threading.Event()
+        self.fake_server = None
+        if self.config['db_driver'] == 'fake':
+            self.fake_server = FakeMySQLServer(self.config['fake_latency'], self.config['fake_lock_wait_timeout'])
+        self.pool = self.create_pool() if self.config['connection_mode'] == 'pool' else None
+        self.latency = LatencyRecorder(self.expected_intervals())
+        self.streams = WorkloadStreams.from_config(self.config)
+        self.retry_policy = RetryPolicy.from_config(self.config, self.streams.rng('retry'))
         
-    def load_config(self) -> Dict[str, Any]:
+    @staticmethod
+    def load_config() -> Dict[str, Any]:
         """Load configuration from environment or defaults"""
+        db_driver = os.getenv('DB_DRIVER', 'mysql')
         return {
             'concurrent_buyers': int(os.getenv('CONCURRENT_BUYERS', '10')),
             'concurrent_restockers': int(os.getenv('CONCURRENT_RESTOCKERS', '3')),
@@ -58,103 +86,182 @@ class DeadlockSimulator:
             'deadlock_probability': float(os.getenv('DEADLOCK_PROBABILITY', '0.2')),
             'transaction_delay': float(os.getenv('TRANSACTION_DELAY', '0.1')),
             'simulation_duration': int(os.getenv('SIMULATION_DURATION', '3600')),  # 1 hour
-            'metrics_port': int(os.getenv('METRICS_PORT', '8080'))
+            'metrics_port': int(os.getenv('METRICS_PORT', '8080')),
+            # 'per_transaction' opens a new connection for every transaction, 'pool' reuses them
+            'connection_mode': os.getenv('CONNECTION_MODE', 'per_transaction'),
+            'pool_size': int(os.getenv('POOL_SIZE', '10')),
+            'pool_timeout': float(os.getenv('POOL_TIMEOUT', '30')),
+            'pool_health_check_interval': float(os.getenv('POOL_HEALTH_CHECK_INTERVAL', '0.5')),
+            # 'threads' runs one OS thread per worker, 'asyncio' runs workers as coroutines
+            'execution_mode': os.getenv('EXECUTION_MODE', 'threads'),
+            'async_driver': os.getenv('ASYNC_DRIVER', 'fake' if db_driver == 'fake' else 'aiomysql'),
+            # 'mysql' talks to the server, 'fake' to an in-process backend with row locks and deadlock detection
+            'db_driver': db_driver,
+            'fake_latency': float(os.getenv('FAKE_LATENCY', '0.001')),
+            'fake_lock_wait_timeout': float(os.getenv('FAKE_LOCK_WAIT_TIMEOUT', '50')),
+            # 'closed' sleeps between transactions, 'open' issues them at a target rate
+            'load_mode': os.getenv('LOAD_MODE', 'closed'),
+            'target_tps_buyer': float(os.getenv('TARGET_TPS_BUYER', '10')),
+            'target_tps_restocker': float(os.getenv('TARGET_TPS_RESTOCKER', '2')),
+            'target_tps_reporter': float(os.getenv('TARGET_TPS_REPORTER', '1')),
+            'arrival_process': os.getenv('ARRIVAL_PROCESS', 'poisson'),
+            'max_backlog': int(os.getenv('MAX_BACKLOG', '1000')),
+            'latency_report_interval': float(os.getenv('LATENCY_REPORT_INTERVAL', '30')),
+            # Deadlock retries; the defaults keep the original give-up-on-first-deadlock behaviour
+            'retry_max_attempts': int(os.getenv('RETRY_MAX_ATTEMPTS', '1')),
+            'retry_backoff': os.getenv('RETRY_BACKOFF', 'exponential'),
+            'retry_base_delay': float(os.getenv('RETRY_BASE_DELAY', '0.05')),
+            'retry_max_delay': float(os.getenv('RETRY_MAX_DELAY', '2.0')),
+            'retry_jitter': os.getenv('RETRY_JITTER', 'full'),
+            'retry_budget_ratio': float(os.getenv('RETRY_BUDGET_RATIO', '0')),  # 0 disables the budget
+            'retry_budget_min_per_second': float(os.getenv('RETRY_BUDGET_MIN_PER_SECOND', '1')),
+            # Buffer a buyer's order items and movements and send them as multi-row inserts at commit
+            'batched_writes': os.getenv('BATCHED_WRITES', 'false').lower() == 'true',
+            # Per-worker seeded random streams and an optional binary trace of every draw
+            'simulation_seed': int(os.environ['SIMULATION_SEED']) if os.getenv('SIMULATION_SEED') else None,
+            'trace_file': per_process_path(os.getenv('TRACE_FILE', '')),
+            # Replay a recorded trace instead of generating load; speed 0 replays as fast as possible
+            'replay_file': os.getenv('REPLAY_FILE', ''),
+            'replay_speed': float(os.getenv('REPLAY_SPEED', '1')),
+            'replay_parallelism': int(os.getenv('REPLAY_PARALLELISM', '0')),
+            # Workers are spread over SIMULATOR_PROCESSES processes to use more than one core
+            'simulator_processes': process_count(),
+            'process_index': process_index()
         }
     
-    def get_connection(self):
-        """Get database connection with retry logic"""
+    def expected_intervals(self) -> Dict[str, float]:
+        """Interval at which each worker is meant to start a transaction, for coordinated-omission correction"""
+        if self.config['load_mode'] == 'open':
+            return {worker_type: len(owned_workers(self.config, worker_type)) / tps
+                    for worker_type, tps in target_rates(self.config).items()
+                    if owned_workers(self.config, worker_type)}
+        # Closed loop: mean of the random.uniform(0.5, 2.0) think time between transactions
+        return {'buyer': 1.25, 'restocker': 1.25, 'reporter': 1.25}
+    
+    def create_pool(self) -> ConnectionPool:
+        """Create the shared connection pool and expose its occupancy as metrics"""
+        pool = ConnectionPool(
+            self.open_connection,
+            max_size=self.config['pool_size'],
+            checkout_timeout=self.config['pool_timeout'],
+            health_check_interval=self.config['pool_health_check_interval'],
+            on_open=connection_gauge.inc,
+            on_close=connection_gauge.dec,
+            on_wait=pool_wait_time.observe
+        )
+        for state in ('idle', 'in_use', 'waiting'):
+            pool_connections.labels(state=state).set_function(lambda state=state: pool.stats()[state])
+        return pool
+    
+    def open_connection(self):
+        """Open a raw database connection with retry logic"""
         max_retries = 5
         for attempt in range(max_retries):
             try:
-                conn = mysql.connector.connect(**self.db_config)
-                connection_gauge.inc()
-                return conn
-            except Error as e:
+                if self.fake_server:
+                    return self.fake_server.connect()
+                return mysql.connector.connect(**self.db_config)
+            except DatabaseError as e:
                 logger.error(f"Connection attempt {attempt + 1} failed: {e}")
                 if attempt < max_retries - 1:
                     time.sleep(2 ** attempt)  # Exponential backoff
                 else:
                     raise
     
+    def get_connection(self):
+        """Get database connection with retry logic"""
+        conn = self.open_connection()
+        connection_gauge.inc()
+        return conn
+    
     def close_connection(self, conn):
         """Close database connection"""
         if conn and conn.is_connected():
             conn.close()
             connection_gauge.dec()
     
-    def buyer_transaction(self, buyer_id: int):
+    def acquire_connection(self, worker_key):
+        """Get a connection for one transaction according to the connection mode"""
+        if self.pool:
+            return self.pool.acquire(worker_key)
+        return self.get_connection()
+    
+    def release_connection(self, conn, worker_key):
+        """Hand a transaction's connection back to the pool or close it"""
+        if self.pool:
+            self.pool.release(conn, worker_key)
+        else:
+            self.close_connection(conn)
+    
+    def buyer_transaction(self, buyer_id: int, stream: WorkerStream, product_ids: List[int]) -> str:
         """Simulate a buyer purchasing products (prone to deadlocks)"""
         conn = None
+        cursor = None
+        outcome = 'error'
+        write_mode = 'batched' if self.config['batched_writes'] else 'per_row'
+        started = time.perf_counter()
+        lock_started = None
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            conn = self.acquire_connection(('buyer', buyer_id))
+            cursor = RoundTripCounter(conn.cursor())
+            batch = WriteBatch()
             
             with response_time.time():
                 # Start transaction
                 conn.start_transaction()
-                
-                # Select random products to buy
-                product_ids = random.sample(range(1, 11), random.randint(1, 3))
+                lock_started = time.perf_counter()
                 
                 for product_id in product_ids:
                     # Check stock (SELECT FOR UPDATE - acquires lock)
-                    cursor.execute("""
-                        SELECT stock_quantity, price 
-                        FROM products 
-                        WHERE id = %s 
-                        FOR UPDATE
-                    """, (product_id,))
+                    cursor.execute(BUYER_LOCK_SQL, (product_id,))
                     
                     result = cursor.fetchone()
                     if not result:
                         continue
                         
                     stock, price = result
-                    quantity_to_buy = random.randint(1, min(3, stock))
+                    quantity_to_buy = stream.quantity(1, min(3, stock))
                     
                     if stock >= quantity_to_buy:
                         # Add artificial delay to increase deadlock probability
-                        time.sleep(random.uniform(0.01, self.config['transaction_delay']))
+                        time.sleep(stream.delay(0.01, self.config['transaction_delay']))
                         
                         # Update stock
-                        cursor.execute("""
-                            UPDATE products 
-                            SET stock_quantity = stock_quantity - %s 
-                            WHERE id = %s
-                        """, (quantity_to_buy, product_id))
+                        cursor.execute(DECREMENT_STOCK_SQL, (quantity_to_buy, product_id))
                         
                         # Create order
-                        cursor.execute("""
-                            INSERT INTO orders (user_id, total_amount, status) 
-                            VALUES (%s, %s, 'pending')
-                        """, (buyer_id, price * quantity_to_buy))
+                        cursor.execute(INSERT_ORDER_SQL, (buyer_id, price * quantity_to_buy))
                         
                         order_id = cursor.lastrowid
                         
+                        if self.config['batched_writes']:
+                            # Order item and movement are flushed as multi-row inserts before commit
+                            batch.add(order_id, product_id, quantity_to_buy, price)
+                            continue
+                        
                         # Add order item
-                        cursor.execute("""
-                            INSERT INTO order_items (order_id, product_id, quantity, price) 
-                            VALUES (%s, %s, %s, %s)
-                        """, (order_id, product_id, quantity_to_buy, price))
+                        cursor.execute(INSERT_ORDER_ITEM_SQL, (order_id, product_id, quantity_to_buy, price))
                         
                         # Record inventory movement
-                        cursor.execute("""
-                            INSERT INTO inventory_movements (product_id, movement_type, quantity, reference_id) 
-                            VALUES (%s, 'out', %s, %s)
-                        """, (product_id, quantity_to_buy, order_id))
+                        cursor.execute(INSERT_MOVEMENT_OUT_SQL, (product_id, quantity_to_buy, order_id))
+                
+                for sql, params in batch.statements():
+                    cursor.execute(sql, params)
                 
                 # Commit transaction
                 conn.commit()
                 transaction_counter.labels(status='success').inc()
+                outcome = 'success'
                 logger.info(f"Buyer {buyer_id} completed purchase successfully")
                 
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             if conn:
                 conn.rollback()
             
             if e.errno == 1213:  # Deadlock error
                 deadlock_counter.inc()
                 transaction_counter.labels(status='deadlock').inc()
+                outcome = 'deadlock'
                 logger.warning(f"Buyer {buyer_id} encountered deadlock: {e}")
             else:
                 transaction_counter.labels(status='error').inc()
@@ -167,65 +274,62 @@ class DeadlockSimulator:
             logger.error(f"Buyer {buyer_id} unexpected error: {e}")
             
         finally:
+            self.latency.record('buyer', outcome, time.perf_counter() - started)
+            if lock_started is not None:
+                lock_hold_time.labels(worker_type='buyer', write_mode=write_mode).observe(
+                    time.perf_counter() - lock_started)
+                # START TRANSACTION and COMMIT/ROLLBACK are round trips too
+                round_trips.labels(worker_type='buyer', write_mode=write_mode).observe(cursor.count + 2)
             if conn:
-                self.close_connection(conn)
+                self.release_connection(conn, ('buyer', buyer_id))
+        
+        return outcome
     
-    def restocking_transaction(self, restocker_id: int):
+    def restocking_transaction(self, restocker_id: int, stream: WorkerStream, product_ids: List[int]) -> str:
         """Simulate restocking products (prone to deadlocks with buyers)"""
         conn = None
+        outcome = 'error'
+        started = time.perf_counter()
         try:
-            conn = self.get_connection()
+            conn = self.acquire_connection(('restocker', restocker_id))
             cursor = conn.cursor()
             
             with response_time.time():
                 conn.start_transaction()
                 
-                # Select random products to restock
-                product_ids = random.sample(range(1, 11), random.randint(1, 2))
-                
                 for product_id in product_ids:
                     # Lock product for update
-                    cursor.execute("""
-                        SELECT stock_quantity 
-                        FROM products 
-                        WHERE id = %s 
-                        FOR UPDATE
-                    """, (product_id,))
+                    cursor.execute(RESTOCK_LOCK_SQL, (product_id,))
                     
                     result = cursor.fetchone()
                     if not result:
                         continue
                     
                     current_stock = result[0]
-                    restock_quantity = random.randint(10, 50)
+                    restock_quantity = stream.quantity(10, 50)
                     
                     # Add delay to increase deadlock probability
-                    time.sleep(random.uniform(0.02, self.config['transaction_delay'] * 2))
+                    time.sleep(stream.delay(0.02, self.config['transaction_delay'] * 2))
                     
                     # Update stock
-                    cursor.execute("""
-                        UPDATE products 
-                        SET stock_quantity = stock_quantity + %s 
-                        WHERE id = %s
-                    """, (restock_quantity, product_id))
+                    cursor.execute(INCREMENT_STOCK_SQL, (restock_quantity, product_id))
                     
                     # Record inventory movement
-                    cursor.execute("""
-                        INSERT INTO inventory_movements (product_id, movement_type, quantity) 
-                        VALUES (%s, 'in', %s)
-                    """, (product_id, restock_quantity))
+                    cursor.execute(INSERT_MOVEMENT_IN_SQL, (product_id, restock_quantity))
                 
                 conn.commit()
                 transaction_counter.labels(status='success').inc()
+                outcome = 'success'
                 logger.info(f"Restocker {restocker_id} completed restocking successfully")
                 
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             if conn:
                 conn.rollback()
                 
             if e.errno == 1213:  # Deadlock error
                 deadlock_counter.inc()
                 transaction_counter.labels(status='deadlock').inc()
+                outcome = 'deadlock'
                 logger.warning(f"Restocker {restocker_id} encountered deadlock: {e}")
             else:
                 transaction_counter.labels(status='error').inc()
@@ -238,51 +342,45 @@ class DeadlockSimulator:
             logger.error(f"Restocker {restocker_id} unexpected error: {e}")
             
         finally:
+            self.latency.record('restocker', outcome, time.perf_counter() - started)
             if conn:
-                self.close_connection(conn)
+                self.release_connection(conn, ('restocker', restocker_id))
+        
+        return outcome
     
-    def reporting_transaction(self, reporter_id: int):
+    def reporting_transaction(self, reporter_id: int, stream: WorkerStream, id_range: Tuple[int, int]) -> str:
         """Simulate reporting queries (can cause deadlocks with long-running reads)"""
         conn = None
+        outcome = 'error'
+        started = time.perf_counter()
         try:
-            conn = self.get_connection()
+            conn = self.acquire_connection(('reporter', reporter_id))
             cursor = conn.cursor()
             
             with response_time.time():
                 conn.start_transaction()
                 
                 # Long-running report query that locks multiple tables
-                cursor.execute("""
-                    SELECT 
-                        p.id,
-                        p.name,
-                        p.stock_quantity,
-                        COALESCE(SUM(oi.quantity), 0) as total_sold,
-                        COALESCE(SUM(im.quantity), 0) as total_restocked
-                    FROM products p
-                    LEFT JOIN order_items oi ON p.id = oi.product_id
-                    LEFT JOIN inventory_movements im ON p.id = im.product_id AND im.movement_type = 'in'
-                    WHERE p.id BETWEEN %s AND %s
-                    GROUP BY p.id, p.name, p.stock_quantity
-                    FOR UPDATE
-                """, (random.randint(1, 5), random.randint(6, 10)))
+                cursor.execute(REPORT_SQL, id_range)
                 
                 results = cursor.fetchall()
                 
                 # Simulate processing time
-                time.sleep(random.uniform(0.1, 0.5))
+                time.sleep(stream.delay(0.1, 0.5))
                 
                 conn.commit()
                 transaction_counter.labels(status='success').inc()
+                outcome = 'success'
                 logger.info(f"Reporter {reporter_id} completed report successfully")
                 
-        except mysql.connector.Error as e:
+        except DatabaseError as e:
             if conn:
                 conn.rollback()
                 
             if e.errno == 1213:  # Deadlock error
                 deadlock_counter.inc()
                 transaction_counter.labels(status='deadlock').inc()
+                outcome = 'deadlock'
                 logger.warning(f"Reporter {reporter_id} encountered deadlock: {e}")
             else:
                 transaction_counter.labels(status='error').inc()
@@ -295,8 +393,32 @@ class DeadlockSimulator:
             logger.error(f"Reporter {reporter_id} unexpected error: {e}")
             
         finally:
+            self.latency.record('reporter', outcome, time.perf_counter() - started)
             if conn:
-                self.close_connection(conn)
+                self.release_connection(conn, ('reporter', reporter_id))
+        
+        return outcome
+    
+    def run_transaction(self, worker_type: str, worker_id: int, stream=None) -> str:
+        """Run one logical transaction, retrying it with the same inputs per the retry policy"""
+        transaction = {
+            'buyer': self.buyer_transaction,
+            'restocker': self.restocking_transaction,
+            'reporter': self.reporting_transaction
+        }[worker_type]
+        stream = stream or self.streams.for_worker(worker_type, worker_id)
+        plan = stream.plan()
+        attempt = 1
+        
+        while True:
+            stream.attempt(attempt)
+            outcome = transaction(worker_id, stream, **plan)
+            stream.end(outcome)
+            delay = self.retry_policy.next_delay(worker_type, attempt, outcome)
+            if delay is None:
+                return outcome
+            time.sleep(delay)
+            attempt += 1
     
     def worker_thread(self, worker_type: str, worker_id: int):
         """Worker thread that continuously executes transactions"""
@@ -304,15 +426,10 @@ class DeadlockSimulator:
         
         while self.running:
             try:
-                if worker_type == 'buyer':
-                    self.buyer_transaction(worker_id)
-                elif worker_type == 'restocker':
-                    self.restocking_transaction(worker_id)
-                elif worker_type == 'reporter':
-                    self.reporting_transaction(worker_id)
+                self.run_transaction(worker_type, worker_id)
                 
                 # Random delay between transactions
-                time.sleep(random.uniform(0.5, 2.0))
+                time.sleep(self.streams.for_worker(worker_type, worker_id).think(0.5, 2.0))
                 
             except Exception as e:
                 logger.error(f"{worker_type} {worker_id} thread error: {e}")
@@ -342,9 +459,25 @@ class DeadlockSimulator:
         logger.info("Starting MySQL Deadlock Simulator")
         logger.info(f"Configuration: {self.config}")
         
-        # Start Prometheus metrics server
-        start_http_server(self.config['metrics_port'])
-        logger.info(f"Metrics server started on port {self.config['metrics_port']}")
+        # Start Prometheus metrics server; with several processes the launcher serves them merged
+        if self.config['simulator_processes'] == 1:
+            start_http_server(self.config['metrics_port'])
+            logger.info(f"Metrics server started on port {self.config['metrics_port']}")
+        else:
+            logger.info(f"Process {self.config['process_index'] + 1}/{self.config['simulator_processes']}")
+        
+        self.latency.start_reporter(self.config['latency_report_interval'])
+        
+        if self.config['replay_file']:
+            self.run_replay()
+            return
+        
+        if self.config['execution_mode'] == 'asyncio':
+            self.run_async()
+            self.report_latency()
+            self.report_lock_stats()
+            self.close_trace()
+            return
         
         # Wait for database
         if not self.wait_for_database():
@@ -353,54 +486,188 @@ class DeadlockSimulator:
         
         # Start worker threads
         threads = []
+        schedulers = []
         
-        # Buyer threads
-        for i in range(self.config['concurrent_buyers']):
-            thread = threading.Thread(target=self.worker_thread, args=('buyer', i + 1))
-            thread.daemon = True
-            thread.start()
-            threads.append(thread)
-        
-        # Restocker threads
-        for i in range(self.config['concurrent_restockers']):
-            thread = threading.Thread(target=self.worker_thread, args=('restocker', i + 1))
-            thread.daemon = True
-            thread.start()
-            threads.append(thread)
-        
-        # Reporter threads
-        for i in range(self.config['concurrent_reporters']):
-            thread = threading.Thread(target=self.worker_thread, args=('reporter', i + 1))
-            thread.daemon = True
-            thread.start()
-            threads.append(thread)
+        if self.config['load_mode'] == 'open':
+            schedulers = self.start_open_loop()
+            for scheduler in schedulers:
+                threads.extend(scheduler.threads)
+        else:
+            self.start_closed_loop(threads)
         
         logger.info(f"Started {len(threads)} worker threads")
+        if self.fake_server:
+            self.start_lock_stats(self.fake_server)
         
         # Run simulation
         try:
             if self.config['simulation_duration'] > 0:
                 logger.info(f"Running simulation for {self.config['simulation_duration']} seconds")
-                time.sleep(self.config['simulation_duration'])
+                self.stop_event.wait(self.config['simulation_duration'])
             else:
                 logger.info("Running simulation indefinitely (Ctrl+C to stop)")
-                while True:
-                    time.sleep(60)
+                while not self.stop_event.wait(60):
                     logger.info("Simulation still running...")
         except KeyboardInterrupt:
             logger.info("Received interrupt signal")
         finally:
             logger.info("Stopping simulation...")
             self.running = False
+            for scheduler in schedulers:
+                scheduler.stop()
             
             # Wait for threads to finish
             for thread in threads:
                 thread.join(timeout=5)
             
+            for scheduler in schedulers:
+                logger.info(f"Open-loop summary - {scheduler.summary()}")
+            self.report_latency()
+            self.report_lock_stats()
+            self.close_trace()
+            
+            if self.pool:
+                logger.info(f"Connection pool at shutdown: {self.pool.stats()}")
+                self.pool.close_all()
+            
             logger.info("Simulation stopped")
+    
+    def start_closed_loop(self, threads: List[threading.Thread]):
+        """Start one thread per worker, each sleeping between its transactions"""
+        # Buyer, restocker and reporter threads owned by this process
+        for worker_type in ('buyer', 'restocker', 'reporter'):
+            for worker_id in owned_workers(self.config, worker_type):
+                thread = threading.Thread(target=self.worker_thread, args=(worker_type, worker_id))
+                thread.daemon = True
+                thread.start()
+                threads.append(thread)
+    
+    def start_open_loop(self) -> List[OpenLoopScheduler]:
+        """Start one open-loop scheduler per worker type with a target rate"""
+        schedulers = []
+        for worker_type, tps in target_rates(self.config).items():
+            worker_ids = owned_workers(self.config, worker_type)
+            workers = len(worker_ids)
+            scheduler = OpenLoopScheduler(
+                worker_type,
+                lambda executor, worker_type=worker_type, worker_ids=worker_ids:
+                    self.run_transaction(worker_type, worker_ids[executor - 1]),
+                workers, tps,
+                arrival_process=self.config['arrival_process'],
+                max_backlog=self.config['max_backlog'],
+                rng=self.streams.rng(self.arrivals_stream(worker_type))
+            )
+            scheduler.start()
+            schedulers.append(scheduler)
+            logger.info(f"Open-loop {worker_type}: {tps} tps ({self.config['arrival_process']}) "
+                        f"over {workers} executors")
+        return schedulers
+    
+    def arrivals_stream(self, worker_type: str) -> str:
+        """Name of the arrival RNG stream; each process gets its own so their arrivals are independent"""
+        if self.config['simulator_processes'] == 1:
+            return f"arrivals:{worker_type}"
+        return f"arrivals:{worker_type}:{self.config['process_index']}"
+    
+    def report_latency(self):
+        """Log the end-of-run latency report"""
+        self.latency.stop()
+        logger.info("Latency report (raw and corrected for coordinated omission):")
+        for line in self.latency.final_report():
+            logger.info(f"  {line}")
+    
+    def start_lock_stats(self, server: FakeMySQLServer):
+        """Publish the fake backend's lock counters and per-second rates every second"""
+        self.lock_stats_server = server
+        
+        def loop():
+            while not self.lock_stats_stop.wait(1):
+                for variable, value in server.locks.stats.status().items():
+                    fake_global_status.labels(variable=variable).set(value)
+                last_second = server.locks.stats.per_second(1)
+                bucket = last_second[-1] if last_second else {}
+                for event in ('deadlocks', 'lock_waits', 'lock_wait_timeouts', 'lock_time'):
+                    fake_lock_events_per_second.labels(event=event).set(bucket.get(event, 0))
+        
+        thread = threading.Thread(target=loop, name="lock-stats", daemon=True)
+        thread.start()
+    
+    def report_lock_stats(self):
+        """Log the fake backend's Innodb_* counters and its busiest second"""
+        server = self.lock_stats_server
+        if not server:
+            return
+        self.lock_stats_stop.set()
+        status = server.locks.stats.status()
+        logger.info("Fake backend lock status: " + ", ".join(f"{name}={value}" for name, value in status.items()))
+        seconds = server.locks.stats.per_second(len(server.locks.stats.buckets) + 1)
+        if seconds:
+            busiest = max(seconds, key=lambda bucket: (bucket['deadlocks'], bucket['lock_waits']))
+            logger.info(f"Fake backend peak second: {busiest['deadlocks']} deadlocks, "
+                        f"{busiest['lock_waits']} lock waits, {busiest['lock_wait_timeouts']} timeouts")
+    
+    def run_replay(self):
+        """Re-issue a recorded trace through the threaded transactions"""
+        if not self.wait_for_database():
+            logger.error("Cannot connect to database. Exiting.")
+            return
+        
+        if self.fake_server:
+            self.start_lock_stats(self.fake_server)
+        transactions = load_transactions(self.config['replay_file'], ['buyer', 'restocker', 'reporter'])
+        replayer = TraceReplayer(
+            transactions,
+            lambda tx: self.run_transaction(tx.worker_type, tx.worker_id, ReplayStream(tx)),
+            speed=self.config['replay_speed'],
+            parallelism=self.config['replay_parallelism']
+        )
+        logger.info(f"Replaying {len(transactions)} transactions from {self.config['replay_file']}")
+        try:
+            logger.info(f"Replay summary - {replayer.run()}")
+        finally:
+            self.running = False
+            self.report_latency()
+            self.report_lock_stats()
+            self.close_trace()
+            if self.pool:
+                self.pool.close_all()
+    
+    def close_trace(self):
+        """Flush the workload trace, if one is being recorded"""
+        self.streams.close()
+        if self.streams.trace:
+            logger.info(f"Workload trace: {self.streams.trace.records} operations in {self.streams.trace.path}")
+    
+    def run_async(self):
+        """Run the same workloads as coroutines on a single event loop"""
+        from async_engine import AsyncDeadlockEngine, create_driver
+        
+        driver = create_driver(self.config, self.db_config, self.fake_server)
+        if getattr(driver, 'server', None):
+            self.start_lock_stats(driver.server)
+        engine = AsyncDeadlockEngine(self.config, driver, self.latency, self.retry_policy, self.streams,
+                                     self.stop_event)
+        try:
+            asyncio.run(engine.run())
+        except KeyboardInterrupt:
+            logger.info("Received interrupt signal")
+        logger.info("Simulation stopped")
+
+def run_worker_process(stop_event):
+    """Entry point of each process started by the process launcher"""
+    simulator = DeadlockSimulator()
+    simulator.stop_event = stop_event
+    simulator.run()
 
 def main():
     """Main entry point"""
+    config = DeadlockSimulator.load_config()
+    if config['simulator_processes'] > 1 and not config['replay_file']:
+        ProcessLauncher(run_worker_process, config['simulator_processes'],
+                        metrics_port=config['metrics_port'],
+                        duration=config['simulation_duration'],
+                        name='deadlock-simulator').run()
+        return
     simulator = DeadlockSimulator()
     simulator.run()
 
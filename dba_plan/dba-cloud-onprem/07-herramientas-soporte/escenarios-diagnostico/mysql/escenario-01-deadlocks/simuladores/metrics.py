@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics for the MySQL Deadlock Simulator
+Shared by the threaded and asyncio execution modes
+"""
+
+from prometheus_client import Counter, Histogram, Gauge
+
+deadlock_counter = Counter('mysql_deadlocks_total', 'Total number of deadlocks detected')
+transaction_counter = Counter('mysql_transactions_total', 'Total number of transactions', ['status'])
+connection_gauge = Gauge('mysql_active_connections', 'Number of active connections', multiprocess_mode='livesum')
+response_time = Histogram('mysql_transaction_duration_seconds', 'Transaction duration')
+pool_wait_time = Histogram('mysql_pool_wait_seconds', 'Time spent waiting for a pooled connection',
+                           buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30))
+pool_connections = Gauge('mysql_pool_connections', 'Pooled connections by state', ['state'],
+                         multiprocess_mode='livesum')
+
+# Open-loop load generation
+latency_buckets = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+arrivals_counter = Counter('mysql_arrivals_total', 'Scheduled open-loop arrivals', ['worker_type'])
+missed_arrivals = Counter('mysql_missed_arrivals_total', 'Arrivals dropped because the backlog was full',
+                          ['worker_type'])
+queue_delay = Histogram('mysql_queue_delay_seconds', 'Time from scheduled arrival to transaction start',
+                        ['worker_type'], buckets=latency_buckets)
+service_time = Histogram('mysql_service_time_seconds', 'Time from transaction start to end',
+                         ['worker_type'], buckets=latency_buckets)
+
+# HDR latency percentiles, refreshed every reporting interval
+latency_percentile = Gauge('mysql_transaction_latency_seconds', 'Transaction latency percentile over the last interval',
+                           ['type', 'outcome', 'quantile'])
+
+# Retry accounting: raw attempts versus goodput
+attempt_counter = Counter('mysql_transaction_attempts_total', 'Transaction attempts by attempt number and outcome',
+                          ['worker_type', 'attempt', 'outcome'])
+goodput_counter = Counter('mysql_goodput_transactions_total', 'Logical transactions that eventually committed',
+                          ['worker_type'])
+abandoned_counter = Counter('mysql_abandoned_transactions_total', 'Logical transactions given up without a commit',
+                            ['worker_type', 'reason'])
+attempts_per_transaction = Histogram('mysql_attempts_per_transaction', 'Attempts used by each logical transaction',
+                                     ['worker_type'], buckets=(1, 2, 3, 4, 5, 7, 10))
+retry_backoff_seconds = Counter('mysql_retry_backoff_seconds_total', 'Time spent backing off before retries',
+                                ['worker_type'])
+
+# Batched writes: statements per transaction and how long row locks are held
+round_trips = Histogram('mysql_transaction_round_trips', 'Statements sent to the server per transaction',
+                        ['worker_type', 'write_mode'], buckets=(2, 4, 6, 8, 10, 12, 15, 20, 30))
+lock_hold_time = Histogram('mysql_lock_hold_seconds', 'Time from the first FOR UPDATE to commit or rollback',
+                           ['worker_type', 'write_mode'], buckets=latency_buckets)
+
+# Lock statistics of the in-process fake backend (DB_DRIVER=fake), named after SHOW GLOBAL STATUS
+fake_global_status = Gauge('mysql_fake_global_status', 'Innodb_* lock counters of the fake backend', ['variable'])
+fake_lock_events_per_second = Gauge('mysql_fake_lock_events_per_second',
+                                    'Lock events in the last complete second of the fake backend', ['event'])
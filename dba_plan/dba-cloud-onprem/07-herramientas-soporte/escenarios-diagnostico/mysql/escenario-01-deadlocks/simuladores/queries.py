@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+SQL statements issued by the MySQL Deadlock Simulator workloads
+Shared by the threaded and asyncio execution modes
+"""
+
+BUYER_LOCK_SQL = """
+    SELECT stock_quantity, price
+    FROM products
+    WHERE id = %s
+    FOR UPDATE
+"""
+
+DECREMENT_STOCK_SQL = """
+    UPDATE products
+    SET stock_quantity = stock_quantity - %s
+    WHERE id = %s
+"""
+
+INSERT_ORDER_SQL = """
+    INSERT INTO orders (user_id, total_amount, status)
+    VALUES (%s, %s, 'pending')
+"""
+
+INSERT_ORDER_ITEM_SQL = """
+    INSERT INTO order_items (order_id, product_id, quantity, price)
+    VALUES (%s, %s, %s, %s)
+"""
+
+INSERT_MOVEMENT_OUT_SQL = """
+    INSERT INTO inventory_movements (product_id, movement_type, quantity, reference_id)
+    VALUES (%s, 'out', %s, %s)
+"""
+
+RESTOCK_LOCK_SQL = """
+    SELECT stock_quantity
+    FROM products
+    WHERE id = %s
+    FOR UPDATE
+"""
+
+INCREMENT_STOCK_SQL = """
+    UPDATE products
+    SET stock_quantity = stock_quantity + %s
+    WHERE id = %s
+"""
+
+INSERT_MOVEMENT_IN_SQL = """
+    INSERT INTO inventory_movements (product_id, movement_type, quantity)
+    VALUES (%s, 'in', %s)
+"""
+
+REPORT_SQL = """
+    SELECT
+        p.id,
+        p.name,
+        p.stock_quantity,
+        COALESCE(SUM(oi.quantity), 0) as total_sold,
+        COALESCE(SUM(im.quantity), 0) as total_restocked
+    FROM products p
+    LEFT JOIN order_items oi ON p.id = oi.product_id
+    LEFT JOIN inventory_movements im ON p.id = im.product_id AND im.movement_type = 'in'
+    WHERE p.id BETWEEN %s AND %s
+    GROUP BY p.id, p.name, p.stock_quantity
+    FOR UPDATE
+"""
+
+# Multi-row forms used by the batched writes mode; rows are appended by write_batch.WriteBatch
+INSERT_ORDER_ITEMS_BATCH_SQL = "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES "
+ORDER_ITEM_ROW = "(%s, %s, %s, %s)"
+
+INSERT_MOVEMENTS_OUT_BATCH_SQL = "INSERT INTO inventory_movements (product_id, movement_type, quantity, reference_id) VALUES "
+MOVEMENT_OUT_ROW = "(%s, 'out', %s, %s)"
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Deadlock Retry Policies for the MySQL Deadlock Simulators
+Max attempts, backoff with jitter and retry budgets, with per-attempt metrics
+"""
+
+import time
+import random
+import threading
+from typing import Dict, Optional
+
+from metrics import (
+    attempt_counter, goodput_counter, abandoned_counter, attempts_per_transaction, retry_backoff_seconds
+)
+
+RETRYABLE_OUTCOMES = ('deadlock',)
+
+
+class RetryBudget:
+    """Token bucket that caps retries at a fraction of first attempts.
+
+    Every first attempt deposits `ratio` tokens and every retry withdraws
+    one, so under a deadlock storm retries can add at most `ratio` extra
+    load. `min_per_second` tokens are also granted per second so a quiet
+    system can still retry the occasional deadlock.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float = 1.0, max_tokens: float = 100.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def deposit(self):
+        with self.lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.max_tokens, self.tokens + (now - self.updated_at) * self.min_per_second)
+            self.updated_at = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+
+class RetryPolicy:
+    """Decides whether a failed attempt is retried and how long to back off.
+
+    backoff: 'none', 'constant' (base_delay) or 'exponential' (base_delay * 2^n, capped at max_delay)
+    jitter:  'none', 'full' (uniform 0..delay) or 'equal' (delay/2 + uniform 0..delay/2)
+    """
+
+    def __init__(self, max_attempts: int = 1, backoff: str = 'exponential', base_delay: float = 0.05,
+                 max_delay: float = 2.0, jitter: str = 'full', budget: Optional[RetryBudget] = None,
+                 rng: Optional[random.Random] = None):
+        if backoff not in ('none', 'constant', 'exponential'):
+            raise ValueError(f"Unknown backoff: {backoff}")
+        if jitter not in ('none', 'full', 'equal'):
+            raise ValueError(f"Unknown jitter: {jitter}")
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.budget = budget
+        self.rng = rng or random.Random()
+
+    @classmethod
+    def from_config(cls, config: Dict, rng: Optional[random.Random] = None) -> 'RetryPolicy':
+        """Build a policy from the retry_* keys of a simulator config"""
+        budget = None
+        if config['retry_budget_ratio'] > 0:
+            budget = RetryBudget(config['retry_budget_ratio'], config['retry_budget_min_per_second'])
+        return cls(
+            max_attempts=config['retry_max_attempts'],
+            backoff=config['retry_backoff'],
+            base_delay=config['retry_base_delay'],
+            max_delay=config['retry_max_delay'],
+            jitter=config['retry_jitter'],
+            budget=budget,
+            rng=rng
+        )
+
+    def delay(self, attempt: int) -> float:
+        """Backoff before attempt number `attempt + 1`"""
+        if self.backoff == 'none':
+            return 0.0
+        if self.backoff == 'constant':
+            delay = self.base_delay
+        else:
+            delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+
+        if self.jitter == 'full':
+            return self.rng.uniform(0, delay)
+        if self.jitter == 'equal':
+            return delay / 2 + self.rng.uniform(0, delay / 2)
+        return delay
+
+    def next_delay(self, worker_type: str, attempt: int, outcome: str) -> Optional[float]:
+        """Account for a finished attempt and return the backoff before retrying, or None to stop"""
+        attempt_counter.labels(worker_type=worker_type, attempt=str(attempt), outcome=outcome).inc()
+        if attempt == 1 and self.budget:
+            self.budget.deposit()
+
+        if outcome == 'success':
+            goodput_counter.labels(worker_type=worker_type).inc()
+            attempts_per_transaction.labels(worker_type=worker_type).observe(attempt)
+            return None
+
+        reason = None
+        if outcome not in RETRYABLE_OUTCOMES:
+            reason = 'not_retryable'
+        elif attempt >= self.max_attempts:
+            reason = 'attempts_exhausted'
+        elif self.budget and not self.budget.withdraw():
+            reason = 'budget_exhausted'
+
+        if reason:
+            abandoned_counter.labels(worker_type=worker_type, reason=reason).inc()
+            attempts_per_transaction.labels(worker_type=worker_type).observe(attempt)
+            return None
+
+        delay = self.delay(attempt)
+        retry_backoff_seconds.labels(worker_type=worker_type).inc(delay)
+        return delay
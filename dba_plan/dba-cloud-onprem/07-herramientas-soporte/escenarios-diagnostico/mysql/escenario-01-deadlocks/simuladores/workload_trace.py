@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Binary Workload Trace for the Diagnostic Scenario Simulators
+Records every worker's operations (ids, quantities, delays) for exact reproduction
+"""
+
+import time
+import struct
+import threading
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+MAGIC = b'SIMTRACE'
+VERSION = 1
+
+# File header: magic, version, seed (-1 when unseeded), wall-clock start time
+HEADER = struct.Struct('<8sHqd')
+# Name record: tag, code, length, then the UTF-8 name
+NAME = struct.Struct('<cHB')
+# Operation record: tag, seconds since start, worker type code, worker id, op code, value
+OPERATION = struct.Struct('<cdHIHd')
+
+NAME_TAG = b'N'
+OPERATION_TAG = b'O'
+
+OUTCOME_CODES = {'success': 0, 'deadlock': 1, 'error': 2}
+OUTCOMES = {code: outcome for outcome, code in OUTCOME_CODES.items()}
+
+
+class TraceRecord(NamedTuple):
+    offset: float
+    worker_type: str
+    worker_id: int
+    op: str
+    value: float
+
+
+class TraceWriter:
+    """Appends operation records to a compact binary trace, safe to share between threads.
+
+    Worker types and operation names are interned: the first time a name is
+    used a name record assigns it a 2-byte code, so every operation record
+    has the same fixed size (24 bytes) whatever simulator wrote it.
+    """
+
+    def __init__(self, path: str, seed: Optional[int] = None):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.lock = threading.Lock()
+        self.codes: Dict[str, int] = {}
+        self.started = time.monotonic()
+        self.records = 0
+        self.file.write(HEADER.pack(MAGIC, VERSION, -1 if seed is None else seed, time.time()))
+
+    def _code(self, name: str) -> int:
+        code = self.codes.get(name)
+        if code is None:
+            code = len(self.codes)
+            self.codes[name] = code
+            encoded = name.encode('utf-8')
+            self.file.write(NAME.pack(NAME_TAG, code, len(encoded)) + encoded)
+        return code
+
+    def record(self, worker_type: str, worker_id: int, op: str, value: float = 0.0):
+        offset = time.monotonic() - self.started
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.write(OPERATION.pack(
+                OPERATION_TAG, offset, self._code(worker_type), worker_id, self._code(op), value
+            ))
+            self.records += 1
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+class TraceReader:
+    """Reads a trace written by TraceWriter"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, version, seed, self.started_at = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a workload trace")
+        if version != VERSION:
+            raise ValueError(f"Unsupported trace version {version}")
+        self.seed = None if seed == -1 else seed
+
+    def __iter__(self) -> Iterator[TraceRecord]:
+        names: Dict[int, str] = {}
+        with open(self.path, 'rb') as f:
+            f.seek(HEADER.size)
+            while True:
+                tag = f.read(1)
+                if not tag:
+                    return
+                if tag == NAME_TAG:
+                    _, code, length = NAME.unpack(tag + f.read(NAME.size - 1))
+                    names[code] = f.read(length).decode('utf-8')
+                elif tag == OPERATION_TAG:
+                    chunk = f.read(OPERATION.size - 1)
+                    if len(chunk) < OPERATION.size - 1:
+                        return  # Truncated by a crash mid-write
+                    _, offset, type_code, worker_id, op_code, value = OPERATION.unpack(tag + chunk)
+                    yield TraceRecord(offset, names[type_code], worker_id, names[op_code], value)
+                else:
+                    raise ValueError(f"Corrupt trace record tag {tag!r}")
+
+    def by_worker(self) -> Dict[Tuple[str, int], List[TraceRecord]]:
+        """Each worker's records in the order it issued them"""
+        workers: Dict[Tuple[str, int], List[TraceRecord]] = {}
+        for record in self:
+            workers.setdefault((record.worker_type, record.worker_id), []).append(record)
+        return workers
+
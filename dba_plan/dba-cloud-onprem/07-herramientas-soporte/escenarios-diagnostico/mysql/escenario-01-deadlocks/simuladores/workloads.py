@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Workload Inputs for the MySQL Deadlock Simulator
+What each logical transaction works on, drawn once and reused on retries
+"""
+
+import random
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from workload_trace import OUTCOME_CODES, TraceWriter
+
+
+def plan_transaction(worker_type: str, rng=random) -> Dict[str, Any]:
+    """Keyword arguments for one buyer/restocker/reporter transaction"""
+    if worker_type == 'buyer':
+        return {'product_ids': rng.sample(range(1, 11), rng.randint(1, 3))}
+    if worker_type == 'restocker':
+        return {'product_ids': rng.sample(range(1, 11), rng.randint(1, 2))}
+    if worker_type == 'reporter':
+        return {'id_range': (rng.randint(1, 5), rng.randint(6, 10))}
+    raise ValueError(f"Unknown worker type: {worker_type}")
+
+
+class WorkerStream:
+    """One worker's random draws, recorded to the trace as they are made"""
+
+    def __init__(self, worker_type: str, worker_id: int, rng: random.Random,
+                 trace: Optional[TraceWriter] = None):
+        self.worker_type = worker_type
+        self.worker_id = worker_id
+        self.rng = rng
+        self.trace = trace
+
+    def record(self, op: str, value: float = 0.0):
+        if self.trace:
+            self.trace.record(self.worker_type, self.worker_id, op, value)
+
+    def plan(self) -> Dict[str, Any]:
+        """Draw the inputs of the next logical transaction"""
+        plan = plan_transaction(self.worker_type, self.rng)
+        self.record('begin')
+        for product_id in plan.get('product_ids', ()):
+            self.record('product', product_id)
+        if 'id_range' in plan:
+            self.record('range_low', plan['id_range'][0])
+            self.record('range_high', plan['id_range'][1])
+        return plan
+
+    def attempt(self, attempt: int):
+        self.record('attempt', attempt)
+
+    def quantity(self, low: int, high: int) -> int:
+        quantity = self.rng.randint(low, high)
+        self.record('quantity', quantity)
+        return quantity
+
+    def delay(self, low: float, high: float) -> float:
+        """Artificial delay inside a transaction"""
+        delay = self.rng.uniform(low, high)
+        self.record('delay', delay)
+        return delay
+
+    def think(self, low: float, high: float) -> float:
+        """Pause between transactions"""
+        think = self.rng.uniform(low, high)
+        self.record('think', think)
+        return think
+
+    def end(self, outcome: str):
+        self.record('end', OUTCOME_CODES.get(outcome, OUTCOME_CODES['error']))
+
+
+class WorkloadStreams:
+    """Per-worker random streams, seeded when a simulation seed is configured.
+
+    Each worker gets its own Random seeded from (seed, worker type, worker id),
+    so a worker's sequence of draws does not depend on how threads or
+    coroutines interleave. Without a seed every stream is seeded from the OS.
+    """
+
+    def __init__(self, seed: Optional[int] = None, trace: Optional[TraceWriter] = None):
+        self.seed = seed
+        self.trace = trace
+        self.streams: Dict[Tuple[str, int], WorkerStream] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'WorkloadStreams':
+        """Build streams from the simulation_seed and trace_file keys of a simulator config"""
+        trace = TraceWriter(config['trace_file'], config['simulation_seed']) if config['trace_file'] else None
+        return cls(config['simulation_seed'], trace)
+
+    def rng(self, name: str) -> random.Random:
+        """A named auxiliary stream (arrivals, retry jitter), reproducible under a seed"""
+        return random.Random(f"{self.seed}:{name}") if self.seed is not None else random.Random()
+
+    def for_worker(self, worker_type: str, worker_id: int) -> WorkerStream:
+        key = (worker_type, worker_id)
+        with self.lock:
+            stream = self.streams.get(key)
+            if stream is None:
+                stream = WorkerStream(worker_type, worker_id, self.rng(f"{worker_type}:{worker_id}"), self.trace)
+                self.streams[key] = stream
+            return stream
+
+    def close(self):
+        if self.trace:
+            self.trace.close()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Batched Writes for the MySQL Deadlock Simulator
+Collects a buyer transaction's order items and movements into multi-row inserts
+"""
+
+from typing import List, Tuple
+
+from queries import (
+    INSERT_ORDER_ITEMS_BATCH_SQL, ORDER_ITEM_ROW, INSERT_MOVEMENTS_OUT_BATCH_SQL, MOVEMENT_OUT_ROW
+)
+
+
+def multi_row_insert(head: str, row: str, rows: List[Tuple]) -> Tuple[str, Tuple]:
+    """Expand an INSERT ... VALUES head into one statement for all `rows`"""
+    sql = head + ", ".join([row] * len(rows))
+    return sql, tuple(value for params in rows for value in params)
+
+
+class WriteBatch:
+    """Order items and outbound inventory movements buffered until commit"""
+
+    def __init__(self):
+        self.order_items: List[Tuple] = []
+        self.movements: List[Tuple] = []
+
+    def add(self, order_id: int, product_id: int, quantity: int, price: float):
+        self.order_items.append((order_id, product_id, quantity, price))
+        self.movements.append((product_id, quantity, order_id))
+
+    def statements(self) -> List[Tuple[str, Tuple]]:
+        """At most two multi-row inserts; none when nothing was bought"""
+        if not self.order_items:
+            return []
+        return [
+            multi_row_insert(INSERT_ORDER_ITEMS_BATCH_SQL, ORDER_ITEM_ROW, self.order_items),
+            multi_row_insert(INSERT_MOVEMENTS_OUT_BATCH_SQL, MOVEMENT_OUT_ROW, self.movements)
+        ]
+
+
+class RoundTripCounter:
+    """Wraps a cursor or connection and counts the statements sent through `execute`"""
+
+    def __init__(self, target):
+        self._target = target
+        self.count = 0
+
+    def execute(self, *args, **kwargs):
+        self.count += 1
+        return self._target.execute(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
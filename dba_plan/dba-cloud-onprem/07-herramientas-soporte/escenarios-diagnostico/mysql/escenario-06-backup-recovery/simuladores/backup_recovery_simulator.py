@@ -8,12 +8,16 @@ import os
 import sys
 import time
 import logging
-import mysql.connector
-from mysql.connector import Error
+try:
+    import mysql.connector
+except ImportError:  # Only needed for DB_DRIVER=mysql
+    mysql = None
 import subprocess
 import random
 from datetime import datetime, timedelta
 
+from fake_mysql import DatabaseError as Error, FakeMySQLServer
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -26,11 +30,23 @@ class BackupRecoverySimulator:
             'database': os.getenv('DB_NAME', 'training_db'),
             'port': int(os.getenv('DB_PORT', '3306'))
         }
+        self.backup_dir = os.getenv('BACKUP_DIR', '/backup')
+        
+        # DB_DRIVER=fake keeps the tables in memory and dumps them without mysqldump
+        self.fake_server = None
+        if os.getenv('DB_DRIVER', 'mysql') == 'fake':
+            self.fake_server = FakeMySQLServer(self.db_config['database'])
+    
+    def connect(self):
+        """Open a connection to the configured backend"""
+        if self.fake_server:
+            return self.fake_server.connect()
+        return mysql.connector.connect(**self.db_config)
         
     def create_test_data(self):
         """Create test data for backup scenario"""
         try:
-            connection = mysql.connector.connect(**self.db_config)
+            connection = self.connect()
             cursor = connection.cursor()
             
             # Create tables
@@ -90,7 +106,7 @@ class BackupRecoverySimulator:
         logger.info("Simulating data corruption...")
         
         try:
-            connection = mysql.connector.connect(**self.db_config)
+            connection = self.connect()
             cursor = connection.cursor()
             
             # Simulate corruption by dropping some data
@@ -111,7 +127,13 @@ class BackupRecoverySimulator:
         """Create a backup"""
         logger.info("Creating backup...")
         
-        backup_file = f"/backup/backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.sql"
+        backup_file = f"{self.backup_dir}/backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.sql"
+        
+        if self.fake_server:
+            with open(backup_file, 'w') as f:
+                f.write(self.fake_server.dump())
+            logger.info(f"Backup created: {backup_file}")
+            return backup_file
         
         cmd = [
             'mysqldump',
@@ -150,7 +172,7 @@ class BackupRecoverySimulator:
         # Step 3: Add more data (this will be "lost")
         logger.info("Adding additional data that will be lost...")
         try:
-            connection = mysql.connector.connect(**self.db_config)
+            connection = self.connect()
             cursor = connection.cursor()
             
             for i in range(1000):
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+In-Process Fake MySQL Backend for the Backup & Recovery Simulator
+Keeps accounts and transactions in memory and dumps them like mysqldump
+"""
+
+import re
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from mysql.connector import Error as DatabaseError
+except ImportError:  # Only needed for DB_DRIVER=mysql
+    class DatabaseError(Exception):
+        """Stand-in for mysql.connector.Error when the connector is not installed"""
+
+        def __init__(self, msg: Optional[str] = None, errno: Optional[int] = None):
+            super().__init__(f"{errno} ({msg})" if errno else msg)
+            self.msg = msg
+            self.errno = errno
+
+CREATE_TABLE = re.compile(r'CREATE TABLE IF NOT EXISTS (\w+)', re.I)
+INSERT = re.compile(r'INSERT (IGNORE )?INTO (\w+) \(([^)]*)\) VALUES', re.I)
+DELETE_MODULO = re.compile(r'DELETE FROM (\w+) WHERE id % (\d+) = 0', re.I)
+UPDATE_MODULO = re.compile(r'UPDATE (\w+) SET (\w+) = (-?[\d.]+) WHERE id % (\d+) = 0', re.I)
+
+# Columns of each table in dump order, and the unique keys INSERT IGNORE checks
+COLUMNS = {
+    'accounts': ['id', 'account_number', 'balance', 'created_at'],
+    'transactions': ['id', 'account_id', 'amount', 'transaction_type', 'created_at'],
+}
+UNIQUE = {'accounts': 'account_number'}
+
+# DDL written to the dump, matching the tables create_test_data creates, so the dump restores on its own
+CREATE_STATEMENTS = {
+    'transactions': (
+        "CREATE TABLE `transactions` (\n"
+        "  `id` int NOT NULL AUTO_INCREMENT,\n"
+        "  `account_id` int NOT NULL,\n"
+        "  `amount` decimal(10,2) NOT NULL,\n"
+        "  `transaction_type` enum('DEBIT','CREDIT') NOT NULL,\n"
+        "  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,\n"
+        "  PRIMARY KEY (`id`),\n"
+        "  KEY `idx_account_id` (`account_id`),\n"
+        "  KEY `idx_created_at` (`created_at`)\n"
+        ");"
+    ),
+    'accounts': (
+        "CREATE TABLE `accounts` (\n"
+        "  `id` int NOT NULL AUTO_INCREMENT,\n"
+        "  `account_number` varchar(20) NOT NULL,\n"
+        "  `balance` decimal(12,2) DEFAULT '0.00',\n"
+        "  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,\n"
+        "  PRIMARY KEY (`id`),\n"
+        "  UNIQUE KEY `account_number` (`account_number`)\n"
+        ");"
+    ),
+}
+
+
+class FakeMySQLServer:
+    """Tables shared by every FakeMySQLConnection of a process"""
+
+    def __init__(self, database: str):
+        self.database = database
+        self.tables: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self.next_id: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def connect(self) -> 'FakeMySQLConnection':
+        return FakeMySQLConnection(self)
+
+    def dump(self) -> str:
+        """SQL dump of the current state, in the shape mysqldump writes it"""
+        with self.lock:
+            lines = [f"-- Fake dump of `{self.database}` taken {datetime.now():%Y-%m-%d %H:%M:%S}"]
+            for table, rows in self.tables.items():
+                columns = COLUMNS[table]
+                lines.append(f"DROP TABLE IF EXISTS `{table}`;")
+                lines.append(CREATE_STATEMENTS[table])
+                for row_id in sorted(rows):
+                    values = ", ".join(_literal(rows[row_id].get(column)) for column in columns)
+                    lines.append(f"INSERT INTO `{table}` VALUES ({values});")
+            return "\n".join(lines) + "\n"
+
+    def execute(self, sql: str, params: Tuple, undo: List[Tuple]) -> int:
+        """Apply one statement and return the affected row count"""
+        statement = " ".join(sql.split())
+        with self.lock:
+            match = CREATE_TABLE.match(statement)
+            if match:
+                self.tables.setdefault(match.group(1), {})
+                self.next_id.setdefault(match.group(1), 1)
+                return 0
+
+            match = INSERT.match(statement)
+            if match:
+                ignore, table, columns = match.group(1), match.group(2), [c.strip() for c in match.group(3).split(',')]
+                row = dict(zip(columns, params))
+                unique = UNIQUE.get(table)
+                if unique and any(existing[unique] == row[unique] for existing in self._table(table).values()):
+                    if ignore:
+                        return 0
+                    raise DatabaseError(msg=f"Duplicate entry '{row[unique]}' for key '{unique}'", errno=1062)
+                row_id = self.next_id[table]
+                self.next_id[table] += 1
+                row.update(id=row_id, created_at=datetime.now())
+                self.tables[table][row_id] = row
+                undo.append((table, row_id, None))
+                return 1
+
+            match = DELETE_MODULO.match(statement)
+            if match:
+                table, modulo = match.group(1), int(match.group(2))
+                rows = self._table(table)
+                deleted = [row_id for row_id in rows if row_id % modulo == 0]
+                for row_id in deleted:
+                    undo.append((table, row_id, rows.pop(row_id)))
+                return len(deleted)
+
+            match = UPDATE_MODULO.match(statement)
+            if match:
+                table, column, value, modulo = match.group(1), match.group(2), float(match.group(3)), int(match.group(4))
+                affected = 0
+                for row_id, row in self._table(table).items():
+                    if row_id % modulo == 0:
+                        undo.append((table, row_id, dict(row)))
+                        row[column] = value
+                        affected += 1
+                return affected
+
+        raise DatabaseError(msg=f"Fake backend does not understand: {statement[:60]}", errno=1064)
+
+    def rollback(self, undo: List[Tuple]):
+        with self.lock:
+            for table, row_id, before in reversed(undo):
+                if before is None:
+                    self.tables[table].pop(row_id, None)
+                else:
+                    self.tables[table][row_id] = before
+
+    def _table(self, table: str) -> Dict[int, Dict[str, Any]]:
+        if table not in self.tables:
+            raise DatabaseError(msg=f"Table '{self.database}.{table}' doesn't exist", errno=1146)
+        return self.tables[table]
+
+
+class FakeMySQLConnection:
+    """The subset of mysql.connector's connection API used by the simulator"""
+
+    def __init__(self, server: FakeMySQLServer):
+        self.server = server
+        self.connected = True
+        self.undo: List[Tuple] = []
+
+    def cursor(self) -> 'FakeCursor':
+        return FakeCursor(self)
+
+    def commit(self):
+        self.undo = []
+
+    def rollback(self):
+        self.server.rollback(self.undo)
+        self.undo = []
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    def close(self):
+        if self.connected:
+            self.rollback()
+            self.connected = False
+
+
+class FakeCursor:
+    def __init__(self, conn: FakeMySQLConnection):
+        self.conn = conn
+        self.rowcount = -1
+
+    def execute(self, sql: str, params: Tuple = ()):
+        self.rowcount = self.conn.server.execute(sql, tuple(params or ()), self.conn.undo)
+
+    def close(self):
+        pass
+
+
+def _literal(value: Any) -> str:
+    if value is None:
+        return 'NULL'
+    if isinstance(value, (int, float)):
+        return f"{value:.2f}" if isinstance(value, float) else str(value)
+    return "'" + str(value).replace("'", "''") + "'"
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Bloat and Dead-Tuple Telemetry Sampler for the VACUUM Scenario
+Polls table statistics into per-table ring buffers and exports growth, lag and bloat as Prometheus gauges
+"""
+
+import time
+import logging
+import threading
+from array import array
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from prometheus_client import Gauge
+
+logger = logging.getLogger(__name__)
+
+# One round trip per sample: counters, on-disk size and the progress of any running VACUUM
+SAMPLE_QUERY = """
+    SELECT s.relname, s.n_live_tup, s.n_dead_tup, pg_total_relation_size(s.relid),
+           s.vacuum_count + s.autovacuum_count,
+           COALESCE(p.heap_blks_scanned::float / NULLIF(p.heap_blks_total, 0), 0)
+    FROM pg_stat_user_tables s
+    LEFT JOIN pg_stat_progress_vacuum p ON p.relid = s.relid
+"""
+
+SETTINGS_QUERY = """
+    SELECT name, setting FROM pg_settings
+    WHERE name IN ('autovacuum_vacuum_threshold', 'autovacuum_vacuum_scale_factor')
+"""
+
+dead_tuples = Gauge('postgresql_table_dead_tuples', 'Dead tuples per table', ['table'],
+                    multiprocess_mode='livesum')
+dead_tuple_growth = Gauge('postgresql_table_dead_tuple_growth_per_second',
+                          'Dead tuples added per second since the last vacuum, within the sample window',
+                          ['table'], multiprocess_mode='livesum')
+autovacuum_lag = Gauge('postgresql_table_autovacuum_lag_seconds',
+                       'Time the table has been over its autovacuum threshold without being vacuumed',
+                       ['table'], multiprocess_mode='livesum')
+bloat_ratio = Gauge('postgresql_table_bloat_ratio', 'Dead tuples over live plus dead tuples', ['table'],
+                    multiprocess_mode='livesum')
+relation_size = Gauge('postgresql_table_size_bytes', 'pg_total_relation_size of the table', ['table'],
+                      multiprocess_mode='livesum')
+vacuum_progress = Gauge('postgresql_table_vacuum_progress_ratio',
+                        'Heap blocks scanned by the running VACUUM (0 when none runs)', ['table'],
+                        multiprocess_mode='livesum')
+
+
+class SampleRing:
+    """Fixed number of samples, each a row of floats, in one preallocated array"""
+
+    FIELDS = ('time', 'live', 'dead', 'size', 'vacuums')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.width = len(self.FIELDS)
+        self.data = array('d', [0.0]) * (capacity * self.width)
+        self.count = 0
+        self.next = 0
+
+    def append(self, sample: Tuple[float, ...]):
+        start = self.next * self.width
+        self.data[start:start + self.width] = array('d', sample)
+        self.next = (self.next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> Tuple[float, ...]:
+        """Sample by age: 0 is the oldest kept, -1 the newest"""
+        if not -self.count <= index < self.count:
+            raise IndexError(index)
+        position = (self.next - self.count + index % self.count) % self.capacity
+        start = position * self.width
+        return tuple(self.data[start:start + self.width])
+
+
+class BloatSampler:
+    """Background thread that samples every user table each `interval` seconds.
+
+    Each sample is one query on one long-lived autocommit connection, so
+    the overhead does not grow with the number of tables. Dead-tuple growth
+    is measured from the oldest kept sample taken since the last (auto)vacuum;
+    autovacuum lag counts from the first sample over autovacuum's trigger
+    (threshold + scale_factor * live tuples, from pg_settings; per-table
+    reloptions are not considered).
+    """
+
+    def __init__(self, connect: Callable[[], Any], interval: float = 15.0, window: int = 40):
+        self.connect = connect
+        self.interval = interval
+        self.window = window
+        self.rings: Dict[str, SampleRing] = {}
+        self.over_threshold_since: Dict[str, Optional[float]] = {}
+        self.latest: Dict[str, Dict[str, float]] = {}
+        self.threshold = 50.0
+        self.scale_factor = 0.2
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.conn = None
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name='BloatSampler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join(timeout=self.interval + 5)
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning(f"Bloat sampler: {e}")
+                self.close()
+            self.stopped.wait(self.interval)
+        self.close()
+
+    def close(self):
+        try:
+            if self.conn:
+                self.conn.close()
+        except Exception:
+            pass
+        self.conn = None
+
+    def sample(self):
+        """Take one sample of every table and refresh the gauges"""
+        if self.conn is None:
+            self.conn = self.connect()
+            self.conn.autocommit = True
+            cursor = self.conn.cursor()
+            cursor.execute(SETTINGS_QUERY)
+            settings = dict(cursor.fetchall())
+            self.threshold = float(settings.get('autovacuum_vacuum_threshold', self.threshold))
+            self.scale_factor = float(settings.get('autovacuum_vacuum_scale_factor', self.scale_factor))
+            cursor.close()
+
+        cursor = self.conn.cursor()
+        cursor.execute(SAMPLE_QUERY)
+        rows = cursor.fetchall()
+        cursor.close()
+        now = time.time()
+        for table, live, dead, size, vacuums, progress in rows:
+            ring = self.rings.setdefault(table, SampleRing(self.window))
+            ring.append((now, live, dead, size, vacuums))
+            self.export(table, ring, float(progress or 0))
+
+    def export(self, table: str, ring: SampleRing, progress: float):
+        now, live, dead, size, vacuums = ring[-1]
+
+        # Oldest sample since the last vacuum, so a vacuum does not show as negative growth
+        oldest = ring[-1]
+        for index in range(len(ring) - 2, -1, -1):
+            if ring[index][4] != vacuums:
+                break
+            oldest = ring[index]
+        elapsed = now - oldest[0]
+        growth = (dead - oldest[2]) / elapsed if elapsed > 0 else 0.0
+
+        since = self.over_threshold_since.get(table)
+        if len(ring) > 1 and ring[-2][4] != vacuums:
+            since = None
+        if dead > self.threshold + self.scale_factor * live:
+            since = since or now
+        else:
+            since = None
+        self.over_threshold_since[table] = since
+        ratio = dead / (live + dead) if live + dead else 0.0
+        self.latest[table] = {'dead': dead, 'growth': growth, 'lag': now - since if since else 0.0,
+                              'bloat_ratio': ratio, 'size': size}
+
+        dead_tuples.labels(table=table).set(dead)
+        dead_tuple_growth.labels(table=table).set(growth)
+        autovacuum_lag.labels(table=table).set(self.latest[table]['lag'])
+        bloat_ratio.labels(table=table).set(ratio)
+        relation_size.labels(table=table).set(size)
+        vacuum_progress.labels(table=table).set(progress)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Latest dead tuples, growth, lag, bloat ratio and size per table"""
+        return {table: dict(values) for table, values in self.latest.items()}
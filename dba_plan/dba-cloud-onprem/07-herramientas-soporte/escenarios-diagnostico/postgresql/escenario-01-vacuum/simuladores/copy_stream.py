@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Streaming COPY FROM STDIN Source for the VACUUM Problem Simulator
+Encodes rows lazily into bounded chunks of PostgreSQL's COPY text format
+"""
+
+import time
+from datetime import date, datetime
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+NULL = '\\N'
+
+# Characters COPY's text format escapes inside a column value
+ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+UNESCAPES = {'\\': '\\', 't': '\t', 'n': '\n', 'r': '\r', 'N': None}
+
+
+def copy_value(value: Any) -> str:
+    """One column in COPY text format"""
+    if value is None:
+        return NULL
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return str(value).translate(ESCAPES)
+
+
+def copy_line(row: Tuple) -> str:
+    return '\t'.join(copy_value(value) for value in row) + '\n'
+
+
+def parse_copy_line(line: str) -> List[Optional[str]]:
+    """Split one COPY text line back into column values (None for \\N)"""
+    values: List[Optional[str]] = []
+    for field in line.rstrip('\n').split('\t'):
+        if field == NULL:
+            values.append(None)
+            continue
+        out, chars = [], iter(field)
+        for char in chars:
+            if char == '\\':
+                escaped = next(chars, '\\')
+                out.append(UNESCAPES.get(escaped, escaped) or '')
+            else:
+                out.append(char)
+        values.append(''.join(out))
+    return values
+
+
+class CopyStream:
+    """File-like source for cursor.copy_expert() that never holds the whole batch.
+
+    Rows are pulled from an iterator and encoded only when the driver calls
+    read(), so memory is bounded by one chunk instead of the batch size and
+    the first bytes reach the server as soon as the first chunk is full.
+    The buffer is kept between batches; call reset() with the next rows to
+    reuse it.
+    """
+
+    def __init__(self, rows: Iterable[Tuple] = (), encoding: str = 'utf-8'):
+        self.encoding = encoding
+        self.buffer = bytearray()
+        self.reset(rows)
+
+    def reset(self, rows: Iterable[Tuple]):
+        self.rows: Iterator[Tuple] = iter(rows)
+        self.buffer.clear()
+        self.exhausted = False
+        self.row_count = 0
+        self.byte_count = 0
+        self.chunks = 0
+        self.peak_buffer = 0
+        self.started = time.monotonic()
+        self.first_row_latency: Optional[float] = None
+
+    def read(self, size: int = -1) -> bytes:
+        """Up to `size` bytes of COPY data; b'' once the rows run out"""
+        while not self.exhausted and (size < 0 or len(self.buffer) < size):
+            row = next(self.rows, None)
+            if row is None:
+                self.exhausted = True
+                break
+            self.buffer += copy_line(row).encode(self.encoding)
+            self.row_count += 1
+        self.peak_buffer = max(self.peak_buffer, len(self.buffer))
+
+        if size < 0 or size >= len(self.buffer):
+            chunk = bytes(self.buffer)
+            self.buffer.clear()
+        else:
+            chunk = bytes(self.buffer[:size])
+            del self.buffer[:size]
+        if chunk:
+            if self.first_row_latency is None:
+                self.first_row_latency = time.monotonic() - self.started
+            self.byte_count += len(chunk)
+            self.chunks += 1
+        return chunk
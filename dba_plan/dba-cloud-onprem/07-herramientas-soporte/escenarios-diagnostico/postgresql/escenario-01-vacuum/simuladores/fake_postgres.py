@@ -0,0 +1,728 @@
+#!/usr/bin/env python3
+"""
+In-Process Fake PostgreSQL Backend for the VACUUM Problem Simulator
+MVCC dead-tuple accounting and a psycopg2-like API for offline runs
+"""
+
+import re
+import time
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from copy_stream import parse_copy_line
+
+try:
+    from psycopg2 import Error as DatabaseError
+except ImportError:  # Only needed for DB_DRIVER=postgres
+    class DatabaseError(Exception):
+        """Stand-in for psycopg2.Error when psycopg2 is not installed"""
+
+
+class FakePostgresError(DatabaseError):
+    pass
+
+
+# Tables the simulator touches: primary key, indexed columns (an UPDATE that
+# changes none of them is HOT) and how many rows exist at start
+SCHEMA = {
+    'events': {'pk': 'id', 'indexed': {'id', 'user_id', 'created_at'}, 'rows': 0},
+    'user_sessions': {'pk': 'session_id', 'indexed': {'session_id'}, 'rows': 10000},
+    'analytics_cache': {'pk': 'id', 'indexed': {'id', 'metric_name', 'created_at'}, 'rows': 0},
+    'audit_logs': {'pk': 'id', 'indexed': {'id', 'created_at'}, 'rows': 0},
+}
+
+
+class TableStats:
+    """The pg_stat_user_tables counters of one table"""
+
+    def __init__(self):
+        self.n_live_tup = 0
+        self.n_dead_tup = 0
+        self.n_tup_ins = 0
+        self.n_tup_upd = 0
+        self.n_tup_hot_upd = 0
+        self.n_tup_del = 0
+        self.seq_tup_read = 0
+        self.idx_tup_fetch = 0
+        self.vacuum_count = 0
+        self.last_vacuum: Optional[datetime] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+class FakeTable:
+    def __init__(self, name: str, pk: str, indexed: set, rows: int):
+        self.name = name
+        self.pk = pk
+        self.indexed = indexed
+        self.rows: Dict[Any, Dict[str, Any]] = {}
+        # Rows inserted by a still open transaction, with the connection that owns it
+        self.uncommitted: Dict[Any, Any] = {}
+        self.next_id = 1
+        self.fillfactor = 100
+        self.pages = 0
+        self.stats = TableStats()
+        now = datetime.now()
+        for row_id in range(1, rows + 1):
+            self.rows[row_id] = {pk: row_id, 'last_activity': now, 'page_views': 0, 'session_data': '{}'}
+        self.stats.n_live_tup = rows
+        self.next_id = rows + 1
+
+    def size_bytes(self) -> int:
+        """Heap size: grows with live plus dead tuples, and VACUUM does not give pages back"""
+        tuples = self.stats.n_live_tup + self.stats.n_dead_tup
+        self.pages = max(self.pages, -(-tuples * 100 // (TUPLES_PER_PAGE * self.fillfactor)))
+        return self.pages * 8192
+
+
+# Server settings the simulator reads, at their PostgreSQL defaults
+SETTINGS = {
+    'autovacuum_vacuum_threshold': '50',
+    'autovacuum_vacuum_scale_factor': '0.2',
+}
+
+# Heap tuples per 8 kB page, for relation sizes
+TUPLES_PER_PAGE = 60
+
+# Approximate WAL record sizes: header per heap record (plus the tuple for
+# inserts and updates) and the commit record
+WAL_RECORD_BYTES = 54
+WAL_COMMIT_BYTES = 34
+
+
+class FakePostgresServer:
+    """Shared tables and MVCC counters for every FakePostgresConnection of a process.
+
+    Every INSERT, UPDATE and DELETE is applied immediately and logged for
+    undo. Dead tuples are counted the way PostgreSQL leaves them behind: an
+    UPDATE always leaves one (the old version on commit, the new one on
+    abort), a DELETE leaves one unless it is rolled back and an INSERT leaves
+    one only if it is rolled back. VACUUM clears the table's dead tuples.
+    Each change also advances a WAL position by an approximate record size,
+    and a synchronous commit costs one `latency` for the WAL flush. Rows
+    inserted by an open transaction are invisible to other connections until
+    it commits, as under READ COMMITTED; other uncommitted changes are shared.
+    """
+
+    def __init__(self, latency: float = 0.001):
+        self.latency = latency
+        self.lock = threading.RLock()
+        self.wal_bytes = 0
+        self.tables = {name: FakeTable(name, spec['pk'], spec['indexed'], spec['rows'])
+                       for name, spec in SCHEMA.items()}
+
+    def connect(self) -> 'FakePostgresConnection':
+        return FakePostgresConnection(self)
+
+    def table(self, name: str) -> FakeTable:
+        table = self.tables.get(name)
+        if table is None:
+            raise FakePostgresError(f'relation "{name}" does not exist')
+        return table
+
+    def create_like(self, name: str, source: str):
+        """CREATE TABLE name (LIKE source ...): same keys and indexes, shares the id sequence"""
+        with self.lock:
+            if name in self.tables:
+                raise FakePostgresError(f'relation "{name}" already exists')
+            template = self.table(source)
+            table = FakeTable(name, template.pk, set(template.indexed), 0)
+            table.next_id = template.next_id
+            self.tables[name] = table
+
+    def rename(self, name: str, new_name: str):
+        with self.lock:
+            if new_name in self.tables:
+                raise FakePostgresError(f'relation "{new_name}" already exists')
+            table = self.tables.pop(self.table(name).name)
+            table.name = new_name
+            self.tables[new_name] = table
+
+    def drop(self, name: str, if_exists: bool = False):
+        with self.lock:
+            if name in self.tables or not if_exists:
+                del self.tables[self.table(name).name]
+
+    def vacuum(self, name: Optional[str] = None):
+        with self.lock:
+            for table in ([self.table(name)] if name else self.tables.values()):
+                table.stats.n_dead_tup = 0
+                table.stats.vacuum_count += 1
+                table.stats.last_vacuum = datetime.now()
+
+    def wal_lsn(self) -> str:
+        return f"{self.wal_bytes >> 32:X}/{self.wal_bytes & 0xFFFFFFFF:X}"
+
+    def commit_record(self, synchronous: bool):
+        with self.lock:
+            self.wal_bytes += WAL_COMMIT_BYTES
+        if synchronous and self.latency:
+            time.sleep(self.latency)
+
+    # Row changes, called with self.lock held
+
+    def insert(self, table: FakeTable, row: Dict[str, Any], undo: List[Tuple]):
+        row_id = row.get(table.pk)
+        if row_id is None:
+            row_id = table.next_id
+            table.next_id += 1
+            row[table.pk] = row_id
+        elif isinstance(row_id, int):
+            table.next_id = max(table.next_id, row_id + 1)
+        table.rows[row_id] = row
+        self.wal_bytes += WAL_RECORD_BYTES + len(str(row))
+        table.stats.n_live_tup += 1
+        table.stats.n_tup_ins += 1
+        undo.append(('insert', table, row_id, None))
+
+    def update(self, table: FakeTable, row_id: Any, changes: Dict[str, Any], undo: List[Tuple]):
+        old = table.rows[row_id]
+        new = table.rows[row_id] = {**old, **changes}
+        self.wal_bytes += WAL_RECORD_BYTES + len(str(new))
+        table.stats.n_tup_upd += 1
+        table.stats.n_dead_tup += 1
+        # HOT needs no indexed column changed and room on the page: with a full
+        # page (fillfactor 100) only a version no larger than the old one fits
+        if not table.indexed & set(changes) and (table.fillfactor < 100 or len(str(new)) <= len(str(old))):
+            table.stats.n_tup_hot_upd += 1
+        undo.append(('update', table, row_id, old))
+
+    def delete(self, table: FakeTable, row_id: Any, undo: List[Tuple]):
+        old = table.rows.pop(row_id)
+        self.wal_bytes += WAL_RECORD_BYTES
+        table.stats.n_live_tup -= 1
+        table.stats.n_dead_tup += 1
+        table.stats.n_tup_del += 1
+        undo.append(('delete', table, row_id, old))
+
+    def rollback(self, undo: List[Tuple]):
+        with self.lock:
+            for kind, table, row_id, old in reversed(undo):
+                if kind == 'insert':
+                    table.rows.pop(row_id, None)
+                    table.stats.n_live_tup -= 1
+                    table.stats.n_dead_tup += 1
+                elif kind == 'update':
+                    table.rows[row_id] = old
+                else:
+                    table.rows[row_id] = old
+                    table.stats.n_live_tup += 1
+                    table.stats.n_dead_tup -= 1
+
+
+INSERT_RE = re.compile(r'^INSERT INTO (\w+) \(([^)]*)\) VALUES (\(.*\))( ON CONFLICT DO NOTHING)?$', re.I | re.S)
+UPDATE_RE = re.compile(r'^UPDATE (\w+) SET (.*) WHERE (.*)$', re.I | re.S)
+DELETE_LIMIT_RE = re.compile(r'^DELETE FROM (\w+) WHERE (\w+) IN \( SELECT \2 FROM \1 WHERE (.*) LIMIT %s \)$', re.I | re.S)
+DELETE_RE = re.compile(r'^DELETE FROM (\w+) WHERE (.*)$', re.I | re.S)
+UPDATE_FROM_RE = re.compile(r'^UPDATE (\w+) AS (\w+) SET (.*) FROM (?:\((VALUES .*)\)|unnest\((.*)\)) '
+                            r'AS (\w+)\(([^)]*)\) WHERE (\w+)\.(\w+) = (\w+)\.(\w+)$', re.I | re.S)
+FILLFACTOR_RE = re.compile(r'^ALTER TABLE (\w+) SET \(fillfactor = (\d+)\)$', re.I)
+INSERT_SELECT_RE = re.compile(r'^INSERT INTO (\w+) SELECT \* FROM (\w+) WHERE (.*)$', re.I | re.S)
+CREATE_TABLE_RE = re.compile(r'^CREATE TABLE IF NOT EXISTS (\w+) \((.*)\)$', re.I | re.S)
+CREATE_LIKE_RE = re.compile(r'^CREATE TABLE (\w+) \(LIKE (\w+)(?: INCLUDING \w+)*\)$', re.I)
+DROP_RE = re.compile(r'^DROP TABLE (IF EXISTS )?(\w+)$', re.I)
+RENAME_RE = re.compile(r'^ALTER TABLE (\w+) RENAME TO (\w+)$', re.I)
+SEQUENCE_OWNER_RE = re.compile(r'^ALTER SEQUENCE (?:IF EXISTS )?\w+ OWNED BY [\w.]+$', re.I)
+SET_RE = re.compile(r"^SET (?:SESSION )?(\w+) (?:=|TO) '?(\w+)'?$", re.I)
+WAL_LSN_RE = re.compile(r'^SELECT pg_current_wal_lsn\(\)$', re.I)
+WAL_DIFF_RE = re.compile(r'^SELECT pg_wal_lsn_diff\(pg_current_wal_lsn\(\), %s\)$', re.I)
+SETTINGS_RE = re.compile(r'^SELECT name, setting FROM pg_settings WHERE name IN \((.*)\)$', re.I)
+TABLE_SAMPLE_RE = re.compile(r'^SELECT s\.relname, .* FROM pg_stat_user_tables s '
+                             r'LEFT JOIN pg_stat_progress_vacuum p ON p\.relid = s\.relid$', re.I)
+SELECT_RE = re.compile(r'^SELECT (.+?) FROM (\w+)(?: WHERE (.*?))?( FOR UPDATE)?$', re.I | re.S)
+RELKIND_RE = re.compile(r'^SELECT relkind FROM pg_class WHERE relname = %s$', re.I)
+PG_STAT_RE = re.compile(r'^SELECT (.*) FROM pg_stat_(xact_)?user_tables(?: WHERE relname = %s)?$', re.I)
+COPY_RE = re.compile(r'^COPY (\w+) \(([^)]*)\) FROM STDIN$', re.I)
+VACUUM_RE = re.compile(r'^VACUUM(?: \(?[A-Z, ]*\)?)?(?: (\w+))?$', re.I)
+
+
+def split_top_level(text: str, separator: str = ',') -> List[str]:
+    """Split on `separator` outside parentheses and quotes"""
+    parts, depth, quoted, current = [], 0, False, ''
+    for char in text:
+        if char == "'":
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        if char == separator and depth == 0 and not quoted:
+            parts.append(current.strip())
+            current = ''
+        else:
+            current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+class FakePostgresConnection:
+    """The subset of a psycopg2 connection used by the simulator"""
+
+    def __init__(self, server: FakePostgresServer):
+        self.server = server
+        self.autocommit = False
+        self.closed = False
+        self.synchronous_commit = True
+        self.undo: List[Tuple] = []
+        # Rows this transaction read per table, for pg_stat_xact_user_tables
+        self.xact_reads: Dict[str, Dict[str, int]] = {}
+
+    def cursor(self) -> 'FakePostgresCursor':
+        return FakePostgresCursor(self)
+
+    def commit(self):
+        if self.undo:
+            self.server.commit_record(self.synchronous_commit)
+        self._release()
+        self.undo = []
+        self.xact_reads = {}
+
+    def rollback(self):
+        self.server.rollback(self.undo)
+        self._release()
+        self.undo = []
+        self.xact_reads = {}
+
+    def _release(self):
+        """The rows this transaction inserted stop being private to it"""
+        with self.server.lock:
+            for kind, table, row_id, _ in self.undo:
+                if kind == 'insert' and table.uncommitted.get(row_id) is self:
+                    del table.uncommitted[row_id]
+
+    def _count_read(self, table: FakeTable, counter: str, rows: int):
+        """Rows read by a sequential scan (seq_tup_read) or fetched through an index (idx_tup_fetch)"""
+        setattr(table.stats, counter, getattr(table.stats, counter) + rows)
+        reads = self.xact_reads.setdefault(table.name, {})
+        reads[counter] = reads.get(counter, 0) + rows
+
+    def _visible(self, table: FakeTable, row_ids) -> List[Any]:
+        return [row_id for row_id in row_ids if table.uncommitted.get(row_id, self) is self]
+
+    def close(self):
+        if not self.closed:
+            self.rollback()
+            self.closed = True
+
+    def run(self, sql: str, params: Tuple) -> Tuple[int, List[Tuple]]:
+        """Execute one statement; returns (rowcount, rows)"""
+        if self.closed:
+            raise FakePostgresError("connection already closed")
+        statement = ' '.join(sql.split())
+        undo: List[Tuple] = []
+        with self.server.lock:
+            try:
+                result = self._dispatch(statement, list(params), undo)
+            except Exception:
+                # A failed statement leaves no changes behind
+                self.server.rollback(undo)
+                raise
+        self._finish(undo)
+        return result
+
+    def _finish(self, undo: List[Tuple]):
+        """Keep a statement's changes for the transaction, or commit them in autocommit"""
+        if not self.autocommit:
+            with self.server.lock:
+                for kind, table, row_id, _ in undo:
+                    if kind == 'insert':
+                        table.uncommitted[row_id] = self
+            self.undo.extend(undo)
+        elif undo:
+            self.server.commit_record(self.synchronous_commit)
+
+    def _dispatch(self, statement: str, params: List[Any], undo: List[Tuple]) -> Tuple[int, List[Tuple]]:
+        server = self.server
+
+        match = INSERT_RE.match(statement)
+        if match:
+            table = server.table(match.group(1))
+            columns = [column.strip() for column in match.group(2).split(',')]
+            tuples = split_top_level(match.group(3))
+            inserted = 0
+            for values in tuples:
+                values = split_top_level(values[1:-1])
+                row = {column: self._value(value, params) for column, value in zip(columns, values)}
+                if row.get(table.pk) in table.rows:
+                    if match.group(4):
+                        continue
+                    raise FakePostgresError(f'duplicate key value violates unique constraint "{table.name}_pkey"')
+                server.insert(table, row, undo)
+                inserted += 1
+            return inserted, []
+
+        match = INSERT_SELECT_RE.match(statement)
+        if match:
+            table, source = server.table(match.group(1)), server.table(match.group(2))
+            row_ids = self._matching(source, match.group(3), params)
+            for row_id in row_ids:
+                server.insert(table, dict(source.rows[row_id]), undo)
+            return len(row_ids), []
+
+        match = UPDATE_FROM_RE.match(statement)
+        if match:
+            return self._update_from(match, params, undo), []
+
+        match = UPDATE_RE.match(statement)
+        if match:
+            table = server.table(match.group(1))
+            assignments = split_top_level(match.group(2))
+            set_params = params[:sum(assignment.count('%s') for assignment in assignments)]
+            where_params = params[len(set_params):]
+            count = 0
+            for row_id in self._matching(table, match.group(3), where_params):
+                changes = {}
+                for assignment in assignments:
+                    column = assignment.split('=', 1)[0].strip()
+                    changes[column] = self._assigned(table.rows[row_id], column, assignment, set_params)
+                server.update(table, row_id, changes, undo)
+                count += 1
+            return count, []
+
+        match = DELETE_LIMIT_RE.match(statement)
+        if match:
+            table = server.table(match.group(1))
+            row_ids = self._matching(table, match.group(3), params[:-1])[:params[-1]]
+            for row_id in row_ids:
+                server.delete(table, row_id, undo)
+            return len(row_ids), []
+
+        match = DELETE_RE.match(statement)
+        if match:
+            table = server.table(match.group(1))
+            row_ids = self._matching(table, match.group(2), params)
+            for row_id in row_ids:
+                server.delete(table, row_id, undo)
+            return len(row_ids), []
+
+        match = VACUUM_RE.match(statement)
+        if match:
+            if not self.autocommit:
+                raise FakePostgresError("VACUUM cannot run inside a transaction block")
+            server.vacuum(match.group(1))
+            return 0, []
+
+        # DDL takes effect immediately; the fake does not roll it back
+        match = CREATE_TABLE_RE.match(statement)
+        if match:
+            if match.group(1) not in server.tables:
+                definitions = split_top_level(match.group(2))
+                pk = next((d.split()[0] for d in definitions if 'PRIMARY KEY' in d.upper()), definitions[0].split()[0])
+                server.tables[match.group(1)] = FakeTable(match.group(1), pk, {pk}, 0)
+            return 0, []
+
+        match = CREATE_LIKE_RE.match(statement)
+        if match:
+            server.create_like(match.group(1), match.group(2))
+            return 0, []
+
+        match = FILLFACTOR_RE.match(statement)
+        if match:
+            server.table(match.group(1)).fillfactor = int(match.group(2))
+            return 0, []
+
+        match = RENAME_RE.match(statement)
+        if match:
+            server.rename(match.group(1), match.group(2))
+            return 0, []
+
+        match = DROP_RE.match(statement)
+        if match:
+            server.drop(match.group(2), if_exists=bool(match.group(1)))
+            return 0, []
+
+        if SEQUENCE_OWNER_RE.match(statement):
+            return 0, []
+
+        match = SET_RE.match(statement)
+        if match:
+            if match.group(1).lower() == 'synchronous_commit':
+                self.synchronous_commit = match.group(2).lower() != 'off'
+            return 0, []
+
+        if WAL_LSN_RE.match(statement):
+            return 1, [(server.wal_lsn(),)]
+
+        if WAL_DIFF_RE.match(statement):
+            high, low = params[0].split('/')
+            return 1, [(server.wal_bytes - ((int(high, 16) << 32) + int(low, 16)),)]
+
+        match = SETTINGS_RE.match(statement)
+        if match:
+            names = [name.strip().strip("'") for name in match.group(1).split(',')]
+            rows = [(name, SETTINGS[name]) for name in names if name in SETTINGS]
+            return len(rows), rows
+
+        if TABLE_SAMPLE_RE.match(statement):
+            # relname, live, dead, total size, vacuums, progress of a running VACUUM (none in the fake)
+            rows = [(table.name, table.stats.n_live_tup, table.stats.n_dead_tup, table.size_bytes(),
+                     table.stats.vacuum_count, 0.0) for table in server.tables.values()]
+            return len(rows), rows
+
+        match = PG_STAT_RE.match(statement)
+        if match:
+            columns = [column.strip() for column in match.group(1).split(',')]
+            tables = [server.table(params[0])] if params else list(server.tables.values())
+            if match.group(2):
+                # pg_stat_xact_user_tables: only the row reads of this transaction are tracked
+                return len(tables), [tuple(table.name if column == 'relname' else
+                                           self.xact_reads.get(table.name, {}).get(column, 0)
+                                           for column in columns) for table in tables]
+            return len(tables), [tuple(table.name if column == 'relname' else getattr(table.stats, column)
+                                       for column in columns) for table in tables]
+
+        if RELKIND_RE.match(statement):
+            # Every fake table is a plain heap table, none is partitioned
+            return (1, [('r',)]) if params[0] in server.tables else (0, [])
+
+        match = SELECT_RE.match(statement)
+        if match and match.group(2) in server.tables:
+            return self._select(server.table(match.group(2)), match.group(1), match.group(3), params)
+
+        if statement.upper() == 'SELECT 1':
+            return 1, [(1,)]
+
+        raise FakePostgresError(f"Fake backend does not understand: {statement[:60]}")
+
+    def copy_rows(self, sql: str, lines: List[str]) -> int:
+        """Insert COPY text-format lines, typing values the way the simulator's columns expect"""
+        match = COPY_RE.match(' '.join(sql.split()))
+        if not match:
+            raise FakePostgresError(f"Fake backend does not understand: {sql.strip()[:60]}")
+        columns = [column.strip() for column in match.group(2).split(',')]
+        undo: List[Tuple] = []
+        with self.server.lock:
+            try:
+                table = self.server.table(match.group(1))
+                for line in lines:
+                    values = parse_copy_line(line)
+                    if len(values) != len(columns):
+                        raise FakePostgresError(f"COPY {table.name}: expected {len(columns)} columns, got {len(values)}")
+                    row = {column: _typed(value) for column, value in zip(columns, values)}
+                    self.server.insert(table, row, undo)
+            except Exception:
+                self.server.rollback(undo)
+                raise
+        self._finish(undo)
+        return len(lines)
+
+    def _select(self, table: FakeTable, columns: str, where: Optional[str], params: List[Any]) -> Tuple[int, List[Tuple]]:
+        """SELECT of plain columns, count(*) or COALESCE(MAX(column), default)"""
+        row_ids = self._matching(table, where, params) if where else self._visible(table, table.rows)
+        aggregate = re.match(r'^COALESCE\(MAX\((\w+)\), (-?\d+)\)$', columns, re.I)
+        if aggregate:
+            values = [table.rows[row_id].get(aggregate.group(1)) for row_id in row_ids]
+            values = [value for value in values if value is not None]
+            return 1, [(max(values) if values else int(aggregate.group(2)),)]
+        if columns.lower() == 'count(*)':
+            return 1, [(len(row_ids),)]
+        names = [column.strip() for column in columns.split(',')]
+        rows = [tuple(table.rows[row_id].get(name) for name in names) for row_id in row_ids]
+        return len(rows), rows
+
+    def _update_from(self, match, params: List[Any], undo: List[Tuple]) -> int:
+        """UPDATE t AS a SET ... FROM (VALUES ...) | unnest(arrays) AS v(cols) WHERE a.key = v.key"""
+        table, alias = self.server.table(match.group(1)), match.group(2)
+        source_alias = match.group(6)
+        source_columns = [column.strip() for column in match.group(7).split(',')]
+        if match.group(4):
+            tuples = split_top_level(match.group(4)[len('VALUES '):])
+            source_rows = [[self._value(value.split('::')[0], params) for value in split_top_level(values[1:-1])]
+                           for values in tuples]
+        else:
+            source_rows = list(zip(*params[:len(split_top_level(match.group(5)))]))
+        sides = {match.group(8): match.group(9), match.group(10): match.group(11)}
+        target_key, source_key = sides[alias], sides[source_alias]
+        assignments = [assignment.split('=', 1) for assignment in split_top_level(match.group(3))]
+
+        count = 0
+        for values in source_rows:
+            source = dict(zip(source_columns, values))
+            if target_key == table.pk:
+                row_ids = [source[source_key]] if source[source_key] in table.rows else []
+            else:
+                row_ids = [row_id for row_id, row in table.rows.items() if row.get(target_key) == source[source_key]]
+            for row_id in row_ids:
+                row = table.rows[row_id]
+                changes = {column.strip(): self._joined(expression, alias, row, source)
+                           for column, expression in assignments}
+                self.server.update(table, row_id, changes, undo)
+                count += 1
+        return count
+
+    @staticmethod
+    def _joined(expression: str, alias: str, row: Dict[str, Any], source: Dict[str, Any]) -> Any:
+        """Value of a SET expression made of NOW() and alias.column terms joined by + or ||"""
+        def term(text: str) -> Any:
+            text = text.strip().split('::')[0]
+            if text.upper() == 'NOW()':
+                return datetime.now()
+            table_alias, _, column = text.partition('.')
+            return (row if table_alias == alias else source).get(column)
+
+        if '||' in expression:
+            return ''.join(str(term(piece) or '') for piece in expression.split('||'))
+        if '+' in expression:
+            return sum(term(piece) or 0 for piece in expression.split('+'))
+        return term(expression)
+
+    @staticmethod
+    def _value(token: str, params: List[Any]) -> Any:
+        if token == '%s':
+            return params.pop(0)
+        if token.upper() == 'NOW()':
+            return datetime.now()
+        if token.startswith("'"):
+            return token.strip("'")
+        return _typed(token)
+
+    @staticmethod
+    def _assigned(row: Dict[str, Any], column: str, assignment: str, params: List[Any]) -> Any:
+        """New value for `column = expression`, for the expressions the simulator uses"""
+        expression = assignment.split('=', 1)[1].strip()
+        if expression.upper() == 'NOW()':
+            return datetime.now()
+        if expression == '%s':
+            return params.pop(0)
+        if expression.startswith(f'{column} + %s'):
+            return row.get(column, 0) + params.pop(0)
+        if '||' in expression:
+            pieces = []
+            for piece in expression.split('||'):
+                piece = piece.strip()
+                if piece == '%s':
+                    pieces.append(str(params.pop(0)))
+                elif piece.upper() == 'NOW()':
+                    pieces.append(str(datetime.now()))
+                elif piece.startswith("'"):
+                    pieces.append(piece[1:-1])
+                else:
+                    pieces.append(str(row.get(piece) or ''))
+            return ''.join(pieces)
+        return expression
+
+    def _matching(self, table: FakeTable, where: str, params: List[Any]) -> List[Any]:
+        """Primary keys of the visible rows a WHERE clause selects"""
+        conditions = [condition.strip() for condition in re.split(r'\s+AND\s+', where, flags=re.I)]
+        params = list(params)
+        predicates = []
+        for condition in conditions:
+            match = re.match(r"^(\w+)(?:::text)? (=|<|>=|<=|>) %s$", condition)
+            if match:
+                column, op, value = match.group(1), match.group(2), params.pop(0)
+                predicates.append((column, op, value))
+                continue
+            match = re.match(r"^(\w+)(?:::text)? (NOT )?LIKE '(.*)'$", condition, re.I)
+            if match:
+                # '%%' is how a literal % is written when the statement has parameters
+                column, negate, pattern = match.group(1), bool(match.group(2)), match.group(3).replace('%%', '%')
+                regex = re.compile('^' + re.escape(pattern).replace('%', '.*').replace('_', '.') + '$', re.S)
+                predicates.append((column, 'not like' if negate else 'like', regex))
+                continue
+            raise FakePostgresError(f"Fake backend does not understand condition: {condition}")
+
+        if len(predicates) == 1 and predicates[0][0] == table.pk and predicates[0][1] == '=':
+            row_id = predicates[0][2]
+            row_ids = self._visible(table, [row_id] if row_id in table.rows else [])
+            self._count_read(table, 'idx_tup_fetch', len(row_ids))
+            return row_ids
+
+        # A bounded primary key range is an index range scan, not a full scan
+        candidates = table.rows.keys()
+        counter = 'seq_tup_read'
+        low = [value for column, op, value in predicates if column == table.pk and op == '>']
+        high = [value for column, op, value in predicates if column == table.pk and op == '<=']
+        if low and high and isinstance(low[0], int) and isinstance(high[0], int):
+            candidates = [row_id for row_id in range(low[0] + 1, high[0] + 1) if row_id in table.rows]
+            counter = 'idx_tup_fetch'
+
+        def matches(row: Dict[str, Any]) -> bool:
+            for column, op, value in predicates:
+                current = row.get(column)
+                if op == 'like' and not value.match(str(current)):
+                    return False
+                if op == 'not like' and value.match(str(current)):
+                    return False
+                if op in ('=', '<', '>=', '<=', '>'):
+                    if current is None:
+                        return False
+                    if ((op == '=' and not current == value) or (op == '<' and not current < value)
+                            or (op == '>=' and not current >= value) or (op == '<=' and not current <= value)
+                            or (op == '>' and not current > value)):
+                        return False
+            return True
+
+        candidates = self._visible(table, candidates)
+        self._count_read(table, counter, len(candidates))
+        return [row_id for row_id in candidates if matches(table.rows[row_id])]
+
+
+class FakePostgresCursor:
+    def __init__(self, conn: FakePostgresConnection):
+        self.conn = conn
+        self.rowcount = -1
+        self.rows: List[Tuple] = []
+
+    def execute(self, sql: str, params: Tuple = ()):
+        if self.conn.server.latency:
+            time.sleep(self.conn.server.latency)
+        self.rowcount, self.rows = self.conn.run(sql, tuple(params or ()))
+
+    def executemany(self, sql: str, seq_of_params):
+        if self.conn.server.latency:
+            time.sleep(self.conn.server.latency)
+        total = 0
+        for params in seq_of_params:
+            count, _ = self.conn.run(sql, tuple(params))
+            total += count
+        self.rowcount = total
+        self.rows = []
+
+    def copy_expert(self, sql: str, file, size: int = 8192):
+        """COPY ... FROM STDIN: read `file` in chunks of `size`, one round trip per chunk"""
+        pending, lines = '', []
+        while True:
+            chunk = file.read(size)
+            if not chunk:
+                break
+            if self.conn.server.latency:
+                time.sleep(self.conn.server.latency)
+            pending += chunk.decode() if isinstance(chunk, bytes) else chunk
+            *complete, pending = pending.split('\n')
+            lines.extend(complete)
+        if pending:
+            lines.append(pending)
+        # Like the server, the rows only become visible once the whole COPY succeeds
+        self.rowcount = self.conn.copy_rows(sql, lines)
+        self.rows = []
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        self.rows = []
+
+
+def _typed(value: Optional[str]) -> Any:
+    """Integer, timestamp or text, from a COPY text value"""
+    if value is None or not value or value[0] not in '-0123456789':
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Multi-Process Launcher for the Diagnostic Scenario Simulators
+Spreads worker groups over SIMULATOR_PROCESSES processes with a shared stop event and merged metrics
+"""
+
+import os
+import time
+import shutil
+import logging
+import tempfile
+import multiprocessing
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def process_count() -> int:
+    return max(1, int(os.getenv('SIMULATOR_PROCESSES', '1')))
+
+
+def process_index() -> int:
+    return int(os.getenv('SIMULATOR_PROCESS_INDEX', '0'))
+
+
+def owns(worker_index: int) -> bool:
+    """Whether a worker, numbered across the whole simulator, runs in this process"""
+    return worker_index % process_count() == process_index()
+
+
+def per_process_path(path: str) -> str:
+    """Give each process its own file (traces, logs) when there is more than one"""
+    if not path or process_count() == 1:
+        return path
+    return f"{path}.{process_index()}"
+
+
+def _bootstrap(target: Callable[[Any], None], index: int, count: int, stop_event: Any):
+    os.environ['SIMULATOR_PROCESSES'] = str(count)
+    os.environ['SIMULATOR_PROCESS_INDEX'] = str(index)
+    try:
+        target(stop_event)
+    except KeyboardInterrupt:
+        pass
+
+
+class ProcessLauncher:
+    """Runs `target(stop_event)` in N spawned processes, one share of the workers each.
+
+    Each process learns its index from SIMULATOR_PROCESS_INDEX and keeps the
+    workers `owns()` assigns to it, so worker ids (and their seeds) are the
+    same as in a single-process run. Setting the shared multiprocessing
+    Event stops every process. Processes are spawned rather than forked so
+    prometheus_client is imported fresh with PROMETHEUS_MULTIPROC_DIR set;
+    the launcher then serves the merged metrics of all processes.
+    """
+
+    def __init__(self, target: Callable[[Any], None], processes: Optional[int] = None,
+                 metrics_port: Optional[int] = None, duration: float = 0, name: str = 'simulator'):
+        self.target = target
+        self.processes = processes or process_count()
+        self.metrics_port = metrics_port
+        self.duration = duration
+        self.name = name
+        self.context = multiprocessing.get_context('spawn')
+        self.stop_event = self.context.Event()
+
+    def run(self):
+        """Start the processes and wait for the duration, Ctrl+C or every process to exit"""
+        metrics_dir, created = self.prepare_metrics_dir()
+        workers = [
+            self.context.Process(target=_bootstrap, name=f"{self.name}-{i}",
+                                 args=(self.target, i, self.processes, self.stop_event))
+            for i in range(self.processes)
+        ]
+        for process in workers:
+            process.start()
+        logger.info(f"Started {self.processes} {self.name} processes: {[p.pid for p in workers]}")
+        if self.metrics_port:
+            self.serve_metrics()
+
+        deadline = time.monotonic() + self.duration if self.duration > 0 else None
+        try:
+            while any(process.is_alive() for process in workers):
+                if deadline and time.monotonic() >= deadline:
+                    break
+                self.stop_event.wait(1)
+        except KeyboardInterrupt:
+            logger.info("Received interrupt signal")
+        finally:
+            self.stop_event.set()
+            for process in workers:
+                process.join(timeout=15)
+                if process.is_alive():
+                    logger.warning(f"{process.name} did not stop, terminating it")
+                    process.terminate()
+                    process.join()
+            self.cleanup_metrics(workers, metrics_dir, created)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def prepare_metrics_dir(self):
+        """Point prometheus_client's multiprocess mode at an empty directory"""
+        metrics_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+        if metrics_dir:
+            os.makedirs(metrics_dir, exist_ok=True)
+            for name in os.listdir(metrics_dir):
+                if name.endswith('.db'):
+                    os.remove(os.path.join(metrics_dir, name))
+            return metrics_dir, False
+        metrics_dir = tempfile.mkdtemp(prefix=f"{self.name}-metrics-")
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = metrics_dir
+        return metrics_dir, True
+
+    def serve_metrics(self):
+        from prometheus_client import CollectorRegistry, start_http_server
+        from prometheus_client.multiprocess import MultiProcessCollector
+
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        start_http_server(self.metrics_port, registry=registry)
+        logger.info(f"Aggregated metrics of {self.processes} processes on port {self.metrics_port}")
+
+    def cleanup_metrics(self, workers, metrics_dir: str, created: bool):
+        if self.metrics_port:
+            from prometheus_client import multiprocess
+            for process in workers:
+                multiprocess.mark_process_dead(process.pid)
+        if created:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+            os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
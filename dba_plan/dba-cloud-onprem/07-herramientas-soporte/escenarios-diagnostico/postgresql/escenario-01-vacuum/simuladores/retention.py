@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Batched, Rate-Limited Retention for the VACUUM Problem Simulator
+Deletes expired rows in bounded batches under a pause or WAL budget, or drops expired range partitions
+"""
+
+import re
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+rows_deleted = Counter('postgresql_retention_rows_deleted_total', 'Rows removed by retention',
+                       ['table', 'strategy'])
+batches = Counter('postgresql_retention_batches_total', 'Retention DELETE batches run or partitions dropped',
+                  ['table', 'strategy'])
+throttle_seconds = Counter('postgresql_retention_throttle_seconds_total',
+                           'Time retention slept between batches to stay within its budget', ['table'])
+pending_rows = Gauge('postgresql_retention_pending_rows', 'Expired rows left in the running retention pass',
+                     ['table'], multiprocess_mode='livesum')
+batch_duration = Histogram('postgresql_retention_batch_seconds', 'Duration of one retention batch or partition drop',
+                           ['table', 'strategy'], buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
+
+PARTITIONS_QUERY = """
+    SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    JOIN pg_class p ON p.oid = i.inhparent
+    WHERE p.relname = %s
+"""
+
+# Upper bound of a range partition: FOR VALUES FROM ('...') TO ('...')
+UPPER_BOUND_RE = re.compile(r"TO \('([^']+)'\)")
+# A timestamp or timestamptz bound: '2024-05-01 00:00:00', with fractions and a '+00' or '+05:30' offset
+BOUND_VALUE_RE = re.compile(r'^(\d{4}-\d{2}-\d{2})(?: (\d{2}:\d{2}:\d{2})(\.\d+)?)?(?:([+-])(\d{2})(?::?(\d{2}))?)?$')
+
+
+def parse_bound(text: str) -> datetime:
+    """A partition bound as a naive datetime on the local clock, the clock of datetime.now() cutoffs"""
+    match = BOUND_VALUE_RE.match(text)
+    if not match:
+        raise ValueError(f"Unexpected partition bound: {text}")
+    day, clock, fraction, sign, hours, minutes = match.groups()
+    value = datetime.strptime(f"{day} {clock or '00:00:00'}", '%Y-%m-%d %H:%M:%S')
+    if fraction:
+        value += timedelta(microseconds=round(float(fraction) * 1000000))
+    if sign:
+        offset = timedelta(hours=int(hours), minutes=int(minutes or 0))
+        value = value.replace(tzinfo=timezone(offset if sign == '+' else -offset)).astimezone().replace(tzinfo=None)
+    return value
+
+
+class Retention:
+    """Removes rows of `table` with created_at before a cutoff.
+
+    'single' is one unbounded DELETE in the caller's transaction, the
+    pattern the simulator starts with. 'batched' deletes at most
+    `batch_rows` rows per transaction and sleeps `pause` seconds between
+    batches, longer if the last batch wrote WAL faster than `wal_budget`
+    bytes per second. 'partition' detaches and
+    drops the range partitions of a table partitioned by created_at that
+    lie wholly before the cutoff; it needs a partitioned table and a pure
+    time condition, and falls back to 'batched' otherwise.
+    """
+
+    def __init__(self, strategy: str = 'single', batch_rows: int = 5000, pause: float = 0.5,
+                 wal_budget: float = 0.0):
+        self.strategy = strategy
+        self.batch_rows = batch_rows
+        self.pause = pause
+        self.wal_budget = wal_budget
+
+    def purge(self, conn: Any, cursor: Any, table: str, cutoff: datetime, condition: str = '') -> int:
+        """Delete the expired rows (`condition` narrows them further) and return how many went"""
+        where = 'created_at < %s' + (f' AND {condition}' if condition else '')
+        if self.strategy == 'partition':
+            if condition:
+                logger.warning(f"Retention {table}: '{condition}' cannot be applied by dropping partitions, deleting in batches")
+            elif self.partitioned(cursor, table):
+                return self.drop_partitions(conn, cursor, table, cutoff)
+            else:
+                logger.warning(f"Retention {table}: not partitioned, deleting in batches")
+        elif self.strategy == 'single':
+            started = time.monotonic()
+            cursor.execute(f"DELETE FROM {table} WHERE {where}", (cutoff,))
+            deleted = cursor.rowcount
+            self.record(table, 'single', deleted, time.monotonic() - started)
+            return deleted
+        return self.delete_batches(conn, cursor, table, where, cutoff)
+
+    def delete_batches(self, conn: Any, cursor: Any, table: str, where: str, cutoff: datetime) -> int:
+        cursor.execute(f"SELECT count(*) FROM {table} WHERE {where}", (cutoff,))
+        pending = cursor.fetchone()[0]
+        pending_rows.labels(table=table).set(pending)
+        total = 0
+        while True:
+            started = time.monotonic()
+            if self.wal_budget:
+                cursor.execute("SELECT pg_current_wal_lsn()")
+                start_lsn = cursor.fetchone()[0]
+            # Each batch is its own short transaction: row locks and the dead-tuple spike stay bounded
+            cursor.execute(f"""
+                DELETE FROM {table} WHERE id IN (
+                    SELECT id FROM {table} WHERE {where} LIMIT %s
+                )
+            """, (cutoff, self.batch_rows))
+            deleted = cursor.rowcount
+            conn.commit()
+            elapsed = time.monotonic() - started
+
+            total += deleted
+            pending = max(0, pending - deleted)
+            pending_rows.labels(table=table).set(pending)
+            self.record(table, 'batched', deleted, elapsed)
+            logger.info(f"Retention {table}: deleted {deleted} rows in {elapsed:.2f}s ({total} so far, ~{pending} left)")
+            if deleted < self.batch_rows:
+                break
+
+            pause = self.pause
+            if self.wal_budget:
+                cursor.execute("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), %s)", (start_lsn,))
+                wal_bytes = float(cursor.fetchone()[0])
+                # Sleep long enough that batch plus pause averages out to the budget
+                pause = max(pause, wal_bytes / self.wal_budget - elapsed)
+            if pause > 0:
+                throttle_seconds.labels(table=table).inc(pause)
+                time.sleep(pause)
+        return total
+
+    def partitioned(self, cursor: Any, table: str) -> bool:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", (table,))
+        row = cursor.fetchone()
+        return bool(row) and row[0] == 'p'
+
+    def expired_partitions(self, cursor: Any, table: str, cutoff: datetime) -> List[Tuple[str, datetime]]:
+        cursor.execute(PARTITIONS_QUERY, (table,))
+        expired = []
+        for name, bound in cursor.fetchall():
+            match = UPPER_BOUND_RE.search(bound or '')
+            if not match:
+                continue  # DEFAULT or MAXVALUE partitions never expire
+            upper = parse_bound(match.group(1))
+            if upper <= cutoff:
+                expired.append((name, upper))
+        return sorted(expired, key=lambda partition: partition[1])
+
+    def drop_partitions(self, conn: Any, cursor: Any, table: str, cutoff: datetime) -> int:
+        """Detach and drop whole expired partitions: no dead tuples, no VACUUM afterwards"""
+        total = 0
+        partitions = self.expired_partitions(cursor, table, cutoff)
+        pending_rows.labels(table=table).set(0)
+        for name, upper in partitions:
+            started = time.monotonic()
+            cursor.execute(f"SELECT count(*) FROM {name}")
+            rows = cursor.fetchone()[0]
+            cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+            cursor.execute(f"DROP TABLE {name}")
+            conn.commit()
+            total += rows
+            self.record(table, 'partition', rows, time.monotonic() - started)
+            logger.info(f"Retention {table}: dropped partition {name} (< {upper}) with {rows} rows")
+        return total
+
+    def record(self, table: str, strategy: str, deleted: int, elapsed: float):
+        rows_deleted.labels(table=table, strategy=strategy).inc(deleted)
+        batches.labels(table=table, strategy=strategy).inc()
+        batch_duration.labels(table=table, strategy=strategy).observe(elapsed)
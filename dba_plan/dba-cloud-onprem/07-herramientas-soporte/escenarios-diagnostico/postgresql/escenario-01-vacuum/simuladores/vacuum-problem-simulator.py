@@ -4,14 +4,28 @@ Simulador de Problemas de VACUUM para PostgreSQL
 Genera patrones de carga que causan bloat y problemas de performance
 """
 
-import psycopg2
+try:
+    import psycopg2
+except ImportError:  # Solo necesario con DB_DRIVER=postgres
+    psycopg2 = None
 import threading
 import time
 import random
 import logging
 import os
+import resource
 from datetime import datetime, timedelta
 
+from prometheus_client import start_http_server
+
+from bloat_sampler import BloatSampler
+from copy_stream import CopyStream
+from fake_postgres import DatabaseError, FakePostgresServer
+from retention import Retention
+from process_launcher import ProcessLauncher, owns, per_process_path, process_count, process_index
+from workload_trace import OperationSeeds, TraceWriter
+from trace_replay import TraceReplayer, load_transactions
+
 # Configuración de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -38,273 +52,621 @@ class VacuumProblemSimulator:
         self.delete_frequency = int(os.getenv('DELETE_FREQUENCY', 3600))
         self.concurrent_sessions = int(os.getenv('CONCURRENT_SESSIONS', 50))
         
+        # Carga del ETL: 'executemany' (lista completa en memoria) o 'copy' (COPY FROM STDIN en streaming)
+        self.etl_insert_mode = os.getenv('ETL_INSERT_MODE', 'executemany')
+        self.etl_copy_chunk_bytes = int(os.getenv('ETL_COPY_CHUNK_BYTES', 65536))
+        
+        # Enriquecimiento del ETL: 'like' (re-escanea las filas recientes con NOT LIKE) o 'watermark'
+        # (solo el rango de ids que cargó el propio batch, marcado antes y después de la carga,
+        # en chunks de ETL_ENRICH_CHUNK_SIZE ids)
+        self.etl_enrich_mode = os.getenv('ETL_ENRICH_MODE', 'like')
+        self.etl_enrich_chunk_size = int(os.getenv('ETL_ENRICH_CHUNK_SIZE', 5000))
+        
+        # Retención de events y analytics_cache: 'single' (un DELETE sin límite), 'batched' (lotes de
+        # RETENTION_BATCH_ROWS con pausa y presupuesto de WAL en bytes/s) o 'partition' (DROP de particiones)
+        self.retention = Retention(
+            strategy=os.getenv('RETENTION_STRATEGY', 'single'),
+            batch_rows=int(os.getenv('RETENTION_BATCH_ROWS', 5000)),
+            pause=float(os.getenv('RETENTION_PAUSE', 0.5)),
+            wal_budget=float(os.getenv('RETENTION_WAL_BUDGET', 0))
+        )
+        
+        # Refresco de cache: 'delete_insert' (DELETE + executemany), 'copy' (DELETE + COPY)
+        # o 'swap' (carga en tabla staging y RENAME, sin dead tuples en analytics_cache)
+        self.cache_refresh_mode = os.getenv('CACHE_REFRESH_MODE', 'delete_insert')
+        self.cache_copy_chunk_bytes = int(os.getenv('CACHE_COPY_CHUNK_BYTES', 65536))
+        self.copy_buffers = threading.local()
+        
+        # Sesiones: 'per_row' (un UPDATE por sesión), 'values' (UPDATE ... FROM VALUES) o 'unnest' (arrays);
+        # SESSION_HOT_FRIENDLY baja el fillfactor y reemplaza session_data en vez de concatenar,
+        # para que la nueva versión quepa en la misma página (HOT)
+        self.session_update_mode = os.getenv('SESSION_UPDATE_MODE', 'per_row')
+        self.session_hot_friendly = os.getenv('SESSION_HOT_FRIENDLY', 'false').lower() == 'true'
+        self.session_fillfactor = int(os.getenv('SESSION_FILLFACTOR', 70))
+        self.fillfactor_applied = False
+        
+        # Auditoría: filas por INSERT y por COMMIT (1 y 1 = autocommit fila a fila, el patrón original)
+        # y synchronous_commit=off opcional para no esperar el flush del WAL en cada COMMIT
+        self.audit_rows_per_statement = max(1, int(os.getenv('AUDIT_ROWS_PER_STATEMENT', 1)))
+        self.audit_rows_per_commit = max(1, int(os.getenv('AUDIT_ROWS_PER_COMMIT', 1)))
+        self.audit_async_commit = os.getenv('AUDIT_ASYNC_COMMIT', 'false').lower() == 'true'
+        
+        # Telemetría de bloat: muestreo de pg_stat_user_tables cada BLOAT_SAMPLE_INTERVAL segundos (0 la desactiva)
+        self.bloat_sample_interval = float(os.getenv('BLOAT_SAMPLE_INTERVAL', 15))
+        self.bloat_sample_window = int(os.getenv('BLOAT_SAMPLE_WINDOW', 40))
+        self.metrics_port = int(os.getenv('METRICS_PORT', 8000))
+        self.sampler = None
+        
+        # Tipos de worker a arrancar (p. ej. WORKER_TYPES=audit_log como carga de WAL para escenario-05-wal)
+        self.worker_types = [t.strip() for t in os.getenv('WORKER_TYPES', 'etl,session_updater,cache_manager,audit_log').split(',')]
+        
+        # DB_DRIVER=fake usa un backend en memoria que contabiliza dead tuples (sin docker-compose)
+        self.fake_server = None
+        if os.getenv('DB_DRIVER', 'postgres') == 'fake':
+            self.fake_server = FakePostgresServer(latency=float(os.getenv('FAKE_LATENCY', 0.001)))
+        
+        # Semilla por worker y traza de operaciones (SIMULATION_SEED, TRACE_FILE) para poder reproducir la carga
+        seed = int(os.environ['SIMULATION_SEED']) if os.getenv('SIMULATION_SEED') else None
+        trace_file = per_process_path(os.getenv('TRACE_FILE', ''))
+        self.seeds = OperationSeeds(seed, TraceWriter(trace_file, seed) if trace_file else None)
+        
+        # Replay de una traza grabada (REPLAY_SPEED=0 la reproduce lo más rápido posible)
+        self.replay_file = os.getenv('REPLAY_FILE', '')
+        self.replay_speed = float(os.getenv('REPLAY_SPEED', 1))
+        self.replay_parallelism = int(os.getenv('REPLAY_PARALLELISM', 0))
+        
         self.running = True
         
     def get_connection(self):
         """Obtiene conexión a PostgreSQL"""
+        if self.fake_server:
+            return self.fake_server.connect()
         return psycopg2.connect(**self.db_config)
     
+    def run_operation(self, worker_type, worker_id, operation, rng):
+        """Ejecuta una operación con su propio RNG sembrado y registra inicio y resultado en la traza"""
+        op_rng = self.seeds.begin(worker_type, worker_id, rng)
+        outcome = operation(worker_id, op_rng)
+        self.seeds.end(worker_type, worker_id, outcome)
+        return outcome
+    
     def etl_process(self, worker_id):
         """Simula proceso ETL que causa bloat masivo"""
+        rng = self.seeds.worker('etl', worker_id)
         while self.running:
-            try:
-                conn = self.get_connection()
-                conn.autocommit = False
-                cursor = conn.cursor()
-                
-                logging.info(f"ETL {worker_id}: Iniciando batch de {self.etl_batch_size} registros")
-                
-                # PATRÓN PROBLEMÁTICO: INSERT masivo seguido de UPDATE masivo
-                # Esto causa que las páginas se llenen y luego se fragmenten
-                
-                # 1. INSERT masivo de eventos
-                events_data = []
-                for i in range(self.etl_batch_size):
-                    events_data.append((
-                        random.randint(1, 10000),  # user_id
-                        f'event_type_{random.randint(1, 20)}',
-                        f'{{"data": "value_{random.randint(1, 1000)}"}}',
-                        datetime.now() - timedelta(minutes=random.randint(0, 1440))
-                    ))
-                
-                cursor.executemany("""
-                    INSERT INTO events (user_id, event_type, event_data, created_at)
-                    VALUES (%s, %s, %s, %s)
-                """, events_data)
-                
-                conn.commit()
-                logging.info(f"ETL {worker_id}: Insertados {self.etl_batch_size} eventos")
-                
-                # 2. UPDATE masivo que causa fragmentación
-                # Simular enriquecimiento de datos
-                time.sleep(random.uniform(1, 3))  # Simular procesamiento
-                
+            self.run_operation('etl', worker_id, self.etl_batch, rng)
+            
+            # Pausa entre batches ETL
+            time.sleep(rng.uniform(300, 600))  # 5-10 minutos
+    
+    def etl_batch(self, worker_id, rng):
+        """Un batch ETL: INSERT masivo, UPDATE de enriquecimiento y DELETE de temporales"""
+        conn = cursor = None
+        try:
+            conn = self.get_connection()
+            conn.autocommit = False
+            cursor = conn.cursor()
+            
+            logging.info(f"ETL {worker_id}: Iniciando batch de {self.etl_batch_size} registros")
+            
+            # PATRÓN PROBLEMÁTICO: INSERT masivo seguido de UPDATE masivo
+            # Esto causa que las páginas se llenen y luego se fragmenten
+            
+            # 1. INSERT masivo de eventos
+            if self.etl_enrich_mode == 'watermark':
+                # Marca baja: los ids de este batch salen de la secuencia después de todo id ya confirmado
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM events")
+                low_id = cursor.fetchone()[0]
+            self.load_events(cursor, worker_id, rng)
+            if self.etl_enrich_mode == 'watermark':
+                # Marca alta, antes del commit: la transacción ya ve sus propias filas
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM events")
+                high_id = cursor.fetchone()[0]
+            
+            conn.commit()
+            logging.info(f"ETL {worker_id}: Insertados {self.etl_batch_size} eventos")
+            
+            # 2. UPDATE masivo que causa fragmentación
+            # Simular enriquecimiento de datos
+            time.sleep(rng.uniform(1, 3))  # Simular procesamiento
+            
+            if self.etl_enrich_mode == 'watermark':
+                updated_rows = self.enrich_incremental(conn, cursor, worker_id, low_id, high_id)
+            else:
+                cutoff = datetime.now() - timedelta(minutes=30)
+                # Filas que lee el propio UPDATE: recorre y castea a texto todas las recientes
+                read_before = self.rows_read(cursor)
                 cursor.execute("""
                     UPDATE events 
                     SET event_data = event_data || '{"processed": true, "timestamp": "' || NOW() || '"}'
                     WHERE created_at >= %s
-                    AND event_data::text NOT LIKE '%processed%'
-                """, (datetime.now() - timedelta(minutes=30),))
+                    AND event_data::text NOT LIKE '%%processed%%'
+                """, (cutoff,))
                 
                 updated_rows = cursor.rowcount
+                scanned_rows = self.rows_read(cursor) - read_before
                 conn.commit()
-                logging.info(f"ETL {worker_id}: Actualizados {updated_rows} eventos")
-                
-                # 3. DELETE de datos antiguos (causa más fragmentación)
-                cursor.execute("""
-                    DELETE FROM events 
-                    WHERE created_at < %s
-                    AND event_type LIKE 'temp_%'
-                """, (datetime.now() - timedelta(days=1),))
-                
-                deleted_rows = cursor.rowcount
-                conn.commit()
-                logging.info(f"ETL {worker_id}: Eliminados {deleted_rows} eventos temporales")
-                
-                cursor.close()
-                conn.close()
-                
-            except psycopg2.Error as e:
-                logging.error(f"ETL {worker_id}: Error DB - {e}")
-                try:
-                    conn.rollback()
-                    cursor.close()
-                    conn.close()
-                except:
-                    pass
+                logging.info(f"ETL {worker_id}: Enriquecimiento LIKE - {scanned_rows} filas examinadas, {updated_rows} actualizadas")
+            logging.info(f"ETL {worker_id}: Actualizados {updated_rows} eventos")
             
-            # Pausa entre batches ETL
-            time.sleep(random.uniform(300, 600))  # 5-10 minutos
+            # 3. DELETE de datos antiguos (causa más fragmentación)
+            deleted_rows = self.retention.purge(
+                conn, cursor, 'events', datetime.now() - timedelta(days=1),
+                condition="event_type LIKE 'temp_%%'"
+            )
+            conn.commit()
+            logging.info(f"ETL {worker_id}: Eliminados {deleted_rows} eventos temporales")
+            return 'success'
+            
+        except DatabaseError as e:
+            logging.error(f"ETL {worker_id}: Error DB - {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+            return 'error'
+        finally:
+            self.close_quietly(conn, cursor)
+    
+    def enrich_incremental(self, conn, cursor, worker_id, low_id, high_id):
+        """Enriquece solo el rango de ids (low_id, high_id] que cargó este batch, en chunks acotados.
+        
+        Una marca global (MAX(id) confirmado) saltaría las filas de otro ETL que aún no hizo commit;
+        el rango propio las deja para su batch. Si el rango incluye filas de otro ETL ya confirmadas,
+        la condición NOT LIKE (acotada al chunk) evita enriquecerlas dos veces.
+        """
+        cutoff = datetime.now() - timedelta(minutes=30)
+        updated_total = 0
+        low = low_id
+        while low < high_id:
+            upper = min(low + self.etl_enrich_chunk_size, high_id)
+            
+            # Rango de la PK: el cast a texto solo se evalúa sobre las filas del chunk
+            read_before = self.rows_read(cursor)
+            cursor.execute("""
+                UPDATE events 
+                SET event_data = event_data || '{"processed": true, "timestamp": "' || NOW() || '"}'
+                WHERE id > %s AND id <= %s
+                AND created_at >= %s
+                AND event_data::text NOT LIKE '%%processed%%'
+            """, (low, upper, cutoff))
+            updated = cursor.rowcount
+            scanned = self.rows_read(cursor) - read_before
+            conn.commit()
+            updated_total += updated
+            logging.info(f"ETL {worker_id}: Chunk de ids ({low}, {upper}] - {scanned} filas examinadas, {updated} actualizadas")
+            low = upper
+        return updated_total
+    
+    def rows_read(self, cursor):
+        """Filas de events leídas por la transacción en curso (secuenciales + vía índice), sin escanear nada"""
+        cursor.execute("SELECT seq_tup_read, idx_tup_fetch FROM pg_stat_xact_user_tables WHERE relname = %s",
+                       ('events',))
+        row = cursor.fetchone()
+        return sum(value or 0 for value in row) if row else 0
+    
+    def generate_events(self, rng, count):
+        """Genera las filas de eventos de una en una (mismo orden de sorteos en ambos modos)"""
+        for _ in range(count):
+            yield (
+                rng.randint(1, 10000),  # user_id
+                f'event_type_{rng.randint(1, 20)}',
+                f'{{"data": "value_{rng.randint(1, 1000)}"}}',
+                datetime.now() - timedelta(minutes=rng.randint(0, 1440))
+            )
+    
+    def load_events(self, cursor, worker_id, rng):
+        """Inserta el batch ETL y reporta memoria pico y tiempo hasta la primera fila enviada"""
+        started = time.monotonic()
+        if self.etl_insert_mode == 'copy':
+            # Las filas se generan a medida que COPY lee chunks acotados: memoria constante
+            stream = CopyStream(self.generate_events(rng, self.etl_batch_size))
+            cursor.copy_expert(
+                "COPY events (user_id, event_type, event_data, created_at) FROM STDIN",
+                stream, size=self.etl_copy_chunk_bytes
+            )
+            first_row = stream.first_row_latency or 0.0
+            buffered = f"buffer pico {stream.peak_buffer / 1024:.0f} KB en {stream.chunks} chunks"
+        else:
+            events_data = list(self.generate_events(rng, self.etl_batch_size))
+            # Nada sale hacia PostgreSQL hasta que la lista completa está construida
+            first_row = time.monotonic() - started
+            cursor.executemany("""
+                INSERT INTO events (user_id, event_type, event_data, created_at)
+                VALUES (%s, %s, %s, %s)
+            """, events_data)
+            buffered = f"lista de {len(events_data)} filas en memoria"
+        
+        # ru_maxrss está en KB en Linux y es el pico de todo el proceso
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        logging.info(
+            f"ETL {worker_id}: Carga {self.etl_insert_mode} en {time.monotonic() - started:.2f}s - "
+            f"primera fila a los {first_row * 1000:.0f} ms, {buffered}, RSS pico del proceso {peak_rss_mb:.0f} MB"
+        )
     
     def session_updater_process(self, worker_id):
         """Simula actualizaciones frecuentes de sesiones (causa bloat)"""
+        rng = self.seeds.worker('session_updater', worker_id)
         while self.running:
-            try:
-                conn = self.get_connection()
-                conn.autocommit = False
-                cursor = conn.cursor()
-                
-                # PATRÓN PROBLEMÁTICO: UPDATEs muy frecuentes en las mismas filas
-                # Esto causa que PostgreSQL mantenga múltiples versiones (bloat)
-                
-                # Seleccionar sesiones activas para actualizar
-                active_sessions = random.sample(range(1, 10001), 
-                                               min(100, self.concurrent_sessions))
-                
-                for session_id in active_sessions:
+            self.run_operation('session_updater', worker_id, self.update_sessions, rng)
+            
+            # Actualizar cada 30 segundos (muy frecuente)
+            time.sleep(self.update_frequency)
+    
+    def update_sessions(self, worker_id, rng):
+        """Una ronda de UPDATEs sobre sesiones activas"""
+        conn = cursor = None
+        try:
+            conn = self.get_connection()
+            conn.autocommit = False
+            cursor = conn.cursor()
+            
+            if self.session_hot_friendly and not self.fillfactor_applied:
+                # Deja espacio libre en cada página para las nuevas versiones (afecta a páginas nuevas o reescritas)
+                cursor.execute(f"ALTER TABLE user_sessions SET (fillfactor = {self.session_fillfactor})")
+                conn.commit()
+                self.fillfactor_applied = True
+            
+            # PATRÓN PROBLEMÁTICO: UPDATEs muy frecuentes en las mismas filas
+            # Esto causa que PostgreSQL mantenga múltiples versiones (bloat)
+            
+            # Seleccionar sesiones activas para actualizar
+            active_sessions = rng.sample(range(1, 10001), 
+                                         min(100, self.concurrent_sessions))
+            updates = [(
+                session_id,
+                rng.randint(1, 5),
+                f'{{"last_page": "page_{rng.randint(1, 100)}", "timestamp": "{datetime.now()}"}}'
+            ) for session_id in active_sessions]
+            
+            started = time.monotonic()
+            if self.session_update_mode in ('values', 'unnest'):
+                self.update_sessions_set_based(cursor, updates)
+            else:
+                new_data = '%s' if self.session_hot_friendly else 'session_data || %s'
+                for session_id, views, data in updates:
                     # UPDATE que cambia datos frecuentemente
-                    cursor.execute("""
+                    cursor.execute(f"""
                         UPDATE user_sessions 
                         SET 
                             last_activity = NOW(),
                             page_views = page_views + %s,
-                            session_data = session_data || %s
+                            session_data = {new_data}
                         WHERE session_id = %s
-                    """, (
-                        random.randint(1, 5),
-                        f'{{"last_page": "page_{random.randint(1, 100)}", "timestamp": "{datetime.now()}"}}',
-                        session_id
-                    ))
-                
-                conn.commit()
-                logging.info(f"SessionUpdater {worker_id}: Actualizadas {len(active_sessions)} sesiones")
-                
-                cursor.close()
-                conn.close()
-                
-            except psycopg2.Error as e:
-                logging.error(f"SessionUpdater {worker_id}: Error DB - {e}")
-                try:
-                    conn.rollback()
-                    cursor.close()
-                    conn.close()
-                except:
-                    pass
+                    """, (views, data, session_id))
             
-            # Actualizar cada 30 segundos (muy frecuente)
-            time.sleep(self.update_frequency)
+            conn.commit()
+            elapsed = time.monotonic() - started
+            
+            cursor.execute("""
+                SELECT n_tup_upd, n_tup_hot_upd FROM pg_stat_user_tables
+                WHERE relname = %s
+            """, ('user_sessions',))
+            row = cursor.fetchone()
+            updated, hot = row if row else (0, 0)
+            logging.info(
+                f"SessionUpdater {worker_id}: Actualizadas {len(active_sessions)} sesiones "
+                f"({self.session_update_mode}{', HOT-friendly' if self.session_hot_friendly else ''}) "
+                f"en {elapsed * 1000:.0f} ms - ratio HOT {hot / updated if updated else 0:.1%} ({hot}/{updated})"
+            )
+            return 'success'
+            
+        except DatabaseError as e:
+            logging.error(f"SessionUpdater {worker_id}: Error DB - {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+            return 'error'
+        finally:
+            self.close_quietly(conn, cursor)
+    
+    def update_sessions_set_based(self, cursor, updates):
+        """Actualiza todo el batch de sesiones con un único UPDATE"""
+        new_data = 'v.data::jsonb' if self.session_hot_friendly else 's.session_data || v.data::jsonb'
+        if self.session_update_mode == 'unnest':
+            # Tres arrays como parámetros: el texto del statement no crece con el batch
+            source = "unnest(%s::int[], %s::int[], %s::text[])"
+            params = [list(column) for column in zip(*updates)]
+        else:
+            source = "(VALUES " + ", ".join(["(%s, %s, %s)"] * len(updates)) + ")"
+            params = [value for update in updates for value in update]
+        cursor.execute(f"""
+            UPDATE user_sessions AS s
+            SET
+                last_activity = NOW(),
+                page_views = s.page_views + v.views,
+                session_data = {new_data}
+            FROM {source} AS v(session_id, views, data)
+            WHERE s.session_id = v.session_id
+        """, params)
     
     def cache_manager_process(self, worker_id):
         """Simula gestión de cache que causa bloat extremo"""
+        rng = self.seeds.worker('cache_manager', worker_id)
         while self.running:
-            try:
-                conn = self.get_connection()
-                conn.autocommit = False
-                cursor = conn.cursor()
-                
-                logging.info(f"CacheManager {worker_id}: Iniciando limpieza de cache")
-                
+            self.run_operation('cache_manager', worker_id, self.refresh_cache, rng)
+            
+            # Limpieza cada 2 horas
+            time.sleep(7200)
+    
+    def refresh_cache(self, worker_id, rng):
+        """Una limpieza de cache: DELETE masivo seguido de INSERT masivo (o swap de tablas)"""
+        conn = cursor = None
+        try:
+            conn = self.get_connection()
+            conn.autocommit = False
+            cursor = conn.cursor()
+            
+            logging.info(f"CacheManager {worker_id}: Iniciando limpieza de cache ({self.cache_refresh_mode})")
+            started = time.monotonic()
+            expires = datetime.now() - timedelta(hours=6)
+            cache_rows = self.generate_cache_rows(rng, rng.randint(10000, 50000))
+            
+            if self.cache_refresh_mode == 'swap':
+                inserted = self.swap_cache(conn, cursor, worker_id, cache_rows, expires)
+            else:
                 # PATRÓN MUY PROBLEMÁTICO: DELETE + INSERT masivo
                 # Esto causa fragmentación extrema
                 
                 # 1. DELETE masivo de cache antiguo
-                cursor.execute("""
-                    DELETE FROM analytics_cache 
-                    WHERE created_at < %s
-                """, (datetime.now() - timedelta(hours=6),))
-                
-                deleted_rows = cursor.rowcount
+                # (con RETENTION_STRATEGY=batched o partition el borrado se confirma antes del INSERT)
+                deleted_rows = self.retention.purge(conn, cursor, 'analytics_cache', expires)
                 logging.info(f"CacheManager {worker_id}: Eliminadas {deleted_rows} entradas de cache")
                 
                 # 2. INSERT masivo de nuevo cache
-                cache_data = []
-                for i in range(random.randint(10000, 50000)):
-                    cache_data.append((
-                        f'metric_{random.randint(1, 1000)}',
-                        f'dimension_{random.randint(1, 100)}',
-                        random.uniform(0, 10000),
-                        f'{{"calculation": "complex_aggregation_{i}", "metadata": "data_{random.randint(1, 1000)}"}}',
-                        datetime.now()
-                    ))
-                
-                cursor.executemany("""
-                    INSERT INTO analytics_cache (metric_name, dimension, value, metadata, created_at)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, cache_data)
+                if self.cache_refresh_mode == 'copy':
+                    inserted = self.copy_cache_rows(cursor, 'analytics_cache', cache_rows)
+                else:
+                    cache_data = list(cache_rows)
+                    cursor.executemany("""
+                        INSERT INTO analytics_cache (metric_name, dimension, value, metadata, created_at)
+                        VALUES (%s, %s, %s, %s, %s)
+                    """, cache_data)
+                    inserted = len(cache_data)
                 
                 conn.commit()
-                logging.info(f"CacheManager {worker_id}: Insertadas {len(cache_data)} nuevas entradas de cache")
-                
-                cursor.close()
-                conn.close()
-                
-            except psycopg2.Error as e:
-                logging.error(f"CacheManager {worker_id}: Error DB - {e}")
-                try:
-                    conn.rollback()
-                    cursor.close()
-                    conn.close()
-                except:
-                    pass
             
-            # Limpieza cada 2 horas
-            time.sleep(7200)
+            logging.info(f"CacheManager {worker_id}: Insertadas {inserted} nuevas entradas de cache")
+            self.log_cache_bloat(cursor, worker_id, time.monotonic() - started)
+            return 'success'
+            
+        except DatabaseError as e:
+            logging.error(f"CacheManager {worker_id}: Error DB - {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+            return 'error'
+        finally:
+            self.close_quietly(conn, cursor)
+    
+    def generate_cache_rows(self, rng, count):
+        """Genera las entradas de cache de una en una"""
+        for i in range(count):
+            yield (
+                f'metric_{rng.randint(1, 1000)}',
+                f'dimension_{rng.randint(1, 100)}',
+                rng.uniform(0, 10000),
+                f'{{"calculation": "complex_aggregation_{i}", "metadata": "data_{rng.randint(1, 1000)}"}}',
+                datetime.now()
+            )
+    
+    def copy_cache_rows(self, cursor, table, cache_rows):
+        """COPY FROM STDIN reutilizando el buffer del thread entre refrescos"""
+        stream = getattr(self.copy_buffers, 'stream', None)
+        if stream is None:
+            stream = self.copy_buffers.stream = CopyStream()
+        stream.reset(cache_rows)
+        cursor.copy_expert(
+            f"COPY {table} (metric_name, dimension, value, metadata, created_at) FROM STDIN",
+            stream, size=self.cache_copy_chunk_bytes
+        )
+        return stream.row_count
+    
+    def swap_cache(self, conn, cursor, worker_id, cache_rows, expires):
+        """Construye la cache nueva en una tabla staging y la intercambia con RENAME.
+        
+        Las filas vigentes se copian a la staging, así que el contenido final es el
+        mismo que con DELETE + INSERT, pero sin dead tuples: la tabla vieja se borra entera.
+        """
+        cursor.execute("DROP TABLE IF EXISTS analytics_cache_staging")
+        cursor.execute("CREATE TABLE analytics_cache_staging (LIKE analytics_cache INCLUDING DEFAULTS INCLUDING INDEXES)")
+        cursor.execute("""
+            INSERT INTO analytics_cache_staging SELECT * FROM analytics_cache
+            WHERE created_at >= %s
+        """, (expires,))
+        kept_rows = cursor.rowcount
+        inserted = self.copy_cache_rows(cursor, 'analytics_cache_staging', cache_rows)
+        conn.commit()
+        logging.info(f"CacheManager {worker_id}: Staging cargada ({kept_rows} vigentes + {inserted} nuevas)")
+        
+        # El swap solo toma ACCESS EXCLUSIVE durante los RENAME, no durante la carga
+        cursor.execute("ALTER TABLE analytics_cache RENAME TO analytics_cache_old")
+        cursor.execute("ALTER TABLE analytics_cache_staging RENAME TO analytics_cache")
+        # La secuencia del id pertenece a la tabla vieja: pasarla a la nueva antes del DROP
+        cursor.execute("ALTER SEQUENCE IF EXISTS analytics_cache_id_seq OWNED BY analytics_cache.id")
+        cursor.execute("DROP TABLE analytics_cache_old")
+        conn.commit()
+        return inserted
+    
+    def log_cache_bloat(self, cursor, worker_id, elapsed):
+        """Latencia del refresco y tuplas vivas/muertas de analytics_cache, para comparar estrategias"""
+        cursor.execute("""
+            SELECT n_live_tup, n_dead_tup FROM pg_stat_user_tables
+            WHERE relname = %s
+        """, ('analytics_cache',))
+        row = cursor.fetchone()
+        live, dead = row if row else (0, 0)
+        logging.info(
+            f"CacheManager {worker_id}: Refresco {self.cache_refresh_mode} en {elapsed:.2f}s - "
+            f"analytics_cache con {live} tuplas vivas y {dead} muertas"
+        )
     
     def audit_log_process(self, worker_id):
         """Simula logs de auditoría (solo INSERT, pero volumen alto)"""
+        rng = self.seeds.worker('audit_log', worker_id)
         while self.running:
-            try:
-                conn = self.get_connection()
-                conn.autocommit = True  # Autocommit para logs
-                cursor = conn.cursor()
-                
-                # INSERT continuo de logs (causa crecimiento constante)
-                for _ in range(random.randint(100, 500)):
-                    cursor.execute("""
-                        INSERT INTO audit_logs (user_id, action, table_name, record_id, changes, created_at)
-                        VALUES (%s, %s, %s, %s, %s, NOW())
-                    """, (
-                        random.randint(1, 10000),
-                        random.choice(['SELECT', 'INSERT', 'UPDATE', 'DELETE']),
-                        random.choice(['events', 'user_sessions', 'analytics_cache']),
-                        random.randint(1, 1000000),
-                        f'{{"old": "value_{random.randint(1, 1000)}", "new": "value_{random.randint(1, 1000)}"}}'
-                    ))
-                
-                logging.info(f"AuditLog {worker_id}: Insertados logs de auditoría")
-                
-                cursor.close()
-                conn.close()
-                
-            except psycopg2.Error as e:
-                logging.error(f"AuditLog {worker_id}: Error DB - {e}")
-                try:
-                    cursor.close()
-                    conn.close()
-                except:
-                    pass
+            self.run_operation('audit_log', worker_id, self.write_audit_logs, rng)
             
             # Logs cada 10 segundos
             time.sleep(10)
     
-    def start_simulation(self):
-        """Inicia la simulación de problemas de VACUUM"""
-        logging.info("Iniciando simulación de problemas de VACUUM...")
+    def write_audit_logs(self, worker_id, rng):
+        """Una ráfaga de INSERTs de auditoría, fila a fila en autocommit o agrupados en batches"""
+        conn = cursor = None
+        try:
+            conn = self.get_connection()
+            # Autocommit para logs, salvo que se agrupen varias filas por COMMIT
+            conn.autocommit = self.audit_rows_per_commit == 1
+            cursor = conn.cursor()
+            if self.audit_async_commit:
+                cursor.execute("SET synchronous_commit = off")
+            
+            cursor.execute("SELECT pg_current_wal_lsn()")
+            start_lsn = cursor.fetchone()[0]
+            started = time.monotonic()
+            
+            # INSERT continuo de logs (causa crecimiento constante)
+            rows = self.generate_audit_rows(rng, rng.randint(100, 500))
+            uncommitted = total = 0
+            while True:
+                batch = [row for _, row in zip(range(self.audit_rows_per_statement), rows)]
+                if not batch:
+                    break
+                placeholders = ", ".join(["(%s, %s, %s, %s, %s, NOW())"] * len(batch))
+                cursor.execute(f"""
+                    INSERT INTO audit_logs (user_id, action, table_name, record_id, changes, created_at)
+                    VALUES {placeholders}
+                """, [value for row in batch for value in row])
+                total += len(batch)
+                uncommitted += len(batch)
+                if not conn.autocommit and uncommitted >= self.audit_rows_per_commit:
+                    conn.commit()
+                    uncommitted = 0
+            if not conn.autocommit:
+                conn.commit()
+            elapsed = time.monotonic() - started
+            
+            # Incluye el WAL de los demás workers que escriban en paralelo
+            cursor.execute("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), %s)", (start_lsn,))
+            wal_bytes = float(cursor.fetchone()[0])
+            logging.info(
+                f"AuditLog {worker_id}: Insertados {total} logs de auditoría "
+                f"({self.audit_rows_per_statement} filas/INSERT, {self.audit_rows_per_commit} filas/COMMIT"
+                f"{', commit asíncrono' if self.audit_async_commit else ''}) - "
+                f"{total / elapsed if elapsed else 0:.0f} inserts/s, {wal_bytes / total:.0f} bytes de WAL por fila"
+            )
+            return 'success'
+            
+        except DatabaseError as e:
+            logging.error(f"AuditLog {worker_id}: Error DB - {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+            return 'error'
+        finally:
+            self.close_quietly(conn, cursor)
+    
+    def generate_audit_rows(self, rng, count):
+        """Genera las filas de auditoría de una en una"""
+        for _ in range(count):
+            yield (
+                rng.randint(1, 10000),
+                rng.choice(['SELECT', 'INSERT', 'UPDATE', 'DELETE']),
+                rng.choice(['events', 'user_sessions', 'analytics_cache']),
+                rng.randint(1, 1000000),
+                f'{{"old": "value_{rng.randint(1, 1000)}", "new": "value_{rng.randint(1, 1000)}"}}'
+            )
+    
+    def close_quietly(self, conn, cursor):
+        """Cierra cursor y conexión ignorando errores"""
+        try:
+            if cursor:
+                cursor.close()
+            if conn:
+                conn.close()
+        except:
+            pass
+    
+    def replay(self):
+        """Reproduce una traza grabada regenerando cada operación desde su semilla"""
+        operations = {
+            'etl': self.etl_batch,
+            'session_updater': self.update_sessions,
+            'cache_manager': self.refresh_cache,
+            'audit_log': self.write_audit_logs
+        }
+        transactions = load_transactions(self.replay_file, list(operations))
+        logging.info(f"Replay de {len(transactions)} operaciones desde {self.replay_file}")
+        replayer = TraceReplayer(
+            transactions,
+            lambda tx: operations[tx.worker_type](tx.worker_id, random.Random(tx.seed)),
+            speed=self.replay_speed,
+            parallelism=self.replay_parallelism
+        )
+        logging.info(f"Replay terminado: {replayer.run()}")
+    
+    def start_workers(self):
+        """Arranca los workers que le tocan a este proceso (todos si SIMULATOR_PROCESSES=1)"""
+        workers = (
+            # ETL (causan bloat masivo)
+            [('etl', self.etl_process, i, f"ETL-{i}") for i in range(2)] +
+            # Actualización de sesiones (bloat por UPDATEs frecuentes)
+            [('session_updater', self.session_updater_process, i, f"SessionUpdater-{i}") for i in range(3)] +
+            # Gestión de cache (bloat extremo)
+            [('cache_manager', self.cache_manager_process, 0, "CacheManager-0")] +
+            # Logs de auditoría (crecimiento constante)
+            [('audit_log', self.audit_log_process, i, f"AuditLog-{i}") for i in range(2)]
+        )
         
         threads = []
-        
-        # Crear threads ETL (causan bloat masivo)
-        for i in range(2):
-            thread = threading.Thread(
-                target=self.etl_process,
-                args=(i,),
-                name=f"ETL-{i}"
-            )
+        for index, (worker_type, target, worker_id, name) in enumerate(workers):
+            if not owns(index) or worker_type not in self.worker_types:
+                continue
+            thread = threading.Thread(target=target, args=(worker_id,), name=name)
             thread.daemon = True
             threads.append(thread)
             thread.start()
+        return threads
+    
+    def stop_workers(self, threads):
+        """Detiene los workers y cierra la traza"""
+        self.running = False
         
-        # Crear threads de actualización de sesiones (bloat por UPDATEs frecuentes)
-        for i in range(3):
-            thread = threading.Thread(
-                target=self.session_updater_process,
-                args=(i,),
-                name=f"SessionUpdater-{i}"
+        # Esperar que terminen los threads
+        for thread in threads:
+            thread.join(timeout=10)
+        if self.sampler:
+            self.sampler.stop()
+        self.seeds.close()
+    
+    def start_sampler(self):
+        """Arranca el muestreo de bloat y dead tuples (uno solo aunque haya varios procesos)"""
+        if self.bloat_sample_interval > 0 and process_index() == 0:
+            self.sampler = BloatSampler(self.get_connection, self.bloat_sample_interval, self.bloat_sample_window)
+            self.sampler.start()
+    
+    def log_bloat(self):
+        """Resumen del último muestreo: las tablas con más dead tuples"""
+        if not self.sampler:
+            return
+        tables = sorted(self.sampler.summary().items(), key=lambda item: -item[1]['dead'])
+        for table, stats in tables[:3]:
+            logging.info(
+                f"Bloat {table}: {stats['dead']:.0f} dead tuples ({stats['bloat_ratio']:.1%}), "
+                f"+{stats['growth']:.1f}/s, {stats['lag']:.0f}s sobre el umbral de autovacuum, "
+                f"{stats['size'] / 1024 / 1024:.1f} MB"
             )
-            thread.daemon = True
-            threads.append(thread)
-            thread.start()
-        
-        # Crear thread de gestión de cache (bloat extremo)
-        thread = threading.Thread(
-            target=self.cache_manager_process,
-            args=(0,),
-            name="CacheManager-0"
-        )
-        thread.daemon = True
-        threads.append(thread)
-        thread.start()
+    
+    def start_simulation(self):
+        """Inicia la simulación de problemas de VACUUM"""
+        logging.info("Iniciando simulación de problemas de VACUUM...")
         
-        # Crear threads de logs de auditoría (crecimiento constante)
-        for i in range(2):
-            thread = threading.Thread(
-                target=self.audit_log_process,
-                args=(i,),
-                name=f"AuditLog-{i}"
-            )
-            thread.daemon = True
-            threads.append(thread)
-            thread.start()
+        start_http_server(self.metrics_port)
+        threads = self.start_workers()
+        self.start_sampler()
         
         logging.info("Simulación de problemas de VACUUM iniciada")
         
@@ -313,14 +675,30 @@ class VacuumProblemSimulator:
             while True:
                 time.sleep(30)
                 logging.info("Simulación activa - generando bloat...")
+                self.log_bloat()
         except KeyboardInterrupt:
             logging.info("Deteniendo simulación...")
-            self.running = False
-            
-            # Esperar que terminen los threads
-            for thread in threads:
-                thread.join(timeout=10)
+            self.stop_workers(threads)
 
-if __name__ == "__main__":
+def run_worker_process(stop_event):
+    """Punto de entrada de cada proceso lanzado por ProcessLauncher"""
     simulator = VacuumProblemSimulator()
-    simulator.start_simulation()
+    threads = simulator.start_workers()
+    simulator.start_sampler()
+    logging.info(f"Proceso iniciado con {len(threads)} workers")
+    while not stop_event.wait(30):
+        logging.info("Simulación activa - generando bloat...")
+        simulator.log_bloat()
+    simulator.stop_workers(threads)
+
+if __name__ == "__main__":
+    if process_count() > 1 and not os.getenv('REPLAY_FILE'):
+        # Reparte los workers entre SIMULATOR_PROCESSES procesos (un GIL por proceso)
+        ProcessLauncher(run_worker_process, metrics_port=int(os.getenv('METRICS_PORT', 8000)),
+                        name='vacuum-simulator').run()
+    else:
+        simulator = VacuumProblemSimulator()
+        if simulator.replay_file:
+            simulator.replay()
+        else:
+            simulator.start_simulation()
@@ -2,6 +2,8 @@
 """PostgreSQL Vacuum Issues Simulator"""
 import os, sys, time, threading, random, psycopg2
 from datetime import datetime
+from prometheus_client import start_http_server
+from bloat_sampler import BloatSampler
 
 class VacuumSimulator:
     def __init__(self):
@@ -40,6 +42,11 @@ class VacuumSimulator:
                 time.sleep(5)
     
     def run(self):
+        # Dead tuples, bloat and autovacuum lag per table, exported on METRICS_PORT
+        start_http_server(int(os.getenv('METRICS_PORT', '8000')))
+        sampler = BloatSampler(self.get_connection, interval=float(os.getenv('BLOAT_SAMPLE_INTERVAL', '15')))
+        sampler.start()
+        
         threads = []
         for i in range(2):
             thread = threading.Thread(target=self.create_bloat)
@@ -52,6 +59,7 @@ class VacuumSimulator:
                 time.sleep(60)
         except KeyboardInterrupt:
             self.running = False
+            sampler.stop()
 
 if __name__ == "__main__":
     simulator = VacuumSimulator()